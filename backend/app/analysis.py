@@ -0,0 +1,111 @@
+import json
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from app import emotions, llm_cache, metrics, models, search, stats
+
+# 일기 감정 분석 프롬프트 (create_diary / 재분석 스크립트 공용)
+# 프롬프트를 바꾸면 ANALYSIS_PROMPT_VERSION도 올려야 backfill_analysis.py --mode stale 로 재분석됩니다.
+ANALYSIS_MODEL = "gpt-4o"
+ANALYSIS_PROMPT_VERSION = "2"
+ANALYSIS_CACHE_TTL = 30 * 24 * 3600
+ANALYSIS_SYSTEM_PROMPT = (
+    "너는 사용자의 일기를 분석하는 AI 카운슬러야. 응답 본문은 반드시 한국어로 작성하되, "
+    "JSON의 키값은 반드시 다음 영문명을 사용해: summary, emotions, keywords, card_message, "
+    "positive_points (잘한 일 3가지 리스트), improvement_points (개선점 문자열). "
+    "emotions 객체의 키값은 반드시 [기쁨, 슬픔, 불안, 분노, 평온] 중 하나를 사용해. JSON 형식으로만 응답해."
+)
+
+def request_analysis(client, title: str, content: str, use_cache: bool = True) -> dict:
+    """GPT-4o로 일기 한 편을 분석해 dict로 반환합니다. 같은 제목/내용은 캐시된 결과를 사용합니다."""
+    cache_key = llm_cache.make_key("analysis", ANALYSIS_MODEL, ANALYSIS_PROMPT_VERSION, [title, content])
+    if use_cache:
+        cached = llm_cache.get("analysis", cache_key)
+        if cached is not None:
+            return cached
+
+    with metrics.llm_call("analysis", ANALYSIS_MODEL) as call:
+        response = client.chat.completions.create(
+            model=ANALYSIS_MODEL,
+            messages=[
+                {"role": "system", "content": ANALYSIS_SYSTEM_PROMPT},
+                {"role": "user", "content": f"일기 제목: {title}\n내용: {content}"}
+            ],
+            response_format={ "type": "json_object" }
+        )
+        call.record(response)
+    analysis_data = json.loads(response.choices[0].message.content)
+    llm_cache.put("analysis", cache_key, analysis_data, ttl=ANALYSIS_CACHE_TTL)
+    return analysis_data
+
+def _analysis_values(diary_id: int, analysis_data: dict) -> dict:
+    return dict(
+        diary_id=diary_id,
+        summary=analysis_data.get("summary", ""),
+        emotions=analysis_data.get("emotions", {}),
+        **emotions.column_values(analysis_data.get("emotions")),
+        keywords=analysis_data.get("keywords", []),
+        card_message=analysis_data.get("card_message", ""),
+        positive_points=analysis_data.get("positive_points", []),
+        improvement_points=analysis_data.get("improvement_points", ""),
+        prompt_version=ANALYSIS_PROMPT_VERSION,
+    )
+
+def _existing_analyses(db: Session, diary_ids: list) -> list:
+    return db.query(
+        models.EmotionAnalysis.id, models.EmotionAnalysis.emotions, models.Diary.user_id
+    ).join(models.Diary).filter(models.EmotionAnalysis.diary_id.in_(diary_ids)).all()
+
+def save_analysis(db: Session, diary_id: int, analysis_data: dict) -> models.EmotionAnalysis:
+    """분석 결과를 저장합니다. 기존 분석이 있으면 교체하고 통계 집계도 갱신합니다. (commit은 호출자 몫)"""
+    user_id = db.query(models.Diary.user_id).filter(models.Diary.id == diary_id).scalar()
+    removed = [(row.id, row.emotions) for row in _existing_analyses(db, [diary_id])]
+    db.query(models.EmotionAnalysis).filter(
+        models.EmotionAnalysis.diary_id == diary_id
+    ).delete(synchronize_session=False)
+
+    db_analysis = models.EmotionAnalysis(**_analysis_values(diary_id, analysis_data))
+    db.add(db_analysis)
+    db.flush()
+    stats.apply_delta(db, user_id, removed=removed,
+                      added=[(db_analysis.id, db_analysis.emotions, db_analysis.positive_points)])
+    search.index_diary(db, diary_id)
+    return db_analysis
+
+def save_analyses_bulk(db: Session, results: dict):
+    """{diary_id: analysis_data} 여러 건을 한 번의 DELETE + INSERT로 교체합니다. (commit은 호출자 몫)"""
+    if not results:
+        return
+    diary_ids = list(results.keys())
+    owners = dict(db.query(models.Diary.id, models.Diary.user_id).filter(models.Diary.id.in_(diary_ids)).all())
+    removed_by_user = {}
+    for row in _existing_analyses(db, diary_ids):
+        removed_by_user.setdefault(row.user_id, []).append((row.id, row.emotions))
+
+    db.query(models.EmotionAnalysis).filter(
+        models.EmotionAnalysis.diary_id.in_(diary_ids)
+    ).delete(synchronize_session=False)
+    values = [_analysis_values(diary_id, data) for diary_id, data in results.items()]
+    inserted = db.execute(
+        insert(models.EmotionAnalysis).returning(models.EmotionAnalysis.id, models.EmotionAnalysis.diary_id),
+        values
+    ).all()
+    db.query(models.Diary).filter(models.Diary.id.in_(diary_ids)).update(
+        {"analysis_status": "done"}, synchronize_session=False
+    )
+    # 대기/실패 중인 큐 작업도 완료 처리 (분석 상태 조회가 이전 오류를 계속 보여주지 않도록)
+    db.query(models.AnalysisJob).filter(
+        models.AnalysisJob.diary_id.in_(diary_ids),
+        models.AnalysisJob.status.in_(["pending", "failed"])
+    ).update({"status": "done", "last_error": None}, synchronize_session=False)
+
+    added_by_user = {}
+    for analysis_id, diary_id in inserted:
+        data = results[diary_id]
+        added_by_user.setdefault(owners[diary_id], []).append(
+            (analysis_id, data.get("emotions", {}), data.get("positive_points", []))
+        )
+    # 사용자 id 순으로 잠가서 동시 실행 시 교착 방지
+    for user_id in sorted(set(removed_by_user) | set(added_by_user)):
+        stats.apply_delta(db, user_id, removed=removed_by_user.get(user_id, []), added=added_by_user.get(user_id, []))
+    search.index_diaries(db, diary_ids)
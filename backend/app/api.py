@@ -1,27 +1,32 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Header
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, UploadFile, File, Header, Query, Request, Response
+from fastapi.responses import FileResponse, StreamingResponse
+from sqlalchemy import and_, or_, func, insert, select, update
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session, joinedload
-from typing import List, Optional
+from typing import List, Optional, Union
 from pydantic import BaseModel as PydanticBaseModel
 import os
 import json
-from openai import OpenAI
+import time
+import base64
+import hashlib
 from jose import jwt, JWTError
 from dotenv import load_dotenv
 
 # .env 로드
 load_dotenv(os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), ".env"))
 
-from app.database import get_db
-from app import models, schemas
+from app.database import get_db, SessionLocal
+from app import emotions, images, llm_cache, metrics, models, mood_calendar, reports, schemas, search, stats, streaks, tarot, trends, transcribe, tts_cache
+from app.cache import TTLCache
+from app.jobs import enqueue_analysis, worker_pool
+from app.llm import get_openai_client, get_async_openai_client
+from app.streaming import JSONStringFieldStreamer, SSE_HEADERS, sse
+from starlette.background import BackgroundTask
+from starlette.concurrency import run_in_threadpool
 
-router = APIRouter()
-
-# OpenAI Client
-def get_openai_client():
-    api_key = os.getenv("OPENAI_API_KEY")
-    if not api_key or api_key.startswith("your_"):
-        return None
-    return OpenAI(api_key=api_key)
+# TimedRoute: 엔드포인트 종료 시각을 기록해 느린 요청 로그에서 직렬화 시간을 분리
+router = APIRouter(route_class=metrics.TimedRoute)
 
 # JWT Secret (NextAuth와 공유 - 직접 서명)
 SECRET_KEY = os.getenv("NEXTAUTH_SECRET", "yoursecret")
@@ -40,94 +45,84 @@ def create_backend_token(email: str, name: str = None, picture: str = None, prov
     }
     return jwt.encode(payload, SECRET_KEY, algorithm=ALGORITHM)
 
+# 검증된 토큰 캐시: sha256(token) -> user_id (토큰의 exp와 함께 만료)
+_token_cache = TTLCache(
+    maxsize=int(os.getenv("AUTH_CACHE_SIZE", "10000")),
+    ttl=int(os.getenv("AUTH_CACHE_TTL", "900")),
+)
+
+# NextAuth 토큰은 NEXTAUTH_SECRET, 예전 토큰은 기본값(yoursecret)으로 서명되었을 수 있음
+_JWT_SECRETS = [SECRET_KEY] + (["yoursecret"] if SECRET_KEY != "yoursecret" else [])
+
+def _decode_token(token: str) -> dict:
+    # NextAuth 토큰에는 aud(audience)가 포함되어 있을 수 있으므로 verify_aud=False로 유연하게 처리
+    error = None
+    for secret in _JWT_SECRETS:
+        try:
+            return jwt.decode(token, secret, algorithms=[ALGORITHM], options={"verify_aud": False})
+        except JWTError as e:
+            error = e
+    raise error
+
 def get_current_user_id(authorization: Optional[str] = Header(None), db: Session = Depends(get_db)):
-    # 디버깅: 받은 헤더 로그 확인
-    print(f"DEBUG: Received Authorization Header: {authorization}")
-    
+    with metrics.phase("auth"):
+        return _authenticate(authorization, db)
+
+def _authenticate(authorization: Optional[str], db: Session):
     # 1. 토큰이 없는 경우 - 보안을 위해 예외 발생
     if not authorization:
-        print("DEBUG: Authorization header is missing")
         raise HTTPException(status_code=401, detail="인증 토큰이 필요합니다.")
-    
+
+    # "Bearer <token>" 형식 처리
+    parts = authorization.split(" ")
+    if len(parts) != 2 or parts[0].lower() != "bearer":
+        raise HTTPException(status_code=401, detail="잘못된 인증 형식입니다.")
+    token = parts[1]
+
+    # 2. 이미 검증한 토큰이면 디코드/DB 조회 없이 바로 반환
+    token_key = hashlib.sha256(token.encode()).hexdigest()
+    cached_user_id = _token_cache.get(token_key)
+    if cached_user_id is not None:
+        return cached_user_id
+
     try:
-        # "Bearer <token>" 형식 처리
-        parts = authorization.split(" ")
-        if len(parts) != 2 or parts[0].lower() != "bearer":
-            print(f"DEBUG: Invalid authorization format: {parts}")
-            raise HTTPException(status_code=401, detail="잘못된 인증 형식입니다.")
-            
-        token = parts[1]
-        
-        # NextAuth JWT 디코드 (시크릿 검증 필수)
         try:
-            # 디버깅: 시크릿 키 로드 확인
-            actual_secret = os.getenv("NEXTAUTH_SECRET", "yoursecret")
-            print(f"DEBUG: SECRET_KEY from env - Length: {len(actual_secret)}, Prefix: {actual_secret[:3]}...")
-            
-            # 먼저 검증 없이 디코딩해서 구조 확인 (디버깅용)
-            try:
-                unverified = jwt.get_unverified_claims(token)
-                print(f"DEBUG: Unverified Payload: {unverified}")
-            except Exception as e:
-                print(f"DEBUG: Failed to read unverified claims: {e}")
-
-            # NextAuth 토큰에는 aud(audience)가 포함되어 있을 수 있으므로 verify_aud=False로 유연하게 처리
-            # 만약 실패하면 기본값(yoursecret)으로도 한번 더 시도 (환경변수 로딩 문제 확인용)
-            try:
-                payload = jwt.decode(token, actual_secret, algorithms=[ALGORITHM], options={"verify_aud": False})
-            except JWTError:
-                if actual_secret != "yoursecret":
-                    print("DEBUG: Retry with default 'yoursecret'...")
-                    payload = jwt.decode(token, "yoursecret", algorithms=[ALGORITHM], options={"verify_aud": False})
-                else:
-                    raise
-
-            print(f"DEBUG: JWT Decoded successfully. Email: {payload.get('email')}")
+            payload = _decode_token(token)
         except JWTError as e:
-            print(f"DEBUG: JWT Verification failed: {e}")
+            print(f"JWT verification failed: {e}")
             raise HTTPException(status_code=401, detail=f"유효하지 않은 토큰입니다: {str(e)}")
-            
+
         email = payload.get("email")
-        name = payload.get("name")
-        picture = payload.get("picture") or payload.get("image")
-        provider = payload.get("provider", "social")
-        
         if not email:
-            print("DEBUG: Email missing in token payload")
             raise HTTPException(status_code=401, detail="토큰에 이메일 정보가 없습니다.")
-            
-        # DB에서 사용자 확인 및 자동 생성 (Sync)
-        user = db.query(models.User).filter(models.User.email == email).first()
-        if not user:
-            print(f"DEBUG: Creating new user for email: {email}")
+
+        # DB에서 사용자 확인, 없으면 자동 생성 (프로필 동기화는 /auth/token에서만 수행)
+        user_id = db.query(models.User.id).filter(models.User.email == email).scalar()
+        if user_id is None:
             user = models.User(
                 email=email,
-                name=name,
-                profile_image=picture,
-                provider=provider
+                name=payload.get("name"),
+                profile_image=payload.get("picture") or payload.get("image"),
+                provider=payload.get("provider", "social")
             )
             db.add(user)
-            db.commit()
-            db.refresh(user)
-        else:
-            # 정보 업데이트
-            update_needed = False
-            if name and user.name != name:
-                user.name = name
-                update_needed = True
-            if picture and user.profile_image != picture:
-                user.profile_image = picture
-                update_needed = True
-            if update_needed:
+            try:
                 db.commit()
-            
-        return user.id
+                user_id = user.id
+            except IntegrityError:
+                # 동시 요청이 먼저 생성한 경우
+                db.rollback()
+                user_id = db.query(models.User.id).filter(models.User.email == email).scalar()
+
+        exp = payload.get("exp")
+        _token_cache.set(token_key, user_id, ttl=exp - time.time() if exp else None)
+        return user_id
     except HTTPException:
         raise
     except Exception as e:
         import traceback
         traceback.print_exc()
-        print(f"DEBUG: Auth error: {e}")
+        print(f"Auth error: {e}")
         raise HTTPException(status_code=401, detail="인증 처리 중 오류가 발생했습니다.")
 
 @router.get("/status")
@@ -185,57 +180,88 @@ def create_category(category: schemas.CategoryCreate, db: Session = Depends(get_
     db.refresh(db_category)
     return db_category
 
+def _delete_diaries(db: Session, user_id: int, *criteria):
+    """조건에 맞는 일기들을 DELETE 한 번으로 삭제합니다. (commit은 호출자 몫)
+
+    감정 분석/분석 작업/검색 색인은 FK ON DELETE CASCADE로 함께 삭제됩니다.
+    (삭제한 일기 수, 정리가 필요한 첨부 이미지 URL 목록)을 반환합니다.
+    """
+    condition = and_(models.Diary.user_id == user_id, *criteria)
+    diaries = db.query(models.Diary.created_at, models.Diary.image_url).filter(condition).all()
+    if not diaries:
+        return 0, []
+    # 삭제될 감정 분석을 통계 집계에서 제외
+    removed = db.query(models.EmotionAnalysis.id, models.EmotionAnalysis.emotions).join(
+        models.Diary, models.EmotionAnalysis.diary_id == models.Diary.id
+    ).filter(condition).all()
+
+    db.query(models.Diary).filter(condition).delete(synchronize_session=False)
+    stats.apply_delta(db, user_id, removed=[(r.id, r.emotions) for r in removed])
+    streaks.diaries_removed(db, user_id, [d.created_at for d in diaries])
+    reports.invalidate(db, user_id, [d.created_at for d in diaries if d.created_at])
+    return len(diaries), sorted({d.image_url for d in diaries if d.image_url})
+
 @router.delete("/categories/{category_id}")
-def delete_category(category_id: int, db: Session = Depends(get_db), user_id: int = Depends(get_current_user_id)):
+def delete_category(category_id: int, background_tasks: BackgroundTasks, db: Session = Depends(get_db), user_id: int = Depends(get_current_user_id)):
     db_category = db.query(models.Category).filter(
         models.Category.id == category_id, 
         models.Category.user_id == user_id
     ).first()
     if not db_category:
         raise HTTPException(status_code=404, detail="Category not found")
-    
-    # 이 카테고리에 속한 일기들 조회
-    diaries = db.query(models.Diary).filter(
-        models.Diary.category_id == category_id,
-        models.Diary.user_id == user_id
-    ).all()
-    
-    # 일기별로 감정 분석 결과 먼저 삭제 (외래키 제약 조건)
-    for diary in diaries:
-        db.query(models.EmotionAnalysis).filter(
-            models.EmotionAnalysis.diary_id == diary.id
-        ).delete()
-        db.delete(diary)
-    
-    db.delete(db_category)
+
+    deleted, image_urls = _delete_diaries(db, user_id, models.Diary.category_id == category_id)
+    db.query(models.Category).filter(models.Category.id == category_id).delete(synchronize_session=False)
     db.commit()
-    return {"message": "Category and related diaries deleted", "deleted_diaries": len(diaries)}
+    # 더 이상 참조되지 않는 이미지 파일은 응답 후 정리
+    if image_urls:
+        background_tasks.add_task(images.cleanup_uploads, image_urls)
+    return {"message": "Category and related diaries deleted", "deleted_diaries": deleted}
 
 # --- STT API ---
 @router.post("/stt", response_model=schemas.STTResponse)
 async def speech_to_text(file: UploadFile = File(...), user_id: int = Depends(get_current_user_id)):
-    current_client = get_openai_client()
+    current_client = get_async_openai_client()
     if not current_client:
         return {"text": "음성 인식 테스트 결과입니다. (OpenAI API 키가 설정되지 않았습니다)"}
-    
+
+    workdir, path = await transcribe.spool_upload(file)
     try:
-        temp_file = f"temp_{file.filename}"
-        with open(temp_file, "wb") as buffer:
-            buffer.write(await file.read())
-        
-        with open(temp_file, "rb") as audio_file:
-            transcript = current_client.audio.transcriptions.create(
-                model="whisper-1", 
-                file=audio_file,
-                language="ko"
-            )
-        
-        os.remove(temp_file)
-        return {"text": transcript.text}
+        return {"text": await transcribe.transcribe(current_client, path, workdir)}
+    except HTTPException:
+        raise
     except Exception as e:
-        if os.path.exists(temp_file):
-            os.remove(temp_file)
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        transcribe.cleanup(workdir)
+
+@router.post("/stt/stream")
+async def speech_to_text_stream(file: UploadFile = File(...), user_id: int = Depends(get_current_user_id)):
+    """긴 녹음용: 구간별 받아쓰기 결과를 끝나는 대로 SSE로 전송
+
+    이벤트: partial {index, total, text} (완료 순서) → done {text} (구간 순서대로 이어 붙인 전체) / error {detail}
+    """
+    current_client = get_async_openai_client()
+    # 응답 스트리밍이 시작되면 업로드 파일이 닫히므로 먼저 디스크에 저장
+    workdir, path = await transcribe.spool_upload(file)
+
+    async def event_stream():
+        try:
+            if not current_client:
+                text = "음성 인식 테스트 결과입니다. (OpenAI API 키가 설정되지 않았습니다)"
+                yield sse("done", {"text": text})
+                return
+            async for event, data in transcribe.iter_transcription(current_client, path, workdir):
+                yield sse(event, data)
+        except HTTPException as e:
+            yield sse("error", {"detail": e.detail})
+        except Exception as e:
+            print(f"STT stream error: {e}")
+            yield sse("error", {"detail": str(e)})
+        finally:
+            transcribe.cleanup(workdir)
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream", headers=SSE_HEADERS)
 
 # --- Diary API ---
 @router.post("/diaries", response_model=schemas.Diary)
@@ -244,8 +270,9 @@ def create_diary(diary: schemas.DiaryCreate, db: Session = Depends(get_db), user
     custom_dt = None
     if diary.date:
         try:
-            custom_dt = datetime.strptime(diary.date, "%Y-%m-%d").replace(
-                hour=12, minute=0, second=0, tzinfo=timezone.utc
+            # 사용자 시간대의 그날 정오로 저장 (스트릭/달력에서 고른 날짜로 잡히도록)
+            custom_dt = streaks.local_noon(
+                datetime.strptime(diary.date, "%Y-%m-%d").date(), streaks.user_zone(db, user_id)
             )
         except ValueError:
             custom_dt = None
@@ -263,54 +290,127 @@ def create_diary(diary: schemas.DiaryCreate, db: Session = Depends(get_db), user
     if custom_dt:
         db_diary.created_at = custom_dt
     db.add(db_diary)
+    db.flush()
+    search.index_diary(db, db_diary.id)
+    streaks.diary_added(db, db_diary)
+    # 해당 월 리포트는 다음 조회 때 다시 생성
+    reports.invalidate(db, user_id, [custom_dt or datetime.now(timezone.utc)])
+    # 감정 분석은 작업 큐에서 처리 (일기 저장과 같은 트랜잭션으로 작업 등록)
+    enqueue_analysis(db, db_diary)
     db.commit()
     db.refresh(db_diary)
+    worker_pool.notify()
+    return db_diary
 
-    current_client = get_openai_client()
-    if current_client:
-        try:
-            response = current_client.chat.completions.create(
-                model="gpt-4o",
-                messages=[
-                    {"role": "system", "content": "너는 사용자의 일기를 분석하는 AI 카운슬러야. 응답 본문은 반드시 한국어로 작성하되, JSON의 키값은 반드시 다음 영문명을 사용해: summary, emotions, keywords, card_message, positive_points (잘한 일 3가지 리스트), improvement_points (개선점 문자열). emotions 객체의 키값은 반드시 [기쁨, 슬픔, 불안, 분노, 평온] 중 하나를 사용해. JSON 형식으로만 응답해."},
-                    {"role": "user", "content": f"일기 제목: {diary.title}\n내용: {diary.content}"}
-                ],
-                response_format={ "type": "json_object" }
-            )
-            
-            analysis_data = json.loads(response.choices[0].message.content)
-            db_analysis = models.EmotionAnalysis(
-                diary_id=db_diary.id,
-                summary=analysis_data.get("summary", ""),
-                emotions=analysis_data.get("emotions", {}),
-                keywords=analysis_data.get("keywords", []),
-                card_message=analysis_data.get("card_message", ""),
-                positive_points=analysis_data.get("positive_points", []),
-                improvement_points=analysis_data.get("improvement_points", "")
-            )
-            db.add(db_analysis)
-            db.commit()
-            db.refresh(db_diary)  # 분석 결과를 포함하여 다시 읽기
-        except Exception as e:
-            print(f"AI Analysis failed: {e}")
+@router.get("/diaries/{diary_id}/analysis", response_model=schemas.DiaryAnalysisStatus)
+def get_analysis_status(diary_id: int, db: Session = Depends(get_db), user_id: int = Depends(get_current_user_id)):
+    """일기 감정 분석 진행 상태 조회 (클라이언트 폴링용)"""
+    diary = db.query(models.Diary).filter(models.Diary.id == diary_id, models.Diary.user_id == user_id).first()
+    if not diary:
+        raise HTTPException(status_code=404, detail="Diary not found")
+    job = db.query(models.AnalysisJob).filter(
+        models.AnalysisJob.diary_id == diary_id
+    ).order_by(models.AnalysisJob.id.desc()).first()
+    return {
+        "diary_id": diary.id,
+        "analysis_status": diary.analysis_status,
+        "attempts": job.attempts if job else 0,
+        "last_error": job.last_error if job else None,
+        "analysis": diary.analysis,
+    }
 
-    return db_diary
+# --- 일기 목록 커서 (keyset pagination) ---
+SNIPPET_LENGTH = 120
+
+def _encode_cursor(is_pinned, created_at, diary_id) -> str:
+    raw = json.dumps([bool(is_pinned), created_at.isoformat(), diary_id])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def _decode_cursor(cursor: str):
+    from datetime import datetime
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        is_pinned, created_at, diary_id = json.loads(raw)
+        return bool(is_pinned), datetime.fromisoformat(created_at), int(diary_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="잘못된 커서입니다.")
 
-@router.get("/diaries", response_model=List[schemas.Diary])
+def _after_cursor(cursor: str):
+    # 정렬 (is_pinned DESC, created_at DESC, id DESC) 기준으로 커서 다음 행들
+    is_pinned, created_at, diary_id = _decode_cursor(cursor)
+    Diary = models.Diary
+    same_pin_group = and_(Diary.is_pinned == is_pinned, or_(
+        Diary.created_at < created_at,
+        and_(Diary.created_at == created_at, Diary.id < diary_id)
+    ))
+    if is_pinned:
+        # 고정된 일기 다음에는 고정되지 않은 일기 전체가 이어짐
+        return or_(same_pin_group, Diary.is_pinned == False)
+    return same_pin_group
+
+@router.get("/diaries", response_model=List[Union[schemas.Diary, schemas.DiarySummary]])
 def get_diaries(
+    response: Response,
     q: Optional[str] = None,
     category_id: Optional[int] = None,
+    limit: Optional[int] = Query(None, ge=1, le=100),
+    cursor: Optional[str] = None,
+    view: str = Query("full", pattern="^(full|summary)$"),
+    emotion: Optional[str] = None,
+    threshold: float = Query(0.5, ge=0, le=1),
     db: Session = Depends(get_db),
     user_id: int = Depends(get_current_user_id)
 ):
-    query = db.query(models.Diary).options(joinedload(models.Diary.analysis)).filter(models.Diary.user_id == user_id)
-    if q:
-        query = query.filter(
-            models.Diary.title.ilike(f"%{q}%") | models.Diary.content.ilike(f"%{q}%")
+    """일기 목록. limit을 주면 커서 기반으로 나눠 받고 다음 커서는 X-Next-Cursor 헤더로 전달합니다.
+    view=summary는 본문/분석 없이 목록 화면용 필드만 반환합니다.
+    emotion을 주면 그 감정 점수가 threshold보다 큰 일기만 반환합니다. (ex: emotion=불안&threshold=0.6)"""
+    Diary = models.Diary
+    if view == "summary":
+        query = db.query(
+            Diary.id, Diary.title, func.substr(Diary.content, 1, SNIPPET_LENGTH).label("snippet"),
+            Diary.category_id, Diary.mood, Diary.color_code, Diary.color_name, Diary.image_url,
+            Diary.is_pinned, Diary.is_locked, Diary.analysis_status, Diary.created_at
         )
+    else:
+        query = db.query(Diary).options(joinedload(Diary.analysis))
+    query = query.filter(Diary.user_id == user_id)
+    if q and q.strip():
+        matches = search.ranked_matches(db, user_id, q)
+        query = query.filter(Diary.id.in_(select(matches.c.diary_id)))
     if category_id:
-        query = query.filter(models.Diary.category_id == category_id)
-    return query.order_by(models.Diary.is_pinned.desc(), models.Diary.created_at.desc()).all()
+        query = query.filter(Diary.category_id == category_id)
+    if emotion:
+        score = emotions.column(emotion)
+        if score is None:
+            raise HTTPException(status_code=400, detail=f"알 수 없는 감정입니다: {emotion}")
+        query = query.filter(Diary.analysis.has(score > threshold))
+    if cursor:
+        query = query.filter(_after_cursor(cursor))
+    query = query.order_by(Diary.is_pinned.desc(), Diary.created_at.desc(), Diary.id.desc())
+
+    rows = query.limit(limit + 1).all() if limit else query.all()
+    if limit and len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        response.headers["X-Next-Cursor"] = _encode_cursor(last.is_pinned, last.created_at, last.id)
+
+    if view == "summary":
+        # 잠긴 일기는 목록에서도 본문 일부를 노출하지 않음
+        return [schemas.DiarySummary.model_validate(
+            {**row._mapping, "snippet": "" if row.is_locked else (row.snippet or "")}
+        ) for row in rows]
+    return [schemas.Diary.model_validate(row) for row in rows]
+
+@router.get("/diaries/search")
+def search_diaries(
+    q: str,
+    limit: int = Query(20, ge=1, le=50),
+    offset: int = Query(0, ge=0),
+    db: Session = Depends(get_db),
+    user_id: int = Depends(get_current_user_id)
+):
+    """n-gram 색인 기반 일기 검색. 관련도 순으로 정렬되고 일치 부분은 <mark>로 강조됩니다."""
+    return search.search_diaries(db, user_id, q, limit=limit, offset=offset)
 
 @router.patch("/diaries/{diary_id}/pin")
 def toggle_pin(diary_id: int, db: Session = Depends(get_db), user_id: int = Depends(get_current_user_id)):
@@ -327,59 +427,76 @@ def toggle_pin(diary_id: int, db: Session = Depends(get_db), user_id: int = Depe
 
 @router.get("/statistics")
 def get_statistics(db: Session = Depends(get_db), user_id: int = Depends(get_current_user_id)):
-    # 사용자의 일기와 연결된 감정 분석 결과만 조회
-    analyses = db.query(models.EmotionAnalysis).join(models.Diary).filter(
-        models.Diary.user_id == user_id
-    ).order_by(models.EmotionAnalysis.created_at.desc()).all()
-    
-    if not analyses:
-        return {"emotion_distribution": {}, "total_count": 0, "recent_positive_points": []}
-
-    total_count = len(analyses)
-    emotion_totals = {}
-    for analysis in analyses:
-        if not analysis.emotions: continue
-        for emotion, score in analysis.emotions.items():
-            # 감정 키값 표준화 (한글/영어 혼용 대응)
-            emotion_totals[emotion] = emotion_totals.get(emotion, 0) + score
-            
-    return {
-        "emotion_distribution": {k: v / total_count for k, v in emotion_totals.items()},
-        "total_count": total_count,
-        "recent_positive_points": [a.positive_points for a in analyses[:3] if a.positive_points]
-    }
+    # 분석 저장/삭제 시 갱신되는 사용자별 집계 행 하나만 조회
+    return stats.get_statistics(db, user_id)
+
+def _parse_day(value: Optional[str], name: str):
+    from datetime import date
+    if not value:
+        return None
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"{name}는 YYYY-MM-DD 형식이어야 합니다.")
+
+@router.get("/statistics/trend")
+def get_emotion_trend(
+    bucket: str = Query("day", pattern="^(day|week|month)$"),
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    window: Optional[int] = Query(None, ge=1, le=90),
+    db: Session = Depends(get_db),
+    user_id: int = Depends(get_current_user_id)
+):
+    """일/주/월 구간별 감정 평균, 이동 평균, 변동성. start/end는 사용자 시간대 기준 날짜 (기본: 구간별 최근 기간)"""
+    tz = streaks.user_zone(db, user_id)
+    # 기본값(사용자 시간대의 오늘 등)을 먼저 정한 뒤 검증
+    start_day, end_day = trends.resolve_range(bucket, _parse_day(start, "start"), _parse_day(end, "end"), tz)
+    if not (trends.MIN_DATE <= start_day and end_day <= trends.MAX_DATE):
+        raise HTTPException(status_code=400, detail="조회할 수 없는 날짜입니다.")
+    if start_day > end_day:
+        raise HTTPException(status_code=400, detail="start가 end보다 늦습니다.")
+    if (end_day - start_day).days >= trends.MAX_DAYS:
+        raise HTTPException(status_code=400, detail="조회 기간이 너무 깁니다.")
+    return trends.emotion_trend(db, user_id, bucket=bucket, start=start_day, end=end_day, window=window, tz=tz)
+
+# --- 연속 기록 (스트릭) ---
+@router.get("/streak")
+def get_streak(db: Session = Depends(get_db), user_id: int = Depends(get_current_user_id)):
+    # 일기 추가/삭제 시 갱신되는 요약 행 하나만 조회
+    return streaks.get_streak(db, user_id)
+
+@router.put("/users/me/timezone")
+def set_timezone(body: schemas.TimezoneUpdate, db: Session = Depends(get_db), user_id: int = Depends(get_current_user_id)):
+    if not streaks.is_valid_timezone(body.timezone):
+        raise HTTPException(status_code=400, detail="알 수 없는 시간대입니다.")
+    user = db.query(models.User).filter(models.User.id == user_id).first()
+    if user.timezone != body.timezone:
+        user.timezone = body.timezone
+        db.flush()
+        # 날짜 경계가 바뀌므로 스트릭 구간을 새 시간대로 다시 계산
+        streaks.rebuild(db, user_id)
+        db.commit()
+    return streaks.get_streak(db, user_id)
 
 # --- 이미지 업로드 ---
 @router.post("/upload")
-async def upload_image(file: UploadFile = File(...), diary_id: int = None, db: Session = Depends(get_db), user_id: int = Depends(get_current_user_id)):
-    import shutil, uuid
-    # Mac/Local 로컬 개발 환경용 업로드 경로 설정
-    base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-    upload_dir = os.path.join(base_dir, "uploads")
-    
-    try:
-        os.makedirs(upload_dir, exist_ok=True)
-    except Exception as e:
-        print(f"Directory creation error: {e}")
-        # 권한 문제 대비 대체 경로 (현재 작업 디렉토리 하위)
-        upload_dir = os.path.join(os.getcwd(), "uploads")
-        os.makedirs(upload_dir, exist_ok=True)
-
-    ext = file.filename.rsplit(".", 1)[-1] if "." in file.filename else "jpg"
-    filename = f"{uuid.uuid4()}.{ext}"
-    filepath = os.path.join(upload_dir, filename)
-    
-    with open(filepath, "wb") as f:
-        shutil.copyfileobj(file.file, f)
-    
-    image_url = f"/uploads/{filename}"
+async def upload_image(background_tasks: BackgroundTasks, file: UploadFile = File(...), diary_id: int = None, db: Session = Depends(get_db), user_id: int = Depends(get_current_user_id)):
+    filename = await images.store_upload(file)
+    # 원본은 EXIF 제거 후 저장됨. 썸네일/중간 크기 생성만 응답 후 처리 (그 전까지 파생 이미지 URL은 원본으로 서빙됨)
+    background_tasks.add_task(images.process_image, filename)
+    urls = images.image_urls(filename)
+    image_url = urls["original"]
 
     if diary_id:
         diary = db.query(models.Diary).filter(models.Diary.id == diary_id, models.Diary.user_id == user_id).first()
         if diary:
+            old_url = diary.image_url
             diary.image_url = image_url
             db.commit()
-    return {"image_url": image_url}
+            if old_url and old_url != image_url:
+                images.remove_upload(db, old_url)
+    return {"image_url": image_url, "images": urls}
 
 @router.delete("/diaries/{diary_id}/image")
 def delete_diary_image(diary_id: int, db: Session = Depends(get_db), user_id: int = Depends(get_current_user_id)):
@@ -388,36 +505,37 @@ def delete_diary_image(diary_id: int, db: Session = Depends(get_db), user_id: in
         raise HTTPException(status_code=404, detail="Diary not found")
     
     if diary.image_url:
-        try:
-            # 실제 파일 삭제
-            base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-            # image_url format: /uploads/filename.ext
-            filename = diary.image_url.split("/")[-1]
-            filepath = os.path.join(base_dir, "uploads", filename)
-            
-            if os.path.exists(filepath):
-                os.remove(filepath)
-                print(f"DEBUG: File deleted: {filepath}")
-            else:
-                # 대체 경로 확인
-                fallback_path = os.path.join(os.getcwd(), "uploads", filename)
-                if os.path.exists(fallback_path):
-                    os.remove(fallback_path)
-                    print(f"DEBUG: Fallback file deleted: {fallback_path}")
-        except Exception as e:
-            print(f"DEBUG: Failed to delete physical file: {e}")
-            # 파일 삭제 실패는 로그만 남기고 DB 업데이트는 진행
-        
+        old_url = diary.image_url
         diary.image_url = None
         db.commit()
         db.refresh(diary)
+        try:
+            # 같은 이미지를 쓰는 다른 일기가 없을 때만 실제 파일 삭제
+            images.remove_upload(db, old_url)
+        except Exception as e:
+            # 파일 삭제 실패는 로그만 남김
+            print(f"DEBUG: Failed to delete physical file: {e}")
     
     return {"message": "Image deleted successfully"}
 
+@router.delete("/diaries/{diary_id}")
+def delete_diary(diary_id: int, background_tasks: BackgroundTasks, db: Session = Depends(get_db), user_id: int = Depends(get_current_user_id)):
+    exists = db.query(models.Diary.id).filter(models.Diary.id == diary_id, models.Diary.user_id == user_id).first()
+    if not exists:
+        raise HTTPException(status_code=404, detail="Diary not found")
+    _, image_urls = _delete_diaries(db, user_id, models.Diary.id == diary_id)
+    db.commit()
+    if image_urls:
+        background_tasks.add_task(images.cleanup_uploads, image_urls)
+    return {"message": "Diary deleted"}
+
 # --- AI 대화형 일기 ---
 class ChatMessage(schemas.BaseModel):
     messages: List[dict]
 
+def _diary_chat_system_msg(diary: models.Diary) -> dict:
+    return {"role": "system", "content": f"너는 사용자의 일기를 읽고 공감하며 대화하는 따뜻한 AI 카운슬러야. 반드시 한국어로만 답해. 일기 내용:\n제목: {diary.title}\n내용: {diary.content}"}
+
 @router.post("/diaries/{diary_id}/chat")
 def diary_chat(diary_id: int, body: ChatMessage, db: Session = Depends(get_db), user_id: int = Depends(get_current_user_id)):
     diary = db.query(models.Diary).filter(models.Diary.id == diary_id, models.Diary.user_id == user_id).first()
@@ -426,46 +544,103 @@ def diary_chat(diary_id: int, body: ChatMessage, db: Session = Depends(get_db),
     current_client = get_openai_client()
     if not current_client:
         return {"reply": "OpenAI API 키가 필요해요. 잠시 후 다시 시도해주세요."}
+    system_msg = _diary_chat_system_msg(diary)
+    db.rollback()  # GPT 응답을 기다리는 동안 DB 커넥션을 반환
     try:
-        system_msg = {"role": "system", "content": f"너는 사용자의 일기를 읽고 공감하며 대화하는 따뜻한 AI 카운슬러야. 반드시 한국어로만 답해. 일기 내용:\n제목: {diary.title}\n내용: {diary.content}"}
-        response = current_client.chat.completions.create(
-            model="gpt-4o",
-            messages=[system_msg] + body.messages,
-            max_tokens=300
-        )
+        with metrics.llm_call("diary-chat", "gpt-4o") as call:
+            response = current_client.chat.completions.create(
+                model="gpt-4o",
+                messages=[system_msg] + body.messages,
+                max_tokens=300
+            )
+            call.record(response)
         return {"reply": response.choices[0].message.content}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/diaries/{diary_id}/chat/stream")
+def diary_chat_stream(diary_id: int, body: ChatMessage, db: Session = Depends(get_db), user_id: int = Depends(get_current_user_id)):
+    """diary_chat의 SSE 버전: token 이벤트로 답변 조각을, done 이벤트로 전체 답변을 보냅니다."""
+    diary = db.query(models.Diary).filter(models.Diary.id == diary_id, models.Diary.user_id == user_id).first()
+    if not diary:
+        raise HTTPException(status_code=404, detail="Diary not found")
+    system_msg = _diary_chat_system_msg(diary)
+    db.rollback()  # 스트리밍 동안 DB 커넥션을 잡고 있지 않도록 반환
+    current_client = get_openai_client()
+
+    def event_stream():
+        if not current_client:
+            reply = "OpenAI API 키가 필요해요. 잠시 후 다시 시도해주세요."
+            yield sse("token", {"text": reply})
+            yield sse("done", {"reply": reply})
+            return
+        stream = None
+        try:
+            with metrics.llm_call("diary-chat-stream", "gpt-4o") as call:
+                stream = current_client.chat.completions.create(
+                    model="gpt-4o",
+                    messages=[system_msg] + body.messages,
+                    max_tokens=300,
+                    stream=True,
+                    stream_options={"include_usage": True}
+                )
+                parts = []
+                for chunk in stream:
+                    call.record(chunk)  # usage는 마지막 청크에만 포함됨
+                    delta = chunk.choices[0].delta.content if chunk.choices else None
+                    if delta:
+                        parts.append(delta)
+                        yield sse("token", {"text": delta})
+            yield sse("done", {"reply": "".join(parts)})
+        except Exception as e:
+            print(f"Diary chat stream error: {e}")
+            yield sse("error", {"detail": str(e)})
+        finally:
+            if stream is not None:
+                stream.close()
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream", headers=SSE_HEADERS)
+
+# --- 기분 달력 (월별 날짜 요약) ---
+@router.get("/calendar")
+def get_calendar(
+    request: Request,
+    year: int = Query(..., ge=mood_calendar.MIN_YEAR, le=mood_calendar.MAX_YEAR),
+    month: int = Query(..., ge=1, le=12),
+    db: Session = Depends(get_db),
+    user_id: int = Depends(get_current_user_id),
+):
+    # 달 이동마다 일기 전체 대신 날짜별 요약만 내려주고, 바뀐 게 없으면 304
+    payload = mood_calendar.month_payload(db, user_id, year, month)
+    etag = mood_calendar.etag(payload)
+    cache_headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers=cache_headers)
+    return Response(
+        content=json.dumps(payload, ensure_ascii=False), media_type="application/json", headers=cache_headers
+    )
+
 # --- 월간 AI 리포트 ---
 @router.get("/report/monthly")
 def monthly_report(year: int, month: int, db: Session = Depends(get_db), user_id: int = Depends(get_current_user_id)):
-    from datetime import date
-    start = f"{year}-{str(month).zfill(2)}-01"
-    end_day = (date(year, month % 12 + 1, 1) if month < 12 else date(year + 1, 1, 1)).isoformat()
-    diaries = db.query(models.Diary).filter(
-        models.Diary.user_id == user_id,
-        models.Diary.created_at >= start,
-        models.Diary.created_at < end_day
-    ).all()
-    if not diaries:
-        return {"report": "이번 달 일기가 없어요. 소중한 하루하루를 기록해보세요!"}
+    # 바뀌지 않은 리포트는 저장된 행을 그대로 반환 (uq_monthly_reports_user_month 인덱스 조회 한 번)
+    row = reports.get_stored_report(db, user_id, year, month)
+    if row and not row.is_stale:
+        return {"report": row.report, "diary_count": row.diary_count}
+
     current_client = get_openai_client()
     if not current_client:
-        return {"report": f"이번 달 {len(diaries)}개의 일기를 작성하셨어요. OpenAI API 연동 시 상세 리포트를 제공해드릴게요."}
-    diary_summary = "\n\n".join([f"[{d.created_at.strftime('%m/%d')}] {d.title}: {d.content[:100]}" for d in diaries])
+        count = len(reports.month_diaries(db, user_id, year, month))
+        if not count:
+            return {"report": "이번 달 일기가 없어요. 소중한 하루하루를 기록해보세요!"}
+        return {"report": f"이번 달 {count}개의 일기를 작성하셨어요. OpenAI API 연동 시 상세 리포트를 제공해드릴게요."}
     try:
-        response = current_client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {"role": "system", "content": "너는 사용자의 한 달 일기를 분석하는 AI 카운슬러야. 반드시 한국어로만 답해. 이번 달의 감정 흐름, 주요 사건, 칭찬할 점, 내달의 제안을 따뜻하게 요약해줘. 400자 이내로."},
-                {"role": "user", "content": f"{year}년 {month}월 일기:\n{diary_summary}"}
-            ],
-            max_tokens=500
-        )
-        return {"report": response.choices[0].message.content, "diary_count": len(diaries)}
+        row = reports.refresh_report(db, current_client, user_id, year, month, row)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    if not row:
+        return {"report": "이번 달 일기가 없어요. 소중한 하루하루를 기록해보세요!"}
+    return {"report": row.report, "diary_count": row.diary_count}
 
 # --- 일기 잠금 / 해제 ---
 class LockRequest(schemas.BaseModel):
@@ -496,94 +671,148 @@ def unlock_diary(diary_id: int, body: LockRequest, db: Session = Depends(get_db)
     return {"is_locked": False}
 
 # --- AI Agent Chat API ---
+TTS_MODEL = "tts-1"
+TTS_VOICES = {"alloy", "echo", "fable", "onyx", "nova", "shimmer"}
+
 @router.post("/tts")
-async def text_to_speech(body: schemas.TTSRequest, user_id: int = Depends(get_current_user_id)):
-    current_client = get_openai_client()
+async def text_to_speech(body: schemas.TTSRequest, request: Request, user_id: int = Depends(get_current_user_id)):
+    voice = body.voice or "alloy"  # 기본은 따뜻한 목소리
+    if voice not in TTS_VOICES:
+        raise HTTPException(status_code=400, detail="지원하지 않는 목소리입니다.")
+    key = tts_cache.make_key(TTS_MODEL, voice, body.text)
+    etag = f'"{key}"'
+    cache_headers = {"ETag": etag, "Cache-Control": "private, max-age=86400"}
+
+    cached_path = await run_in_threadpool(tts_cache.lookup, key)
+    if cached_path:
+        if etag in request.headers.get("if-none-match", ""):
+            return Response(status_code=304, headers=cache_headers)
+        # FileResponse가 Range 요청(206)을 처리
+        return FileResponse(cached_path, media_type="audio/mpeg", headers=cache_headers)
+
+    current_client = get_async_openai_client()
     if not current_client:
         raise HTTPException(status_code=500, detail="OpenAI API key not configured")
-    
+
+    stream_ctx = current_client.audio.speech.with_streaming_response.create(
+        model=TTS_MODEL, voice=voice, input=body.text, response_format="mp3"
+    )
+
+    async def audio_stream():
+        # 업스트림 연결과 임시 파일은 이 제너레이터가 소유: 끝나거나 닫힐 때(aclose) 함께 정리됨
+        writer = None
+        completed = False
+        try:
+            async with stream_ctx as upstream:
+                writer = await run_in_threadpool(tts_cache.CacheWriter, key)
+                written = 0
+                async for chunk in upstream.iter_bytes(tts_cache.STREAM_CHUNK_BYTES):
+                    await run_in_threadpool(writer.write, chunk)
+                    written += len(chunk)
+                    yield chunk
+                completed = written > 0
+        except Exception as e:
+            # 200을 보낸 뒤의 오류는 다시 던져 연결을 끊음 (잘린 음성이 정상 응답처럼 보이지 않게)
+            print(f"TTS stream error: {e}")
+            raise
+        finally:
+            if writer:
+                # 중간에 끊긴 음성은 캐시에 남기지 않음
+                await run_in_threadpool(writer.commit if completed else writer.abort)
+
+    # 첫 청크를 미리 읽어 첫 바이트 전 오류는 500으로 응답
+    chunks = audio_stream()
     try:
-        response = current_client.audio.speech.create(
-            model="tts-1",
-            voice="alloy", # 따뜻한 목소리
-            input=body.text
-        )
-        # 바이너리 데이터를 직접 반환 (프론트에서 활용)
-        from fastapi.responses import Response
-        return Response(content=response.content, media_type="audio/mpeg")
+        # 첫 바이트까지의 시간 (이후 전송 시간은 요청 지연에 포함됨)
+        with metrics.llm_call("tts", TTS_MODEL):
+            first = await chunks.__anext__()
+    except StopAsyncIteration:
+        raise HTTPException(status_code=500, detail="빈 음성이 생성되었습니다.")
     except Exception as e:
-        print(f"TTS Error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+    async def close_stream():
+        await chunks.aclose()
+
+    async def body_iterator():
+        try:
+            yield first
+            async for chunk in chunks:
+                yield chunk
+        finally:
+            await close_stream()
+
+    # 전송이 중간에 끊기면 body_iterator가, 응답 후에는 BackgroundTask가 제너레이터를 닫음 (aclose는 여러 번 불러도 됨)
+    # 끝까지 받은 경우에만 캐시되므로 스트리밍 응답에도 같은 ETag/캐시 헤더를 보냄
+    return StreamingResponse(
+        body_iterator(), media_type="audio/mpeg", headers=cache_headers, background=BackgroundTask(close_stream)
+    )
+
+SUGGEST_TITLE_PROMPT_VERSION = "1"
+SUGGEST_TITLE_CACHE_TTL = 24 * 3600
+
 @router.post("/suggest-title")
 async def suggest_title(body: dict, user_id: int = Depends(get_current_user_id)):
     """일기 내용을 바탕으로 AI 제목 3개를 추천합니다."""
-    current_client = get_openai_client()
+    current_client = get_async_openai_client()
     content = body.get("content", "")
     if not content.strip():
         raise HTTPException(status_code=400, detail="내용이 없습니다.")
     if not current_client:
         return {"titles": ["오늘의 이야기", "나의 하루", "소중한 순간"]}
+
+    # 같은 내용으로 다시 누르면 캐시된 추천을 반환
+    cache_key = llm_cache.make_key("suggest-title", "gpt-4o", SUGGEST_TITLE_PROMPT_VERSION, content[:1000])
+    cached = await llm_cache.aget("suggest-title", cache_key)
+    if cached is not None:
+        return {"titles": cached}
     
     try:
-        response = current_client.chat.completions.create(
-            model="gpt-4o",
-            messages=[{
-                "role": "user",
-                "content": (
-                    f"아래 일기 내용을 읽고, 어울리는 감성적이고 짧은 제목 3개를 추천해줘.\n"
-                    f"JSON 형식으로: {{\"titles\": [\"제목1\", \"제목2\", \"제목3\"]}}\n"
-                    f"각 제목은 15자 이내. 반드시 한국어.\n\n일기 내용:\n{content[:1000]}"
-                )
-            }],
-            response_format={"type": "json_object"},
-            max_tokens=200,
-        )
+        with metrics.llm_call("suggest-title", "gpt-4o") as call:
+            response = await current_client.chat.completions.create(
+                model="gpt-4o",
+                messages=[{
+                    "role": "user",
+                    "content": (
+                        f"아래 일기 내용을 읽고, 어울리는 감성적이고 짧은 제목 3개를 추천해줘.\n"
+                        f"JSON 형식으로: {{\"titles\": [\"제목1\", \"제목2\", \"제목3\"]}}\n"
+                        f"각 제목은 15자 이내. 반드시 한국어.\n\n일기 내용:\n{content[:1000]}"
+                    )
+                }],
+                response_format={"type": "json_object"},
+                max_tokens=200,
+            )
+            call.record(response)
         import json as _json
         result = _json.loads(response.choices[0].message.content)
-        return {"titles": result.get("titles", ["오늘의 기록"])}
+        titles = result.get("titles", ["오늘의 기록"])
+        await llm_cache.aput("suggest-title", cache_key, titles, ttl=SUGGEST_TITLE_CACHE_TTL)
+        return {"titles": titles}
     except Exception as e:
         return {"titles": ["오늘의 이야기", "나의 하루", "소중한 순간"]}
 
 @router.post("/tarot-image")
-async def generate_tarot_image(body: dict, db: Session = Depends(get_db), user_id: int = Depends(get_current_user_id)):
-    """DALL-E 3로 타로 카드 이미지를 생성합니다."""
-    current_client = get_openai_client()
-    if not current_client:
-        raise HTTPException(status_code=500, detail="OpenAI API key not configured")
-    
-    card_number = body.get("card_number", 1)
-    position = body.get("position", "현재")  # 과거, 현재, 미래
-    theme = body.get("theme", "신비로운 달빛")  # 카드 테마
-    
-    theme_prompts = {
-        "신비로운 달빛": "mystical moonlight, dark blue and silver, ethereal glowing moon",
-        "불꽃": "fire and flame, vivid red and orange, dramatic energy",
-        "자연": "lush nature, green forest, peaceful earth elements",
-        "우주": "cosmic space, nebula colors, stars and galaxies",
-    }
-    theme_detail = theme_prompts.get(theme, theme_prompts["신비로운 달빛"])
-    
-    prompt = (
-        f"A beautiful tarot card illustration, card number {card_number}, representing '{position}' position, "
-        f"themed with {theme_detail}. "
-        f"Ornate decorative border, mystical symbols, high quality digital art, vertical card format, "
-        f"no text, no words, artistic and symbolic."
-    )
-    
+async def generate_tarot_image(body: dict, request: Request, user_id: int = Depends(get_current_user_id)):
+    """타로 카드 이미지를 라이브러리(static/tarot)에서 반환합니다. 없으면 DALL-E 3로 생성해 저장합니다."""
     try:
-        response = current_client.images.generate(
-            model="dall-e-3",
-            prompt=prompt,
-            size="1024x1024",
-            quality="standard",
-            n=1
+        card_number, position, theme = tarot.normalize(
+            body.get("card_number", 1),
+            body.get("position", "현재"),  # 과거, 현재, 미래
+            body.get("theme", "신비로운 달빛")  # 카드 테마
         )
-        image_url = response.data[0].url
-        return {"image_url": image_url, "card_number": card_number, "position": position}
+    except (TypeError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    try:
+        rel = await tarot.get_or_generate(get_async_openai_client(), card_number, position, theme)
+    except LookupError:
+        raise HTTPException(status_code=500, detail="OpenAI API key not configured")
     except Exception as e:
         print(f"DALL-E Error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
+    # 프론트는 image_url을 그대로 <img src>에 쓰므로 절대 URL로 반환
+    image_url = str(request.url_for("static", path=rel))
+    return {"image_url": image_url, "card_number": card_number, "position": position}
 
 
 @router.get("/ai-chat/archive", response_model=List[schemas.AIChatArchiveResponse])
@@ -595,29 +824,42 @@ def get_ai_chat_archive(db: Session = Depends(get_db), user_id: int = Depends(ge
     ).order_by(models.AIChat.date.desc()).all()
     return chats
 
-@router.post("/ai-chat", response_model=schemas.AIChatResponse)
-def post_ai_chat(body: schemas.AIChatCreate, db: Session = Depends(get_db), user_id: int = Depends(get_current_user_id)):
-    from datetime import datetime, date
-    today = date.today().isoformat()
-    
-    # 1. 기존의 오늘 대화방 조회
+AGENT_MOODS = ["NORMAL", "HAPPY", "SAD", "COOL", "THINKING"]
+
+def _get_or_create_today_chat(db: Session, user_id: int, today: str) -> models.AIChat:
     chat = db.query(models.AIChat).filter(
         models.AIChat.user_id == user_id,
         models.AIChat.date == today
     ).first()
-    
     if not chat:
         chat = models.AIChat(user_id=user_id, date=today, messages=[])
         db.add(chat)
-        db.commit()
-        db.refresh(chat)
-    
-    current_messages = list(chat.messages) if chat.messages else []
-    current_messages.append({"role": "user", "content": body.message})
-    
-    current_client = get_openai_client()
-    
-    # 2. 오늘의 일기 데이터가 있다면 컨텍스트로 추가 (프롬프트 보강)
+        try:
+            db.commit()
+            db.refresh(chat)
+        except IntegrityError:
+            # 동시 요청이 먼저 오늘 페이지를 만든 경우 (uq_ai_chats_user_date)
+            db.rollback()
+            chat = db.query(models.AIChat).filter(
+                models.AIChat.user_id == user_id,
+                models.AIChat.date == today
+            ).first()
+    return chat
+
+AI_CHAT_HISTORY_MESSAGES = 10  # 프롬프트에 넣는 최근 메시지 수 (새 메시지 포함)
+
+def _recent_chat_messages(db: Session, chat_id: int, limit: int) -> list:
+    """최근 메시지 limit개를 오래된 순으로 (uq_ai_chat_messages_chat_seq 역방향 스캔)"""
+    rows = db.query(models.AIChatMessage.role, models.AIChatMessage.content).filter(
+        models.AIChatMessage.chat_id == chat_id
+    ).order_by(models.AIChatMessage.seq.desc()).limit(limit).all()
+    return [{"role": role, "content": content} for role, content in reversed(rows)]
+
+def _build_ai_chat_request(db: Session, user_id: int, today: str, message: str, chat_id: int) -> dict:
+    """AI 에이전트 호출 인자(messages, temperature 등)를 만듭니다."""
+    from datetime import datetime
+
+    # 오늘의 일기 데이터가 있다면 컨텍스트로 추가 (프롬프트 보강)
     diary = db.query(models.Diary).filter(
         models.Diary.user_id == user_id,
         models.Diary.created_at >= today + " 00:00:00",
@@ -634,114 +876,240 @@ def post_ai_chat(body: schemas.AIChatCreate, db: Session = Depends(get_db), user
         except Exception as e:
             print(f"Diary context error: {e}")
 
+    # 오늘의 운세 요청 시 페르소나 간섭을 원천 차단
+    is_fortune_request = message and "오늘의 운세" in message
+    
+    import random
+    random_themes = ["몽환적인 숲", "미래 지향적 사이버펑크", "따뜻한 코타츠 속", "영국식 정원", "신비로운 우주 정거장", "고전적인 타로 카페", "평화로운 시골 마을", "활기찬 뉴욕 거리"]
+    random_style = ["우아하고 품격 있는", "귀엽고 발랄한", "진중하고 신중한", "엉뚱하고 재미있는", "다정하고 따뜻한"]
+    selected_theme = random.choice(random_themes)
+    selected_style = random.choice(random_style)
+
+    if is_fortune_request:
+        # 운세 전용 시스템 프롬프트 (안사말, 마스코트 설명 일절 금지)
+        system_content = (
+            f"[SYSTEM_COMMAND_ID: {datetime.now().strftime('%Y%m%d%H%M%S')}]\n"
+            "너는 운세 데이터 생성 엔진이야. 인사말이나 안내 문구를 모두 배제해.\n"
+            "오직 아래의 세 가지 항목만 'reply' 필드에 담아. 다른 설명은 절대 추가하지 마.\n\n"
+            "### 필수 출력 항목 (반드시 이 명칭을 사용하고 줄바꿈으로 구분할 것):\n"
+            "- 행운의 색 : [구체적인 색 이름]\n"
+            "- 행운의 장소 : [장소 묘사]\n"
+            "- 행운의 한마디 : [오늘의 조언]\n\n"
+            "### 주의사항:\n"
+            f"1. 테마: {selected_theme}, 스타일: {selected_style}를 반영하여 조언을 작성해.\n"
+            "2. '안녕하세요', '물론이죠', '보안 코드' 등 어떤 부가 텍스트도 reply에 포함하지 마.\n"
+            "3. 오직 요청받은 운세 데이터만 전송해.\n"
+        )
+    else:
+        # 일반 대화 및 타로용 시스템 프롬프트
+        system_content = (
+            "너는 'HaruLog'라는 일기 앱의 마스코트인 따뜻한 구름 AI야. "
+            "사용자의 일상 대화와 고민 상담을 해줘. 친절하고 다정하며 이모지를 사용해줘.\n"
+            "1. 일상 대화: 사용자의 말에 공감하고 따뜻한 위로를 건네줘." + diary_context + "\n"
+            "2. 타로 점보기: 선택한 카드의 의미와 조언을 신비롭고 명확하게 전달해줘."
+        )
+
+    system_msg = {
+        "role": "system", 
+        "content": system_content + "\n\n**[응답 형식]**: 반드시 json 형식으로만 답해줘. 필드는 'reply' (답변 내용)와 'mood' (NORMAL, HAPPY, SAD, COOL, THINKING) 2가지야."
+    }
+    
+    # 운세 요청일 때는 이전 대화 기록을 과감히 생략
+    final_history = [] if is_fortune_request else _recent_chat_messages(db, chat_id, AI_CHAT_HISTORY_MESSAGES - 1)
+    final_history.append({"role": "user", "content": message})
+
+    return dict(
+        model="gpt-4o",
+        messages=[system_msg] + final_history,
+        response_format={ "type": "json_object" },
+        max_tokens=800,
+        temperature=1.2 if is_fortune_request else 1.0 # 온도를 다시 1.2로 상향하여 창의성 확보
+    )
+
+def _parse_ai_chat_reply(raw_content: str):
+    try:
+        result = json.loads(raw_content)
+        reply = result.get("reply", raw_content)
+        mood_val = result.get("mood", "NORMAL").upper()
+    except:
+        reply = raw_content
+        mood_val = "NORMAL"
+
+    if mood_val not in AGENT_MOODS:
+        mood_val = "NORMAL"
+    return reply, mood_val
+
+def _ai_chat_turn_updates(message: str, reply: str, mood_val: str) -> dict:
+    """이번 턴으로 바뀌는 대화 페이지 컬럼 (기분, 운세/타로 결과, 선택한 카드)"""
+    updates = {"mood": mood_val}
+    # 운세 또는 타로 결과 저장
+    if "오늘의 운세" in message:
+        updates["fortune"] = reply
+    elif "타로" in message:
+        updates["tarot"] = reply
+        import re
+        # 3장 스프레드: "과거 3번, 현재 1번, 미래 5번" 형태 파싱
+        spread_match = re.search(r"과거[:\s]*(\d+)번.*현재[:\s]*(\d+)번.*미래[:\s]*(\d+)번", message)
+        if spread_match:
+            cards = [int(spread_match.group(1)), int(spread_match.group(2)), int(spread_match.group(3))]
+            updates["selected_cards"] = cards
+            updates["selected_card"] = cards[1]  # 현재 카드를 대표 카드로
+        else:
+            # 단일 카드 파싱 (기존 방식)
+            single_match = re.search(r"타로 카드 (\d+)번", message)
+            if single_match:
+                updates["selected_card"] = int(single_match.group(1))
+    return updates
+
+def _append_ai_chat_turn(db: Session, chat_id: int, message: str, reply: str, mood_val: str):
+    """사용자 메시지와 답변을 추가하고 운세/타로 결과를 저장합니다. (commit은 호출자 몫)
+
+    message_count를 올리는 UPDATE가 대화 행을 잠그고 seq를 정하므로 동시 요청도 순서대로 쌓이고,
+    메시지는 두 행을 한 번의 INSERT로 추가합니다. (기존 메시지는 다시 쓰지 않음)
+    """
+    last_seq = db.execute(
+        update(models.AIChat).where(models.AIChat.id == chat_id)
+        .values(message_count=models.AIChat.message_count + 2, **_ai_chat_turn_updates(message, reply, mood_val))
+        .returning(models.AIChat.message_count)
+    ).scalar_one()
+    db.execute(insert(models.AIChatMessage), [
+        {"chat_id": chat_id, "seq": last_seq - 1, "role": "user", "content": message},
+        {"chat_id": chat_id, "seq": last_seq, "role": "assistant", "content": reply},
+    ])
+
+def _ai_chat_response(chat: models.AIChat, messages: list) -> dict:
+    return {
+        "messages": messages, "date": chat.date, "mood": chat.mood, "message_count": chat.message_count,
+        "fortune": chat.fortune, "tarot": chat.tarot,
+        "selected_card": chat.selected_card, "selected_cards": chat.selected_cards,
+    }
+
+def _full_ai_chat_response(db: Session, chat_id: int) -> dict:
+    """턴 저장 후 응답: 프론트가 대화 전체를 다시 그리므로 메시지를 모두 포함"""
+    chat = db.query(models.AIChat).filter(models.AIChat.id == chat_id).one()
+    return _ai_chat_response(chat, _recent_chat_messages(db, chat_id, chat.message_count))
+
+TEST_MODE_REPLY = "안녕하세요! 지금은 테스트 모드예요. OpenAI API 키를 설정하면 더 똑똑한 대화와 운세, 타로를 봐드릴 수 있어요! ✨"
+
+@router.post("/ai-chat", response_model=schemas.AIChatResponse)
+def post_ai_chat(body: schemas.AIChatCreate, db: Session = Depends(get_db), user_id: int = Depends(get_current_user_id)):
+    from datetime import date
+    today = date.today().isoformat()
+    
+    # 1. 기존의 오늘 대화방 조회
+    chat_id = _get_or_create_today_chat(db, user_id, today).id
+
+    current_client = get_openai_client()
     if not current_client:
         # API 키가 없는 경우 더미 응답
-        reply = "안녕하세요! 지금은 테스트 모드예요. OpenAI API 키를 설정하면 더 똑똑한 대화와 운세, 타로를 봐드릴 수 있어요! ✨"
-        current_messages.append({"role": "assistant", "content": reply})
-        chat.messages = current_messages
-        chat.mood = "NORMAL" # 기본 무드 설정
+        _append_ai_chat_turn(db, chat_id, body.message, TEST_MODE_REPLY, "NORMAL")
         db.commit()
-        return chat
+        return _full_ai_chat_response(db, chat_id)
         
     try:
-        # 2. 오늘의 운세 요청 시 페르소나 간섭을 원천 차단
-        is_fortune_request = body.message and "오늘의 운세" in body.message
-        
-        import random
-        random_themes = ["몽환적인 숲", "미래 지향적 사이버펑크", "따뜻한 코타츠 속", "영국식 정원", "신비로운 우주 정거장", "고전적인 타로 카페", "평화로운 시골 마을", "활기찬 뉴욕 거리"]
-        random_style = ["우아하고 품격 있는", "귀엽고 발랄한", "진중하고 신중한", "엉뚱하고 재미있는", "다정하고 따뜻한"]
-        selected_theme = random.choice(random_themes)
-        selected_style = random.choice(random_style)
-
-        if is_fortune_request:
-            # 운세 전용 시스템 프롬프트 (안사말, 마스코트 설명 일절 금지)
-            system_content = (
-                f"[SYSTEM_COMMAND_ID: {datetime.now().strftime('%Y%m%d%H%M%S')}]\n"
-                "너는 운세 데이터 생성 엔진이야. 인사말이나 안내 문구를 모두 배제해.\n"
-                "오직 아래의 세 가지 항목만 'reply' 필드에 담아. 다른 설명은 절대 추가하지 마.\n\n"
-                "### 필수 출력 항목 (반드시 이 명칭을 사용하고 줄바꿈으로 구분할 것):\n"
-                "- 행운의 색 : [구체적인 색 이름]\n"
-                "- 행운의 장소 : [장소 묘사]\n"
-                "- 행운의 한마디 : [오늘의 조언]\n\n"
-                "### 주의사항:\n"
-                f"1. 테마: {selected_theme}, 스타일: {selected_style}를 반영하여 조언을 작성해.\n"
-                "2. '안녕하세요', '물론이죠', '보안 코드' 등 어떤 부가 텍스트도 reply에 포함하지 마.\n"
-                "3. 오직 요청받은 운세 데이터만 전송해.\n"
-            )
-        else:
-            # 일반 대화 및 타로용 시스템 프롬프트
-            system_content = (
-                "너는 'HaruLog'라는 일기 앱의 마스코트인 따뜻한 구름 AI야. "
-                "사용자의 일상 대화와 고민 상담을 해줘. 친절하고 다정하며 이모지를 사용해줘.\n"
-                "1. 일상 대화: 사용자의 말에 공감하고 따뜻한 위로를 건네줘." + diary_context + "\n"
-                "2. 타로 점보기: 선택한 카드의 의미와 조언을 신비롭고 명확하게 전달해줘."
-            )
-
-        system_msg = {
-            "role": "system", 
-            "content": system_content + "\n\n**[응답 형식]**: 반드시 json 형식으로만 답해줘. 필드는 'reply' (답변 내용)와 'mood' (NORMAL, HAPPY, SAD, COOL, THINKING) 2가지야."
-        }
-        
-        # 운세 요청일 때는 이전 대화 기록을 과감히 생략
-        final_history = current_messages[-10:] if not is_fortune_request else []
-
-        response = current_client.chat.completions.create(
-            model="gpt-4o",
-            messages=[system_msg] + final_history,
-            response_format={ "type": "json_object" },
-            max_tokens=800,
-            temperature=1.2 if is_fortune_request else 1.0 # 온도를 다시 1.2로 상향하여 창의성 확보
-        )
+        # 2. 프롬프트 구성 (오늘의 일기 요약, 최근 대화, 운세/일반 대화 페르소나)
+        request_kwargs = _build_ai_chat_request(db, user_id, today, body.message, chat_id)
+        db.rollback()  # GPT 응답을 기다리는 동안 DB 커넥션을 반환
+        with metrics.llm_call("ai-chat", request_kwargs["model"]) as call:
+            response = current_client.chat.completions.create(**request_kwargs)
+            call.record(response)
         
-        raw_content = response.choices[0].message.content
-        try:
-            result = json.loads(raw_content)
-            reply = result.get("reply", raw_content)
-            mood_val = result.get("mood", "NORMAL").upper()
-        except:
-            reply = raw_content
-            mood_val = "NORMAL"
-
-        if mood_val not in ["NORMAL", "HAPPY", "SAD", "COOL", "THINKING"]:
-            mood_val = "NORMAL"
-        chat.mood = mood_val
-        
-        current_messages.append({"role": "assistant", "content": reply})
-        chat.messages = current_messages
-        
-        # 운세 또는 타로 결과 저장
-        if "오늘의 운세" in body.message:
-            chat.fortune = reply
-        elif "타로" in body.message:
-            chat.tarot = reply
-            import re
-            # 3장 스프레드: "과거 3번, 현재 1번, 미래 5번" 형태 파싱
-            spread_match = re.search(r"과거[:\s]*(\d+)번.*현재[:\s]*(\d+)번.*미래[:\s]*(\d+)번", body.message)
-            if spread_match:
-                cards = [int(spread_match.group(1)), int(spread_match.group(2)), int(spread_match.group(3))]
-                chat.selected_cards = cards
-                chat.selected_card = cards[1]  # 현재 카드를 대표 카드로
-            else:
-                # 단일 카드 파싱 (기존 방식)
-                single_match = re.search(r"타로 카드 (\d+)번", body.message)
-                if single_match:
-                    chat.selected_card = int(single_match.group(1))
-            
+        reply, mood_val = _parse_ai_chat_reply(response.choices[0].message.content)
+        _append_ai_chat_turn(db, chat_id, body.message, reply, mood_val)
         db.commit()
-        db.refresh(chat)
-        return chat
+        return _full_ai_chat_response(db, chat_id)
     except Exception as e:
         import traceback
         print(f"AI Chat error: {e}")
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"AI 대화 중 오류가 발생했습니다: {str(e)}")
 
+@router.post("/ai-chat/stream")
+def post_ai_chat_stream(body: schemas.AIChatCreate, db: Session = Depends(get_db), user_id: int = Depends(get_current_user_id)):
+    """post_ai_chat의 SSE 버전
+
+    token 이벤트로 reply 조각을 보내고, 끝나면 대화를 저장한 뒤 done 이벤트로 mood 등 최종 결과를 보냅니다.
+    중간에 연결이 끊기거나 오류가 나면 아무것도 저장하지 않습니다.
+    """
+    from datetime import date
+    today = date.today().isoformat()
+
+    chat_id = _get_or_create_today_chat(db, user_id, today).id
+
+    current_client = get_openai_client()
+    request_kwargs = _build_ai_chat_request(db, user_id, today, body.message, chat_id) if current_client else None
+    db.rollback()  # 스트리밍 동안 DB 커넥션을 잡고 있지 않도록 반환
+
+    def save_turn(reply: str, mood_val: str) -> dict:
+        save_db = SessionLocal()
+        try:
+            _append_ai_chat_turn(save_db, chat_id, body.message, reply, mood_val)
+            save_db.commit()
+            saved = save_db.query(models.AIChat).filter(models.AIChat.id == chat_id).one()
+            result = _ai_chat_response(saved, messages=[])
+            del result["messages"]  # 스트림 클라이언트는 답변을 이미 받았으므로 대화 전체는 보내지 않음
+            return {"reply": reply, **result}
+        finally:
+            save_db.close()
+
+    def event_stream():
+        if not current_client:
+            yield sse("token", {"text": TEST_MODE_REPLY})
+            yield sse("done", save_turn(TEST_MODE_REPLY, "NORMAL"))
+            return
+        stream = None
+        try:
+            with metrics.llm_call("ai-chat-stream", request_kwargs["model"]) as call:
+                stream = current_client.chat.completions.create(
+                    **request_kwargs, stream=True, stream_options={"include_usage": True}
+                )
+                reply_streamer = JSONStringFieldStreamer("reply")
+                for chunk in stream:
+                    call.record(chunk)  # usage는 마지막 청크에만 포함됨
+                    delta = chunk.choices[0].delta.content if chunk.choices else None
+                    if not delta:
+                        continue
+                    text = reply_streamer.feed(delta)
+                    if text:
+                        yield sse("token", {"text": text})
+            # 스트림이 끝까지 온 경우에만 완성된 JSON을 파싱해서 한 번에 저장
+            reply, mood_val = _parse_ai_chat_reply(reply_streamer.raw)
+            yield sse("done", save_turn(reply, mood_val))
+        except Exception as e:
+            import traceback
+            print(f"AI Chat stream error: {e}")
+            traceback.print_exc()
+            yield sse("error", {"detail": f"AI 대화 중 오류가 발생했습니다: {str(e)}"})
+        finally:
+            if stream is not None:
+                stream.close()
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream", headers=SSE_HEADERS)
+
 @router.get("/ai-chat/{date_str}", response_model=schemas.AIChatResponse)
-def get_ai_chat(date_str: str, db: Session = Depends(get_db), user_id: int = Depends(get_current_user_id)):
+def get_ai_chat(
+    date_str: str,
+    response: Response,
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[int] = Query(None, ge=1),
+    db: Session = Depends(get_db),
+    user_id: int = Depends(get_current_user_id)
+):
+    """그날 대화의 최근 메시지 limit개 (오래된 순). 더 이전 메시지가 있으면 X-Next-Cursor 헤더로
+    cursor(이 seq보다 앞의 메시지)를 전달합니다."""
     chat = db.query(models.AIChat).filter(
         models.AIChat.user_id == user_id,
         models.AIChat.date == date_str
     ).first()
     if not chat:
         return {"messages": [], "date": date_str}
-    return chat
+    query = db.query(models.AIChatMessage.seq, models.AIChatMessage.role, models.AIChatMessage.content).filter(
+        models.AIChatMessage.chat_id == chat.id
+    )
+    if cursor:
+        query = query.filter(models.AIChatMessage.seq < cursor)
+    rows = list(reversed(query.order_by(models.AIChatMessage.seq.desc()).limit(limit).all()))
+    if rows and rows[0].seq > 1:
+        response.headers["X-Next-Cursor"] = str(rows[0].seq)
+    messages = [{"role": row.role, "content": row.content} for row in rows]
+    return _ai_chat_response(chat, messages)
@@ -1,11 +1,71 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool, QueuePool
 import os
+import threading
+import time
 
 SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL", "postgresql://jayun@localhost:5432/mindtrace")
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
+# 커넥션 풀 설정 (워커 프로세스마다 pool_size + max_overflow 개까지 연결)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))      # 커넥션을 기다리는 최대 초
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))      # 이보다 오래된 커넥션은 새로 연결 (-1 = 사용 안 함)
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "1") != "0"     # 꺼낼 때 끊긴 커넥션인지 확인
+# PgBouncer(transaction pooling) 뒤에서 실행할 때: 앱 쪽 풀은 두지 않고 PgBouncer에 맡김
+# (migrate.py는 세션 단위 advisory lock을 쓰므로 PgBouncer를 거치지 않는 주소로 실행)
+DB_PGBOUNCER = os.getenv("DB_PGBOUNCER", "0") == "1"
+
+class TimedQueuePool(QueuePool):
+    """커넥션을 꺼낼 때까지 기다린 시간과 타임아웃 횟수를 기록하는 QueuePool"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._stats_lock = threading.Lock()
+        self.checkouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self.timeouts = 0
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            with self._stats_lock:
+                self.timeouts += 1
+            raise
+        finally:
+            waited = time.perf_counter() - started
+            with self._stats_lock:
+                self.checkouts += 1
+                self.wait_seconds_total += waited
+                self.wait_seconds_max = max(self.wait_seconds_max, waited)
+
+def _engine_kwargs() -> dict:
+    if SQLALCHEMY_DATABASE_URL.startswith("sqlite") and ":memory:" in SQLALCHEMY_DATABASE_URL:
+        return {}
+    if DB_PGBOUNCER:
+        return {"poolclass": NullPool}
+    return {
+        "poolclass": TimedQueuePool,
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+
+engine = create_engine(SQLALCHEMY_DATABASE_URL, **_engine_kwargs())
+
+if engine.dialect.name == "sqlite":
+    # 로컬 테스트용 SQLite는 FK(ON DELETE CASCADE)가 기본으로 꺼져 있음
+    @event.listens_for(engine, "connect")
+    def _enable_sqlite_fk(dbapi_connection, connection_record):
+        dbapi_connection.execute("PRAGMA foreign_keys=ON")
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
@@ -16,3 +76,27 @@ def get_db():
         yield db
     finally:
         db.close()
+
+def pool_stats() -> dict:
+    """현재 프로세스의 커넥션 풀 상태 (풀 크기 조정용)"""
+    pool = engine.pool
+    stats = {"pool": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        stats.update({
+            "size": pool.size(),
+            "checked_in": pool.checkedin(),
+            "checked_out": pool.checkedout(),
+            "overflow": max(pool.overflow(), 0),
+            "max_overflow": pool._max_overflow,
+            "timeout_seconds": pool.timeout(),
+        })
+    if isinstance(pool, TimedQueuePool):
+        with pool._stats_lock:
+            stats.update({
+                "checkouts": pool.checkouts,
+                "wait_seconds_total": round(pool.wait_seconds_total, 4),
+                "wait_seconds_avg": round(pool.wait_seconds_total / pool.checkouts, 6) if pool.checkouts else 0.0,
+                "wait_seconds_max": round(pool.wait_seconds_max, 4),
+                "timeouts": pool.timeouts,
+            })
+    return stats
@@ -0,0 +1,63 @@
+"""기본 감정 5개와 감정 점수 정규화
+
+분석 JSON의 감정 키는 프롬프트 버전에 따라 한글/영문이 섞여 있습니다. (예전 reanalyze.py / fix_analysis.py 등)
+저장할 때 normalize()로 기본 감정 5개의 점수로 바꿔 emotion_analyses의 실수 컬럼에 넣고,
+통계/추이/필터는 이 컬럼을 SQL로 집계합니다. emotions JSON은 원본 그대로 보관합니다.
+"""
+from app import models
+
+# 기본 감정 -> emotion_analyses 컬럼 이름 (순서 고정: 추이 행렬의 열 순서)
+EMOTION_COLUMNS = {
+    "기쁨": "joy",
+    "슬픔": "sadness",
+    "불안": "anxiety",
+    "분노": "anger",
+    "평온": "calm",
+}
+EMOTIONS = list(EMOTION_COLUMNS)
+
+# 예전 프롬프트가 만든 키 -> 기본 감정 (소문자로 비교)
+ALIASES = {
+    "joy": "기쁨", "happiness": "기쁨", "happy": "기쁨", "행복": "기쁨",
+    "sadness": "슬픔", "sad": "슬픔",
+    "anxiety": "불안", "fear": "불안", "worry": "불안", "걱정": "불안",
+    "anger": "분노", "angry": "분노", "화남": "분노",
+    "calm": "평온", "neutral": "평온", "peace": "평온", "편안": "평온",
+}
+
+def canonical(key) -> str:
+    """감정 키 -> 기본 감정 이름 (모르는 키면 None)"""
+    key = str(key).strip()
+    if key in EMOTION_COLUMNS:
+        return key
+    return ALIASES.get(key.lower())
+
+def normalize(emotions) -> dict:
+    """{"joy": 0.8, "슬픔": "0.1", "surprise": 0.3} -> {"기쁨": 0.8, "슬픔": 0.1, "불안": 0.0, "분노": 0.0, "평온": 0.0}
+
+    같은 감정으로 모이는 키는 더하고, 숫자가 아닌 값과 모르는 키는 버립니다.
+    """
+    scores = dict.fromkeys(EMOTIONS, 0.0)
+    if not isinstance(emotions, dict):
+        return scores
+    for key, value in emotions.items():
+        name = canonical(key)
+        if not name:
+            continue
+        try:
+            scores[name] += float(value)
+        except (TypeError, ValueError):
+            continue
+    return scores
+
+def column_values(emotions) -> dict:
+    """EmotionAnalysis 컬럼 값: {"joy": 0.8, "sadness": 0.1, ...}"""
+    return {EMOTION_COLUMNS[name]: score for name, score in normalize(emotions).items()}
+
+def column(name: str):
+    """기본 감정 이름(또는 별칭) -> EmotionAnalysis 컬럼 (모르는 감정이면 None)"""
+    name = canonical(name)
+    return getattr(models.EmotionAnalysis, EMOTION_COLUMNS[name]) if name else None
+
+def score_columns() -> list:
+    return [getattr(models.EmotionAnalysis, col) for col in EMOTION_COLUMNS.values()]
@@ -0,0 +1,267 @@
+"""업로드 이미지 저장/파생 이미지 생성
+
+- 원본은 회전을 반영하고 EXIF/XMP/주석 등 메타데이터(위치 정보 등)를 지운 뒤 다시 저장하고,
+  그 내용의 해시를 파일명으로 저장 (같은 사진을 다시 올리면 같은 파일을 재사용)
+- JPEG/PNG/WebP는 같은 형식으로, 그 밖에 Pillow가 읽을 수 있는 정지 이미지(TIFF, BMP 등)는 JPEG(투명하면 PNG)로 변환.
+  움직이는 이미지나 읽을 수 없는 형식(HEIC 등)은 메타데이터를 지울 수 없으므로 415로 거절
+- 업로드 응답 후 백그라운드에서 thumb/medium WebP(미지원 시 JPEG)를 생성
+- 파일명이 내용으로 정해지므로 /uploads는 immutable 캐시 헤더로 서빙
+
+Pillow가 없으면 메타데이터를 지울 수 없으므로 업로드를 받지 않습니다.
+아직 생성되지 않은 파생 이미지 URL은 원본으로 대체되어 서빙됩니다.
+"""
+import glob
+import hashlib
+import os
+import re
+import tempfile
+
+from fastapi import HTTPException, UploadFile
+from fastapi.staticfiles import StaticFiles
+from starlette.concurrency import run_in_threadpool
+from starlette.exceptions import HTTPException as StarletteHTTPException
+from starlette.responses import FileResponse
+
+from app import models
+from app.database import SessionLocal
+
+try:
+    from PIL import Image, ImageOps, features
+except ImportError:  # Pillow는 선택 의존성
+    Image = None
+
+UPLOAD_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "uploads")
+IMAGE_MAX_UPLOAD_MB = int(os.getenv("IMAGE_MAX_UPLOAD_MB", "20"))
+CHUNK_BYTES = 1024 * 1024
+# 파생 이미지 이름 -> 긴 변 최대 픽셀
+DERIVATIVES = {"thumb": 320, "medium": 1024}
+DERIVATIVE_EXT = "webp" if Image is not None and features.check("webp") else "jpg"
+# 같은 형식으로 다시 저장하는 형식 -> 확장자 (그 밖의 정지 이미지는 JPEG/PNG로 변환)
+STRIPPABLE_FORMATS = {"JPEG": "jpg", "PNG": "png", "WEBP": "webp"}
+KEEP_INFO = ("icc_profile", "transparency")  # 다시 저장할 때 남기는 정보 (색 재현/투명도)
+IMMUTABLE_CACHE = "public, max-age=31536000, immutable"
+
+_derivative_re = re.compile(r"^(?P<stem>.+)_(?P<kind>thumb|medium)\.(webp|jpg)$")
+_hashed_re = re.compile(r"^[0-9a-f]{32}(_(thumb|medium))?\.\w+$")
+
+def _strip_metadata(path: str):
+    """회전 정보를 픽셀에 반영하고 메타데이터를 버린 임시 파일의 (경로, 확장자)를 반환
+
+    메타데이터를 지울 수 없는 이미지(움직이는 이미지, 읽을 수 없는 형식)면 ValueError
+    """
+    if Image is None:
+        raise RuntimeError("Pillow is not installed")
+    try:
+        with Image.open(path) as img:
+            fmt = img.format
+            if getattr(img, "is_animated", False):
+                raise ValueError(f"animated {fmt} images are not supported")
+            upright = ImageOps.exif_transpose(img)
+            upright.load()
+    except ValueError:
+        raise
+    except Exception as e:  # UnidentifiedImageError, DecompressionBombError, 손상된 파일 등
+        raise ValueError(f"unreadable image: {e}") from e
+
+    # JPEG 주석(COM), GIF 주석 등은 info에 남아 있다가 다시 저장할 때 함께 쓰이므로 비움
+    upright.info = {k: v for k, v in upright.info.items() if k in KEEP_INFO}
+    if fmt not in STRIPPABLE_FORMATS:
+        has_alpha = "A" in upright.mode or "transparency" in upright.info
+        fmt = "PNG" if has_alpha else "JPEG"
+    params = {"quality": 90} if fmt in ("JPEG", "WEBP") else {}
+    if fmt == "JPEG" and upright.mode not in ("RGB", "L"):
+        upright = upright.convert("RGB")
+    elif fmt == "PNG" and upright.mode not in ("1", "L", "LA", "P", "RGB", "RGBA", "I", "I;16"):
+        upright = upright.convert("RGBA")
+    elif "icc_profile" in upright.info:
+        # 색 공간을 바꾸지 않은 경우에만 원래 ICC 프로필 유지 (CMYK 프로필을 RGB에 붙이지 않도록)
+        params["icc_profile"] = upright.info["icc_profile"]
+    return _save_temp(upright, UPLOAD_DIR, fmt, **params), STRIPPABLE_FORMATS[fmt]
+
+def _hashed_name(path: str, ext: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_BYTES), b""):
+            digest.update(chunk)
+    return f"{digest.hexdigest()[:32]}.{ext}"
+
+def _finalize_upload(tmp_path: str) -> str:
+    """메타데이터를 지운 내용의 해시로 최종 파일명을 정하고 옮깁니다. (스레드풀에서 실행)
+
+    받은 파일(tmp_path)은 그대로 공개하지 않고 항상 지웁니다.
+    """
+    try:
+        clean_path, ext = _strip_metadata(tmp_path)
+    finally:
+        os.remove(tmp_path)
+    filename = _hashed_name(clean_path, ext)
+    final_path = os.path.join(UPLOAD_DIR, filename)
+    if os.path.exists(final_path):
+        os.remove(clean_path)
+    else:
+        os.replace(clean_path, final_path)
+    return filename
+
+async def store_upload(file: UploadFile) -> str:
+    """업로드를 메타데이터 제거 후 해시 파일명으로 저장하고 파일명을 반환합니다. 같은 내용이 이미 있으면 그 파일을 사용
+
+    공개 URL(immutable 캐시)이 생기기 전에 메타데이터를 지우므로, 그 URL의 내용은 바뀌지 않습니다.
+    확장자는 올린 파일 이름이 아니라 저장한 형식으로 정합니다.
+    """
+    if Image is None:
+        raise HTTPException(status_code=503, detail="이미지 처리를 사용할 수 없어 업로드를 받을 수 없어요.")
+    os.makedirs(UPLOAD_DIR, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=UPLOAD_DIR, suffix=".part")
+    size = 0
+    try:
+        with os.fdopen(fd, "wb") as f:
+            while True:
+                chunk = await file.read(CHUNK_BYTES)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > IMAGE_MAX_UPLOAD_MB * 1024 * 1024:
+                    raise HTTPException(status_code=413, detail=f"이미지는 {IMAGE_MAX_UPLOAD_MB}MB까지 업로드할 수 있어요.")
+                await run_in_threadpool(f.write, chunk)
+        try:
+            return await run_in_threadpool(_finalize_upload, tmp_path)
+        except ValueError as e:
+            print(f"Upload rejected ({file.filename}): {e}")
+            raise HTTPException(
+                status_code=415, detail="지원하지 않는 이미지 형식이에요. JPEG, PNG, WebP 사진을 올려 주세요."
+            )
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def derivative_name(filename: str, kind: str) -> str:
+    return f"{os.path.splitext(filename)[0]}_{kind}.{DERIVATIVE_EXT}"
+
+def derivative_url(image_url: str, kind: str):
+    """/uploads/abc.jpg -> /uploads/abc_thumb.webp (업로드 이미지가 아니면 그대로)"""
+    if not image_url or not image_url.startswith("/uploads/"):
+        return image_url
+    return "/uploads/" + derivative_name(image_url.rsplit("/", 1)[-1], kind)
+
+def image_urls(filename: str) -> dict:
+    url = f"/uploads/{filename}"
+    return {"original": url, **{kind: derivative_url(url, kind) for kind in DERIVATIVES}}
+
+def _save_temp(img, directory: str, fmt: str, **params) -> str:
+    # 같은 파일을 만드는 작업이 동시에 돌아도 임시 파일이 겹치지 않도록 mkstemp 사용
+    fd, tmp = tempfile.mkstemp(dir=directory, suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            img.save(f, fmt, **params)
+    except BaseException:
+        os.remove(tmp)
+        raise
+    return tmp
+
+def _save_atomic(img, path: str, fmt: str, **params):
+    os.replace(_save_temp(img, os.path.dirname(path), fmt, **params), path)
+
+def process_image(filename: str):
+    """파생 이미지(thumb/medium) 생성 (BackgroundTasks에서 실행). 원본은 store_upload에서 이미 EXIF 제거됨"""
+    if Image is None:
+        return
+    path = os.path.join(UPLOAD_DIR, filename)
+    targets = {kind: os.path.join(UPLOAD_DIR, derivative_name(filename, kind)) for kind in DERIVATIVES}
+    if all(os.path.exists(p) for p in targets.values()):
+        return
+    try:
+        with Image.open(path) as img:
+            # 움짤은 첫 프레임, EXIF 제거를 못 한 원본도 회전은 반영
+            upright = ImageOps.exif_transpose(img)
+            upright.load()
+
+        base = upright.convert("RGBA" if DERIVATIVE_EXT == "webp" and upright.mode in ("RGBA", "LA", "P") else "RGB")
+        for kind, max_side in DERIVATIVES.items():
+            resized = base.copy()
+            resized.thumbnail((max_side, max_side), Image.LANCZOS)
+            if DERIVATIVE_EXT == "webp":
+                _save_atomic(resized, targets[kind], "WEBP", quality=80, method=4)
+            else:
+                _save_atomic(resized.convert("RGB"), targets[kind], "JPEG", quality=82, optimize=True, progressive=True)
+    except Exception as e:
+        print(f"Image processing failed for {filename}: {e}")
+
+def remove_upload(db, image_url: str) -> bool:
+    """다른 일기가 같은 파일(중복 제거)을 쓰지 않으면 원본과 파생 이미지를 삭제합니다."""
+    if not image_url or not image_url.startswith("/uploads/"):
+        return False
+    if db.query(models.Diary.id).filter(models.Diary.image_url == image_url).first():
+        return False
+    filename = image_url.rsplit("/", 1)[-1]
+    removed = False
+    for path in [os.path.join(UPLOAD_DIR, filename)] + [os.path.join(UPLOAD_DIR, derivative_name(filename, k)) for k in DERIVATIVES]:
+        try:
+            os.remove(path)
+            removed = True
+        except FileNotFoundError:
+            pass
+    return removed
+
+def restrip_upload(db, filename: str):
+    """메타데이터 제거 이전에 올라온 원본을 다시 저장하고 새 해시 이름으로 옮깁니다. (commit 포함)
+
+    새 파일명을 반환하고, 이미 깨끗하면 None. 지울 수 없는 형식이면 ValueError (파일은 그대로 둠)
+    """
+    path = os.path.join(UPLOAD_DIR, filename)
+    clean_path, ext = _strip_metadata(path)
+    new_name = _hashed_name(clean_path, ext)
+    if new_name == filename:
+        os.remove(clean_path)
+        return None
+    new_path = os.path.join(UPLOAD_DIR, new_name)
+    if os.path.exists(new_path):
+        os.remove(clean_path)
+    else:
+        os.replace(clean_path, new_path)
+    # 새 파일을 가리키도록 바꾼 뒤에 예전 파일을 지움
+    db.query(models.Diary).filter(models.Diary.image_url == f"/uploads/{filename}").update(
+        {models.Diary.image_url: f"/uploads/{new_name}"}, synchronize_session=False
+    )
+    db.commit()
+    for old in [path] + [os.path.join(UPLOAD_DIR, derivative_name(filename, k)) for k in DERIVATIVES]:
+        try:
+            os.remove(old)
+        except FileNotFoundError:
+            pass
+    return new_name
+
+def cleanup_uploads(image_urls: list):
+    """일기 삭제 후 참조가 남지 않은 이미지 파일 정리 (BackgroundTasks에서 실행)"""
+    db = SessionLocal()
+    try:
+        for image_url in image_urls:
+            try:
+                remove_upload(db, image_url)
+            except Exception as e:
+                print(f"Upload cleanup failed for {image_url}: {e}")
+    finally:
+        db.close()
+
+class UploadStaticFiles(StaticFiles):
+    """/uploads 서빙: 해시 파일명은 immutable 캐시, 아직 생성되지 않은 파생 이미지는 원본으로 대체"""
+
+    def file_response(self, full_path, stat_result, scope, status_code: int = 200):
+        response = super().file_response(full_path, stat_result, scope, status_code)
+        name = os.path.basename(str(full_path))
+        response.headers["Cache-Control"] = IMMUTABLE_CACHE if _hashed_re.match(name) else "public, max-age=3600"
+        return response
+
+    async def get_response(self, path: str, scope):
+        try:
+            return await super().get_response(path, scope)
+        except StarletteHTTPException as e:
+            match = _derivative_re.match(os.path.basename(path))
+            if e.status_code != 404 or not match or os.path.dirname(path):
+                raise
+            originals = [p for p in glob.glob(os.path.join(self.directory, glob.escape(match["stem"]) + ".*"))
+                         if not _derivative_re.match(os.path.basename(p)) and not p.endswith(".part")]
+            if not originals:
+                raise
+            # 파생 이미지가 생기면 그걸 받도록 캐시하지 않음
+            return FileResponse(originals[0], headers={"Cache-Control": "no-cache"})
@@ -0,0 +1,183 @@
+"""일기 감정 분석 백그라운드 작업 큐
+
+analysis_jobs 테이블을 작업 큐로 사용합니다. create_diary는 작업 행만 추가하고 곧바로 응답하며,
+워커 스레드들이 `FOR UPDATE SKIP LOCKED`로 작업을 하나씩 가져가 GPT 분석을 수행합니다.
+실패한 작업은 지수 백오프로 재시도되고, 워커가 죽어 running 상태로 남은 작업은
+임대 시간(lease)이 지나면 다시 pending으로 돌아갑니다.
+"""
+import os
+import threading
+import traceback
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy.orm import Session
+
+from app import models
+from app.analysis import request_analysis, save_analysis
+from app.database import SessionLocal
+from app.llm import get_openai_client
+
+WORKER_COUNT = int(os.getenv("ANALYSIS_WORKERS", "4"))
+MAX_ATTEMPTS = int(os.getenv("ANALYSIS_MAX_ATTEMPTS", "3"))
+POLL_INTERVAL = float(os.getenv("ANALYSIS_POLL_INTERVAL", "2.0"))
+LEASE_SECONDS = int(os.getenv("ANALYSIS_LEASE_SECONDS", "300"))
+RETRY_BASE_SECONDS = 30
+
+# 작업 상태 (Diary.analysis_status와 동일한 값 사용)
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+def _now():
+    return datetime.now(timezone.utc)
+
+def enqueue_analysis(db: Session, diary: models.Diary) -> models.AnalysisJob:
+    """일기 분석 작업을 추가합니다. 일기와 같은 트랜잭션에서 commit되도록 호출자가 commit합니다."""
+    diary.analysis_status = PENDING
+    job = models.AnalysisJob(diary=diary, status=PENDING, attempts=0, run_after=_now())
+    db.add(job)
+    return job
+
+def claim_next_job(db: Session):
+    """실행 가능한 작업 하나를 잠그고 running으로 바꾼 뒤 (job_id, diary_id)를 반환합니다. 없으면 None."""
+    job = db.query(models.AnalysisJob).filter(
+        models.AnalysisJob.status == PENDING,
+        models.AnalysisJob.run_after <= _now()
+    ).order_by(models.AnalysisJob.id).with_for_update(skip_locked=True).first()
+    if not job:
+        db.rollback()
+        return None
+
+    job.status = RUNNING
+    job.attempts = (job.attempts or 0) + 1
+    job.locked_at = _now()
+    claimed = (job.id, job.diary_id)
+    db.query(models.Diary).filter(models.Diary.id == job.diary_id).update(
+        {"analysis_status": RUNNING}, synchronize_session=False
+    )
+    db.commit()
+    return claimed
+
+def recover_stale_jobs(db: Session) -> int:
+    """임대 시간이 지난 running 작업(워커 크래시 등)을 pending으로 되돌립니다."""
+    cutoff = _now() - timedelta(seconds=LEASE_SECONDS)
+    count = db.query(models.AnalysisJob).filter(
+        models.AnalysisJob.status == RUNNING,
+        models.AnalysisJob.locked_at < cutoff
+    ).update({"status": PENDING, "locked_at": None}, synchronize_session=False)
+    db.commit()
+    if count:
+        print(f"Analysis queue: recovered {count} stale job(s)")
+    return count
+
+def _finish_job(job_id: int, diary_id: int, analysis_data: dict = None, error: str = None):
+    db = SessionLocal()
+    try:
+        job = db.query(models.AnalysisJob).filter(models.AnalysisJob.id == job_id).with_for_update().first()
+        if not job:
+            return
+        if analysis_data is not None:
+            save_analysis(db, diary_id, analysis_data)
+            job.status = DONE
+            job.last_error = None
+        elif job.attempts >= MAX_ATTEMPTS:
+            job.status = FAILED
+            job.last_error = error
+        else:
+            job.status = PENDING
+            job.last_error = error
+            job.run_after = _now() + timedelta(seconds=RETRY_BASE_SECONDS * 2 ** (job.attempts - 1))
+        job.locked_at = None
+        db.query(models.Diary).filter(models.Diary.id == diary_id).update(
+            {"analysis_status": job.status}, synchronize_session=False
+        )
+        db.commit()
+    finally:
+        db.close()
+
+def run_job(job_id: int, diary_id: int):
+    """작업 하나를 실행합니다. GPT 호출 동안에는 DB 커넥션을 잡고 있지 않습니다."""
+    db = SessionLocal()
+    try:
+        diary = db.query(models.Diary.title, models.Diary.content).filter(models.Diary.id == diary_id).first()
+    finally:
+        db.close()
+
+    if not diary:
+        _finish_job(job_id, diary_id, error="diary not found")
+        return
+
+    client = get_openai_client()
+    if not client:
+        _finish_job(job_id, diary_id, error="OpenAI API key not configured")
+        return
+
+    try:
+        analysis_data = request_analysis(client, diary.title, diary.content)
+    except Exception as e:
+        print(f"AI Analysis failed (diary {diary_id}, job {job_id}): {e}")
+        _finish_job(job_id, diary_id, error=str(e))
+        return
+    _finish_job(job_id, diary_id, analysis_data=analysis_data)
+
+class AnalysisWorkerPool:
+    """고정 크기 워커 스레드 풀. notify()로 새 작업이 들어왔음을 알리면 폴링을 기다리지 않고 바로 처리합니다."""
+
+    def __init__(self, size: int = WORKER_COUNT):
+        self.size = size
+        self._threads = []
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+
+    def start(self):
+        db = SessionLocal()
+        try:
+            recover_stale_jobs(db)
+        except Exception as e:
+            print(f"Analysis queue: recovery failed: {e}")
+        finally:
+            db.close()
+
+        for i in range(self.size):
+            t = threading.Thread(target=self._loop, name=f"analysis-worker-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def stop(self, timeout: float = 5.0):
+        self._stopping.set()
+        self._wakeup.set()
+        for t in self._threads:
+            t.join(timeout)
+        self._threads = []
+
+    def notify(self):
+        self._wakeup.set()
+
+    def _loop(self):
+        idle_rounds = 0
+        while not self._stopping.is_set():
+            job = None
+            db = SessionLocal()
+            try:
+                job = claim_next_job(db)
+                # 가끔씩 멈춘 작업도 회수 (다른 프로세스의 워커가 죽은 경우)
+                idle_rounds = idle_rounds + 1 if not job else 0
+                if idle_rounds and idle_rounds % 30 == 0:
+                    recover_stale_jobs(db)
+            except Exception as e:
+                print(f"Analysis queue: claim failed: {e}")
+            finally:
+                db.close()
+
+            if job:
+                try:
+                    run_job(*job)
+                except Exception:
+                    traceback.print_exc()
+                continue
+
+            self._wakeup.wait(POLL_INTERVAL)
+            self._wakeup.clear()
+
+worker_pool = AnalysisWorkerPool()
@@ -0,0 +1,66 @@
+"""OpenAI 클라이언트 (프로세스당 하나씩, 처음 사용할 때 생성)
+
+클라이언트를 매 요청마다 만들면 HTTP 커넥션 풀과 TLS 핸드셰이크도 매번 새로 생기므로
+동기/비동기 클라이언트를 각각 하나만 만들어 재사용합니다.
+
+- async def 엔드포인트는 get_async_openai_client()를 await로 사용 (이벤트 루프를 막지 않음)
+- def 엔드포인트, 워커 스레드, 스크립트는 get_openai_client() 사용
+
+OPENAI_BASE_URL을 지정하면 OpenAI 호환 서버(로컬 스텁, 프록시 등)로 요청을 보냅니다.
+이 경우 API 키가 없어도 임의 키로 클라이언트를 만듭니다.
+"""
+import os
+import threading
+
+from openai import AsyncOpenAI, OpenAI
+
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL") or None
+OPENAI_TIMEOUT = float(os.getenv("OPENAI_TIMEOUT", "60"))
+OPENAI_MAX_RETRIES = int(os.getenv("OPENAI_MAX_RETRIES", "2"))
+
+_lock = threading.Lock()
+_client = None
+_async_client = None
+
+def _api_key():
+    api_key = os.getenv("OPENAI_API_KEY")
+    if not api_key or api_key.startswith("your_"):
+        return "stub" if OPENAI_BASE_URL else None
+    return api_key
+
+def _client_kwargs(api_key: str) -> dict:
+    return dict(api_key=api_key, base_url=OPENAI_BASE_URL, timeout=OPENAI_TIMEOUT, max_retries=OPENAI_MAX_RETRIES)
+
+def get_openai_client():
+    """공유 동기 클라이언트. API 키가 없으면 None."""
+    global _client
+    if _client is None:
+        api_key = _api_key()
+        if not api_key:
+            return None
+        with _lock:
+            if _client is None:
+                _client = OpenAI(**_client_kwargs(api_key))
+    return _client
+
+def get_async_openai_client():
+    """공유 비동기 클라이언트. API 키가 없으면 None."""
+    global _async_client
+    if _async_client is None:
+        api_key = _api_key()
+        if not api_key:
+            return None
+        with _lock:
+            if _async_client is None:
+                _async_client = AsyncOpenAI(**_client_kwargs(api_key))
+    return _async_client
+
+async def close_clients():
+    """앱 종료 시 커넥션 풀 정리"""
+    global _client, _async_client
+    if _async_client is not None:
+        await _async_client.close()
+        _async_client = None
+    if _client is not None:
+        _client.close()
+        _client = None
@@ -0,0 +1,136 @@
+"""결정적인 AI 호출 결과 캐시
+
+(엔드포인트, 모델, 프롬프트 버전, 입력 해시)를 키로 GPT 응답을 저장합니다.
+1단계는 프로세스 메모리 LRU, 2단계는 llm_cache_entries 테이블이며 TTL이 지나면 무시되고
+테이블 전체 크기가 LLM_CACHE_MAX_BYTES를 넘으면 가장 오래 사용되지 않은 항목부터 지웁니다.
+프롬프트를 바꾸면 호출하는 쪽의 프롬프트 버전을 올려 예전 결과가 재사용되지 않게 합니다.
+"""
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+from starlette.concurrency import run_in_threadpool
+
+from app import metrics, models
+from app.cache import TTLCache
+from app.database import SessionLocal
+
+ENABLED = os.getenv("LLM_CACHE_ENABLED", "1") != "0"
+MEMORY_ITEMS = int(os.getenv("LLM_CACHE_MEMORY_ITEMS", "2000"))
+MEMORY_TTL = int(os.getenv("LLM_CACHE_MEMORY_TTL", "3600"))
+MAX_BYTES = int(os.getenv("LLM_CACHE_MAX_BYTES", str(100 * 1024 * 1024)))
+EVICT_EVERY = 50  # put N번마다 용량 확인
+
+_memory = TTLCache(maxsize=MEMORY_ITEMS, ttl=MEMORY_TTL)
+_lock = threading.Lock()
+_puts_since_evict = 0
+
+def make_key(endpoint: str, model: str, prompt_version: str, payload) -> str:
+    raw = json.dumps([endpoint, model, prompt_version, payload], ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+def _now():
+    return datetime.now(timezone.utc)
+
+def get(endpoint: str, key: str):
+    """캐시된 값 또는 None"""
+    if not ENABLED:
+        return None
+    value = _memory.get(key)
+    if value is not None:
+        metrics.LLM_CACHE_LOOKUPS.inc(endpoint, "memory_hit")
+        return value
+
+    db = SessionLocal()
+    try:
+        entry = db.query(models.LLMCacheEntry).filter(
+            models.LLMCacheEntry.key == key,
+            models.LLMCacheEntry.expires_at > _now()
+        ).first()
+        if entry is None:
+            metrics.LLM_CACHE_LOOKUPS.inc(endpoint, "miss")
+            return None
+        entry.last_hit_at = _now()
+        expires_at = entry.expires_at if entry.expires_at.tzinfo else entry.expires_at.replace(tzinfo=timezone.utc)
+        value, remaining = entry.value, (expires_at - _now()).total_seconds()
+        db.commit()
+    except Exception as e:
+        print(f"LLM cache read failed: {e}")
+        metrics.LLM_CACHE_LOOKUPS.inc(endpoint, "miss")
+        return None
+    finally:
+        db.close()
+
+    _memory.set(key, value, ttl=remaining)
+    metrics.LLM_CACHE_LOOKUPS.inc(endpoint, "db_hit")
+    return value
+
+def put(endpoint: str, key: str, value, ttl: int):
+    if not ENABLED or value is None:
+        return
+    global _puts_since_evict
+    _memory.set(key, value, ttl=ttl)
+    size = len(json.dumps(value, ensure_ascii=False).encode())
+    db = SessionLocal()
+    try:
+        now = _now()
+        db.merge(models.LLMCacheEntry(
+            key=key, endpoint=endpoint, value=value, size=size,
+            created_at=now, last_hit_at=now, expires_at=now + timedelta(seconds=ttl)
+        ))
+        db.commit()
+        metrics.LLM_CACHE_STORES.inc(endpoint)
+        with _lock:
+            _puts_since_evict += 1
+            should_evict = _puts_since_evict >= EVICT_EVERY
+            if should_evict:
+                _puts_since_evict = 0
+        if should_evict:
+            evict(db)
+    except IntegrityError:
+        # 같은 키를 다른 워커가 동시에 저장한 경우
+        db.rollback()
+    except Exception as e:
+        db.rollback()
+        print(f"LLM cache write failed: {e}")
+    finally:
+        db.close()
+
+def evict(db) -> int:
+    """만료된 항목을 지우고, 용량 초과 시 오래 사용되지 않은 항목부터 삭제합니다."""
+    removed = db.query(models.LLMCacheEntry).filter(
+        models.LLMCacheEntry.expires_at <= _now()
+    ).delete(synchronize_session=False)
+    total = db.query(func.coalesce(func.sum(models.LLMCacheEntry.size), 0)).scalar()
+    if total > MAX_BYTES:
+        excess = total - MAX_BYTES
+        freed, victims = 0, []
+        for key, size in db.query(models.LLMCacheEntry.key, models.LLMCacheEntry.size).order_by(
+            models.LLMCacheEntry.last_hit_at
+        ).yield_per(500):
+            victims.append(key)
+            freed += size or 0
+            if freed >= excess:
+                break
+        removed += db.query(models.LLMCacheEntry).filter(
+            models.LLMCacheEntry.key.in_(victims)
+        ).delete(synchronize_session=False)
+    db.commit()
+    if removed:
+        metrics.LLM_CACHE_EVICTIONS.inc(amount=removed)
+    return removed
+
+async def aget(endpoint: str, key: str):
+    """async 엔드포인트용 (DB 조회를 스레드풀에서 실행)"""
+    value = _memory.get(key) if ENABLED else None
+    if value is not None:
+        metrics.LLM_CACHE_LOOKUPS.inc(endpoint, "memory_hit")
+        return value
+    return await run_in_threadpool(get, endpoint, key)
+
+async def aput(endpoint: str, key: str, value, ttl: int):
+    await run_in_threadpool(put, endpoint, key, value, ttl)
@@ -1,48 +1,21 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from fastapi.staticfiles import StaticFiles
 from app.api import router as api_router
-from app.database import engine, Base
-import app.models
+from app import metrics
+from app.database import engine, pool_stats
+from app.jobs import worker_pool
+from app.images import UPLOAD_DIR, UploadStaticFiles
+from app.llm import close_clients
+from app.migrations import check_schema_version
+from app.tarot import STATIC_DIR
 import os
 from dotenv import load_dotenv
 
 # .env 파일 로드 (루트 디렉토리)
 load_dotenv(os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), ".env"))
 
-Base.metadata.create_all(bind=engine)
-
-# 기존 DB에 새 컬럼 자동 추가 (IF NOT EXISTS)
-def run_migrations():
-    migrations = [
-        "ALTER TABLE diaries ADD COLUMN IF NOT EXISTS mood VARCHAR",
-        "ALTER TABLE diaries ADD COLUMN IF NOT EXISTS mood_counts JSON",
-        "ALTER TABLE diaries ADD COLUMN IF NOT EXISTS color_code VARCHAR",
-        "ALTER TABLE diaries ADD COLUMN IF NOT EXISTS color_name VARCHAR",
-        "ALTER TABLE diaries ADD COLUMN IF NOT EXISTS is_pinned BOOLEAN DEFAULT FALSE",
-        "ALTER TABLE diaries ADD COLUMN IF NOT EXISTS image_url VARCHAR",
-        "ALTER TABLE diaries ADD COLUMN IF NOT EXISTS is_locked BOOLEAN DEFAULT FALSE",
-        "ALTER TABLE diaries ADD COLUMN IF NOT EXISTS pin_hash VARCHAR",
-        "ALTER TABLE emotion_analyses ADD COLUMN IF NOT EXISTS keywords JSON",
-        "ALTER TABLE emotion_analyses ADD COLUMN IF NOT EXISTS card_message TEXT",
-        "ALTER TABLE ai_chats ADD COLUMN IF NOT EXISTS fortune TEXT",
-        "ALTER TABLE ai_chats ADD COLUMN IF NOT EXISTS tarot TEXT",
-        "ALTER TABLE ai_chats ADD COLUMN IF NOT EXISTS mood VARCHAR",
-        "ALTER TABLE ai_chats ADD COLUMN IF NOT EXISTS selected_cards JSON",
-        "ALTER TABLE users ADD COLUMN IF NOT EXISTS name VARCHAR",
-        "ALTER TABLE users ADD COLUMN IF NOT EXISTS profile_image VARCHAR",
-        "ALTER TABLE users ADD COLUMN IF NOT EXISTS provider VARCHAR",
-    ]
-    with engine.connect() as conn:
-        for sql in migrations:
-            try:
-                conn.execute(__import__("sqlalchemy").text(sql))
-                conn.commit()
-            except Exception as e:
-                print(f"Migration skip: {e}")
-
-run_migrations()
-
 app = FastAPI(title="MindTrace API", version="0.1.0")
 
 app.add_middleware(
@@ -51,8 +24,31 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],  # 일기 목록 페이지네이션 커서
 )
 
+# 라우트별 응답 시간/DB 쿼리 수, 느린 요청 단계별 로그 (/metrics)
+app.add_middleware(metrics.MetricsMiddleware)
+metrics.instrument_engine(engine)
+
+# 스키마 변경은 배포 단계에서 `python migrate.py`로 적용하고, 여기서는 버전만 확인
+@app.on_event("startup")
+def verify_schema_version():
+    check_schema_version()
+
+# 감정 분석 워커 풀 (analysis_jobs 큐 처리)
+@app.on_event("startup")
+def start_analysis_workers():
+    worker_pool.start()
+
+@app.on_event("shutdown")
+def stop_analysis_workers():
+    worker_pool.stop()
+
+@app.on_event("shutdown")
+async def close_openai_clients():
+    await close_clients()
+
 @app.get("/")
 async def root():
     return {"message": "Welcome to MindTrace API"}
@@ -61,9 +57,29 @@ async def root():
 async def health_check():
     return {"status": "healthy"}
 
+@app.get("/health/db")
+def db_pool_health():
+    """커넥션 풀 사용량/대기 시간 (프로세스 단위)"""
+    return pool_stats()
+
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics():
+    """Prometheus 수집용 (프로세스 단위 값)"""
+    stats = pool_stats()
+    gauges = {}
+    for key, help_text in [("checked_out", "DB connections in use"), ("overflow", "DB overflow connections open"),
+                           ("wait_seconds_max", "Longest DB pool checkout wait"), ("timeouts", "DB pool checkout timeouts")]:
+        if key in stats:
+            gauges[f"mindtrace_db_pool_{key}"] = (help_text, stats[key])
+    return PlainTextResponse(metrics.render(gauges), media_type="text/plain; version=0.0.4")
+
 app.include_router(api_router, prefix="/api")
 
 # 업로드 이미지 정적 파일 서빙
-upload_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), "uploads")
-os.makedirs(upload_dir, exist_ok=True)
-app.mount("/uploads", StaticFiles(directory=upload_dir), name="uploads")
+# (내용 해시 파일명이라 immutable 캐시 + ETag, 생성 전인 썸네일은 원본으로 대체)
+os.makedirs(UPLOAD_DIR, exist_ok=True)
+app.mount("/uploads", UploadStaticFiles(directory=UPLOAD_DIR), name="uploads")
+
+# 미리 생성해 둔 타로 카드 이미지 등
+os.makedirs(STATIC_DIR, exist_ok=True)
+app.mount("/static", StaticFiles(directory=STATIC_DIR), name="static")
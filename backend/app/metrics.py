@@ -0,0 +1,267 @@
+"""요청 단위 성능 측정 + Prometheus 텍스트 형식 /metrics
+
+- MetricsMiddleware: 라우트별 응답 시간 히스토그램, 요청당 DB 쿼리 수
+- SQLAlchemy cursor 이벤트: 쿼리 시간 (요청 중이면 요청별 합계에도 반영)
+- llm_call(): OpenAI 호출 시간/토큰 사용량 (엔드포인트, 모델별)
+- AI 응답 캐시(llm_cache) 적중/미스/저장/삭제 수
+- 느린 요청은 단계별(auth, db, llm, serialization) 시간을 한 줄로 로그
+
+값은 프로세스 메모리에 쌓이므로 워커가 여러 개면 Prometheus가 워커별로 수집해 합산합니다.
+"""
+import contextvars
+import inspect
+import os
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+from fastapi.routing import APIRoute
+from sqlalchemy import event
+
+SLOW_REQUEST_SECONDS = float(os.getenv("SLOW_REQUEST_SECONDS", "1.0"))
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+LLM_BUCKETS = (0.25, 0.5, 1, 2, 4, 8, 15, 30, 60, 120)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 250)
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(names, values, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+class Counter:
+    def __init__(self, name: str, help_text: str, labels=()):
+        self.name, self.help, self.label_names = name, help_text, tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount: float = 1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for values, total in sorted(self._values.items()):
+                lines.append(f"{self.name}{_labels(self.label_names, values)} {total}")
+        return lines
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, labels=(), buckets=LATENCY_BUCKETS):
+        self.name, self.help, self.label_names = name, help_text, tuple(labels)
+        self.buckets = tuple(buckets)
+        self._series = {}  # label 값 -> [bucket별 개수..., 합계, 개수]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values):
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+                    break
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for values, series in sorted(self._series.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets, series):
+                    cumulative += count
+                    le = 'le="%s"' % bound
+                    lines.append(f"{self.name}_bucket{_labels(self.label_names, values, le)} {cumulative}")
+                le = 'le="+Inf"'
+                lines.append(f"{self.name}_bucket{_labels(self.label_names, values, le)} {series[-1]}")
+                lines.append(f"{self.name}_sum{_labels(self.label_names, values)} {round(series[-2], 6)}")
+                lines.append(f"{self.name}_count{_labels(self.label_names, values)} {series[-1]}")
+        return lines
+
+HTTP_LATENCY = Histogram("mindtrace_http_request_duration_seconds", "HTTP request latency", ("method", "route", "status"))
+HTTP_DB_QUERIES = Histogram("mindtrace_http_request_db_queries", "DB queries per HTTP request", ("method", "route"), QUERY_COUNT_BUCKETS)
+DB_QUERY_LATENCY = Histogram("mindtrace_db_query_duration_seconds", "DB query latency")
+LLM_LATENCY = Histogram("mindtrace_llm_request_duration_seconds", "OpenAI call latency", ("endpoint", "model"), LLM_BUCKETS)
+LLM_TOKENS = Counter("mindtrace_llm_tokens_total", "OpenAI token usage", ("endpoint", "model", "kind"))
+LLM_ERRORS = Counter("mindtrace_llm_errors_total", "Failed OpenAI calls", ("endpoint", "model"))
+# AI 응답 캐시 (llm_cache) - result: memory_hit, db_hit, miss
+LLM_CACHE_LOOKUPS = Counter("mindtrace_llm_cache_lookups_total", "AI response cache lookups", ("endpoint", "result"))
+LLM_CACHE_STORES = Counter("mindtrace_llm_cache_stores_total", "AI responses stored in the cache", ("endpoint",))
+LLM_CACHE_EVICTIONS = Counter("mindtrace_llm_cache_evictions_total", "AI cache entries removed (expired or over size)")
+REGISTRY = [HTTP_LATENCY, HTTP_DB_QUERIES, DB_QUERY_LATENCY, LLM_LATENCY, LLM_TOKENS, LLM_ERRORS,
+            LLM_CACHE_LOOKUPS, LLM_CACHE_STORES, LLM_CACHE_EVICTIONS]
+
+class RequestTimings:
+    """요청 하나의 단계별 누적 시간 (sync 엔드포인트 스레드에도 같은 객체가 전달됨)"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases = {"auth": 0.0, "db": 0.0, "llm": 0.0}
+        self.db_queries = 0
+        self.endpoint_done = None
+        self._lock = threading.Lock()
+
+    def add(self, phase: str, seconds: float):
+        with self._lock:
+            self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+
+_current = contextvars.ContextVar("request_timings", default=None)
+
+@contextmanager
+def phase(name: str):
+    """with metrics.phase("auth"): ... 구간 시간을 현재 요청에 합산"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings = _current.get()
+        if timings is not None:
+            timings.add(name, time.perf_counter() - started)
+
+class _LLMCall:
+    def __init__(self):
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+
+    def record(self, response):
+        """응답(또는 스트림 마지막 청크)의 usage를 기록"""
+        self.record_usage(getattr(response, "usage", None))
+
+    def record_usage(self, usage):
+        if usage is None:
+            return
+        self.prompt_tokens += getattr(usage, "prompt_tokens", None) or getattr(usage, "input_tokens", None) or 0
+        self.completion_tokens += getattr(usage, "completion_tokens", None) or getattr(usage, "output_tokens", None) or 0
+
+@contextmanager
+def llm_call(endpoint: str, model: str):
+    """with metrics.llm_call("ai-chat", "gpt-4o") as call: response = ...; call.record(response)"""
+    call = _LLMCall()
+    started = time.perf_counter()
+    try:
+        yield call
+    except BaseException:
+        LLM_ERRORS.inc(endpoint, model)
+        raise
+    finally:
+        elapsed = time.perf_counter() - started
+        LLM_LATENCY.observe(elapsed, endpoint, model)
+        if call.prompt_tokens:
+            LLM_TOKENS.inc(endpoint, model, "prompt", amount=call.prompt_tokens)
+        if call.completion_tokens:
+            LLM_TOKENS.inc(endpoint, model, "completion", amount=call.completion_tokens)
+        timings = _current.get()
+        if timings is not None:
+            timings.add("llm", elapsed)
+
+def instrument_engine(engine):
+    """쿼리 시간 측정 (요청 중이면 요청별 DB 시간/쿼리 수에도 반영)"""
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_started"].pop()
+        DB_QUERY_LATENCY.observe(elapsed)
+        timings = _current.get()
+        if timings is not None:
+            timings.add("db", elapsed)
+            with timings._lock:
+                timings.db_queries += 1
+
+    @event.listens_for(engine, "handle_error")
+    def _error(context):
+        # 실패한 쿼리는 after_cursor_execute가 호출되지 않으므로 시작 시각만 정리
+        conn = context.connection
+        if conn is not None and conn.info.get("query_started"):
+            conn.info["query_started"].pop()
+
+class TimedRoute(APIRoute):
+    """엔드포인트 함수가 끝난 시각을 기록해 응답 직렬화 시간을 따로 잴 수 있게 하는 라우트"""
+
+    def __init__(self, path: str, endpoint, **kwargs):
+        super().__init__(path, _timed_endpoint(endpoint), **kwargs)
+
+def _timed_endpoint(endpoint):
+    # wraps로 시그니처를 유지하므로 FastAPI의 의존성/파라미터 해석은 그대로
+    if inspect.iscoroutinefunction(endpoint):
+        @wraps(endpoint)
+        async def timed(*args, **kwargs):
+            try:
+                return await endpoint(*args, **kwargs)
+            finally:
+                _mark_endpoint_done()
+    else:
+        @wraps(endpoint)
+        def timed(*args, **kwargs):
+            try:
+                return endpoint(*args, **kwargs)
+            finally:
+                _mark_endpoint_done()
+    return timed
+
+def _mark_endpoint_done():
+    timings = _current.get()
+    if timings is not None:
+        timings.endpoint_done = time.perf_counter()
+
+class MetricsMiddleware:
+    """순수 ASGI 미들웨어 (스트리밍 응답을 버퍼링하지 않음)"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        timings = RequestTimings()
+        token = _current.set(timings)
+        status = {"code": 500, "response_start": None}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                status["response_start"] = time.perf_counter()
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current.reset(token)
+            self._record(scope, timings, status)
+
+    def _record(self, scope, timings: RequestTimings, status: dict):
+        total = time.perf_counter() - timings.started
+        route = scope.get("route")
+        route_path = getattr(route, "path", None) or "unmatched"
+        method = scope["method"]
+        HTTP_LATENCY.observe(total, method, route_path, status["code"])
+        HTTP_DB_QUERIES.observe(timings.db_queries, method, route_path)
+
+        if total < SLOW_REQUEST_SECONDS:
+            return
+        phases = dict(timings.phases)
+        if timings.endpoint_done and status["response_start"]:
+            phases["serialization"] = max(status["response_start"] - timings.endpoint_done, 0.0)
+        accounted = sum(phases.values())
+        breakdown = ", ".join(
+            f"{name} {seconds:.3f}s" + (f"/{timings.db_queries}q" if name == "db" else "")
+            for name, seconds in phases.items()
+        )
+        print(f"Slow request: {method} {route_path} {status['code']} {total:.3f}s "
+              f"({breakdown}, other {max(total - accounted, 0.0):.3f}s)")
+
+def render(extra_gauges: dict = None) -> str:
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    for name, (help_text, value) in (extra_gauges or {}).items():
+        lines.extend([f"# HELP {name} {help_text}", f"# TYPE {name} gauge", f"{name} {value}"])
+    return "\n".join(lines) + "\n"
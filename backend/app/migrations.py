@@ -0,0 +1,553 @@
+"""버전 관리되는 DB 스키마 마이그레이션
+
+배포 시 `python migrate.py`로 한 번만 실행하고, 앱은 시작할 때 schema_migrations의
+최신 버전만 확인합니다. (워커마다 DDL을 실행하지 않음)
+
+새 마이그레이션은 MIGRATIONS 끝에 다음 번호로 추가합니다. 이미 배포된 항목은 수정하지 않습니다.
+각 항목은 app.models가 아니라 그 시점의 스키마를 직접 적어 두고(아래 _schema), 자기가 만드는
+테이블/컬럼/인덱스를 스스로 추가합니다. 모델이 바뀌어도 예전 마이그레이션의 결과는 바뀌지 않습니다.
+버전 1 이전부터 있던 DB(예전 main.py의 create_all)도 있으므로 IF NOT EXISTS 등으로 작성합니다.
+"""
+import json
+
+from sqlalchemy import (
+    JSON, Boolean, Column, Date, DateTime, Float, ForeignKey, Index, Integer, MetaData, String, Table, Text,
+    UniqueConstraint, bindparam, column, func, inspect, select, table, text,
+)
+from sqlalchemy.engine import Connection
+
+from app.database import engine
+from app.emotions import EMOTION_COLUMNS, column_values
+from app.streaks import get_zone, local_day, runs_from_days
+import app.models  # 데이터 이전(중복 정리, 메시지 분리, 점수 채우기)용
+
+MIGRATION_LOCK_ID = 7723001  # pg_advisory_lock 키 (동시에 migrate가 두 번 실행되는 것 방지)
+
+def _pg(conn: Connection, *statements: str):
+    """PostgreSQL 전용 DDL. (예전 운영 DB 보정용, 새 DB에는 baseline 스냅샷으로 이미 있음)"""
+    if conn.dialect.name != "postgresql":
+        return
+    for sql in statements:
+        conn.execute(text(sql))
+
+def _cascade_fk(table: str, column: str, ref_table: str) -> str:
+    """기존 FK를 ON DELETE CASCADE로 교체 (이미 CASCADE면 아무것도 하지 않음)"""
+    name = f"{table}_{column}_fkey"
+    return f"""
+        DO $$ BEGIN
+            IF NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = '{name}' AND confdeltype = 'c') THEN
+                ALTER TABLE {table} DROP CONSTRAINT IF EXISTS {name};
+                ALTER TABLE {table} ADD CONSTRAINT {name}
+                    FOREIGN KEY ({column}) REFERENCES {ref_table}(id) ON DELETE CASCADE;
+            END IF;
+        END $$;
+    """
+
+# 마이그레이션이 만드는 테이블의 스냅샷 (만든 시점 그대로 고정, 이후 변경은 새 마이그레이션으로)
+_schema = MetaData()
+
+# 버전 1: 마이그레이션 도입 시점의 테이블
+_users = Table(
+    "users", _schema,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("email", String, unique=True, index=True),
+    Column("name", String),
+    Column("profile_image", String),
+    Column("provider", String),
+    Column("hashed_password", String),
+    Column("created_at", DateTime(timezone=True), server_default=func.now()),
+)
+_categories = Table(
+    "categories", _schema,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("name", String, index=True),
+    Column("user_id", Integer, ForeignKey("users.id")),
+)
+_diaries = Table(
+    "diaries", _schema,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("title", String, index=True),
+    Column("content", Text),
+    Column("category_id", Integer, ForeignKey("categories.id", ondelete="CASCADE"), index=True),
+    Column("raw_audio_url", String),
+    Column("mood", String),
+    Column("mood_counts", JSON),
+    Column("color_code", String),
+    Column("color_name", String),
+    Column("is_pinned", Boolean),
+    Column("image_url", String),
+    Column("is_locked", Boolean),
+    Column("pin_hash", String),
+    Column("analysis_status", String),
+    Column("created_at", DateTime(timezone=True), server_default=func.now()),
+    Column("user_id", Integer, ForeignKey("users.id")),
+)
+_emotion_analyses = Table(
+    "emotion_analyses", _schema,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("diary_id", Integer, ForeignKey("diaries.id", ondelete="CASCADE"), index=True),
+    Column("summary", Text),
+    Column("emotions", JSON),
+    Column("keywords", JSON),
+    Column("card_message", Text),
+    Column("positive_points", JSON),
+    Column("improvement_points", Text),
+    Column("prompt_version", String),
+    Column("created_at", DateTime(timezone=True), server_default=func.now()),
+)
+_analysis_jobs = Table(
+    "analysis_jobs", _schema,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("diary_id", Integer, ForeignKey("diaries.id", ondelete="CASCADE"), index=True),
+    Column("status", String, index=True),
+    Column("attempts", Integer),
+    Column("last_error", Text),
+    Column("run_after", DateTime(timezone=True), server_default=func.now()),
+    Column("locked_at", DateTime(timezone=True)),
+    Column("created_at", DateTime(timezone=True), server_default=func.now()),
+    Column("updated_at", DateTime(timezone=True)),
+)
+_diary_search_terms = Table(
+    "diary_search_terms", _schema,
+    Column("diary_id", Integer, ForeignKey("diaries.id", ondelete="CASCADE"), primary_key=True),
+    Column("term", String, primary_key=True),
+    Column("user_id", Integer, nullable=False),
+    Column("weight", Float, nullable=False),
+    Index("ix_diary_search_terms_user_term", "user_id", "term"),
+)
+_user_emotion_stats = Table(
+    "user_emotion_stats", _schema,
+    Column("user_id", Integer, ForeignKey("users.id"), primary_key=True),
+    Column("total_count", Integer),
+    Column("emotion_sums", JSON),
+    Column("recent_positive_points", JSON),
+    Column("updated_at", DateTime(timezone=True), server_default=func.now()),
+)
+_llm_cache_entries = Table(
+    "llm_cache_entries", _schema,
+    Column("key", String(64), primary_key=True),
+    Column("endpoint", String, index=True),
+    Column("value", JSON),
+    Column("size", Integer),
+    Column("created_at", DateTime(timezone=True), server_default=func.now()),
+    Column("last_hit_at", DateTime(timezone=True), server_default=func.now(), index=True),
+    Column("expires_at", DateTime(timezone=True), index=True),
+)
+_monthly_reports = Table(
+    "monthly_reports", _schema,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("user_id", Integer, ForeignKey("users.id")),
+    Column("year", Integer),
+    Column("month", Integer),
+    Column("version", String(64)),
+    Column("report", Text),
+    Column("diary_count", Integer),
+    Column("is_stale", Boolean),
+    Column("generated_at", DateTime(timezone=True), server_default=func.now()),
+    UniqueConstraint("user_id", "year", "month", name="uq_monthly_reports_user_month"),
+)
+_ai_chats = Table(
+    "ai_chats", _schema,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("user_id", Integer, ForeignKey("users.id")),
+    Column("date", String, index=True),
+    Column("messages", JSON),
+    Column("fortune", Text),
+    Column("tarot", Text),
+    Column("selected_card", Integer),
+    Column("selected_cards", JSON),
+    Column("mood", String),
+    Column("created_at", DateTime(timezone=True), server_default=func.now()),
+    Column("updated_at", DateTime(timezone=True)),
+)
+BASELINE_TABLES = [
+    _users, _categories, _diaries, _emotion_analyses, _analysis_jobs, _diary_search_terms,
+    _user_emotion_stats, _llm_cache_entries, _monthly_reports, _ai_chats,
+]
+
+# 버전 6
+_ai_chat_messages = Table(
+    "ai_chat_messages", _schema,
+    Column("id", Integer, primary_key=True),
+    Column("chat_id", Integer, ForeignKey("ai_chats.id", ondelete="CASCADE"), nullable=False),
+    Column("seq", Integer, nullable=False),
+    Column("role", String, nullable=False),
+    Column("content", Text, nullable=False),
+    Column("created_at", DateTime(timezone=True), server_default=func.now()),
+    Index("uq_ai_chat_messages_chat_seq", "chat_id", "seq", unique=True),
+)
+
+# 버전 7
+_user_streaks = Table(
+    "user_streaks", _schema,
+    Column("user_id", Integer, ForeignKey("users.id"), primary_key=True),
+    Column("current_streak", Integer),
+    Column("longest_streak", Integer),
+    Column("last_entry_date", Date),
+    Column("updated_at", DateTime(timezone=True), server_default=func.now()),
+)
+_user_streak_runs = Table(
+    "user_streak_runs", _schema,
+    Column("id", Integer, primary_key=True),
+    Column("user_id", Integer, ForeignKey("users.id"), nullable=False),
+    Column("start_day", Date, nullable=False),
+    Column("end_day", Date, nullable=False),
+    Column("length", Integer, nullable=False),
+    Index("uq_user_streak_runs_user_end", "user_id", "end_day", unique=True),
+    Index("ix_user_streak_runs_user_length", "user_id", "length"),
+)
+
+def m001_baseline(conn: Connection):
+    # 이미 있는 테이블은 건너뜀 (버전 관리 이전에 만든 DB)
+    _schema.create_all(bind=conn, tables=BASELINE_TABLES)
+
+def m002_legacy_columns(conn: Connection):
+    # 예전에 main.py / fix_db.py / add_selected_card_col.py / check_and_fix_db.py 가 매번 실행하던 컬럼 추가
+    _pg(conn,
+        "ALTER TABLE diaries ADD COLUMN IF NOT EXISTS mood VARCHAR",
+        "ALTER TABLE diaries ADD COLUMN IF NOT EXISTS mood_counts JSON",
+        "ALTER TABLE diaries ADD COLUMN IF NOT EXISTS color_code VARCHAR",
+        "ALTER TABLE diaries ADD COLUMN IF NOT EXISTS color_name VARCHAR",
+        "ALTER TABLE diaries ADD COLUMN IF NOT EXISTS is_pinned BOOLEAN DEFAULT FALSE",
+        "ALTER TABLE diaries ADD COLUMN IF NOT EXISTS image_url VARCHAR",
+        "ALTER TABLE diaries ADD COLUMN IF NOT EXISTS is_locked BOOLEAN DEFAULT FALSE",
+        "ALTER TABLE diaries ADD COLUMN IF NOT EXISTS pin_hash VARCHAR",
+        "ALTER TABLE emotion_analyses ADD COLUMN IF NOT EXISTS keywords JSON",
+        "ALTER TABLE emotion_analyses ADD COLUMN IF NOT EXISTS card_message TEXT",
+        "ALTER TABLE ai_chats ADD COLUMN IF NOT EXISTS fortune TEXT",
+        "ALTER TABLE ai_chats ADD COLUMN IF NOT EXISTS tarot TEXT",
+        "ALTER TABLE ai_chats ADD COLUMN IF NOT EXISTS mood VARCHAR",
+        "ALTER TABLE ai_chats ADD COLUMN IF NOT EXISTS selected_card INTEGER",
+        "ALTER TABLE ai_chats ADD COLUMN IF NOT EXISTS selected_cards JSON",
+        "ALTER TABLE users ADD COLUMN IF NOT EXISTS name VARCHAR",
+        "ALTER TABLE users ADD COLUMN IF NOT EXISTS profile_image VARCHAR",
+        "ALTER TABLE users ADD COLUMN IF NOT EXISTS provider VARCHAR",
+    )
+
+def m003_analysis_queue_columns(conn: Connection):
+    # 기존 일기는 분석이 끝난 것으로 간주
+    _pg(conn,
+        "ALTER TABLE diaries ADD COLUMN IF NOT EXISTS analysis_status VARCHAR DEFAULT 'done'",
+        "ALTER TABLE emotion_analyses ADD COLUMN IF NOT EXISTS prompt_version VARCHAR",
+    )
+
+def m004_cascade_deletes(conn: Connection):
+    # 일괄 삭제용 FK ON DELETE CASCADE + 참조 컬럼 인덱스
+    _pg(conn,
+        _cascade_fk("diaries", "category_id", "categories"),
+        _cascade_fk("emotion_analyses", "diary_id", "diaries"),
+        _cascade_fk("analysis_jobs", "diary_id", "diaries"),
+        _cascade_fk("diary_search_terms", "diary_id", "diaries"),
+        "CREATE INDEX IF NOT EXISTS ix_diaries_category_id ON diaries (category_id)",
+        "CREATE INDEX IF NOT EXISTS ix_emotion_analyses_diary_id ON emotion_analyses (diary_id)",
+    )
+
+def _dedupe_ai_chats(conn: Connection) -> int:
+    """같은 (user_id, date) 대화 페이지를 가장 먼저 만든 행 하나로 합침 (메시지는 id 순으로 이어 붙임)"""
+    chats = app.models.AIChat.__table__
+    dup_keys = select(chats.c.user_id, chats.c.date).group_by(chats.c.user_id, chats.c.date).having(
+        text("COUNT(*) > 1")
+    ).subquery()
+    # 이후 마이그레이션에서 추가될 컬럼이 없어도 되도록 필요한 컬럼만 조회
+    cols = [chats.c[name] for name in ("id", "user_id", "date", "messages", "fortune", "tarot", "selected_card", "selected_cards", "mood")]
+    rows = conn.execute(
+        select(*cols).join(dup_keys, (chats.c.user_id == dup_keys.c.user_id) & (chats.c.date == dup_keys.c.date))
+        .order_by(chats.c.user_id, chats.c.date, chats.c.id)
+    ).mappings().all()
+    groups = {}
+    for row in rows:
+        groups.setdefault((row["user_id"], row["date"]), []).append(row)
+    removed = 0
+    for group in groups.values():
+        keep, merged = group[0], {"messages": []}
+        for row in group:
+            merged["messages"].extend(row["messages"] or [])
+            # 운세/타로/카드/기분은 나중 행의 값이 있으면 그 값을 사용
+            for col in ("fortune", "tarot", "selected_card", "selected_cards", "mood"):
+                if row[col] is not None:
+                    merged[col] = row[col]
+        conn.execute(chats.update().where(chats.c.id == keep["id"]).values(**merged))
+        others = [row["id"] for row in group[1:]]
+        conn.execute(chats.delete().where(chats.c.id.in_(others)))
+        removed += len(others)
+    return removed
+
+def m005_hot_query_indexes(conn: Connection):
+    # 유니크 인덱스를 만들기 전에 중복 정리
+    merged_chats = _dedupe_ai_chats(conn)
+    # 같은 일기의 분석이 여러 개면 최신(id가 가장 큰) 것만 남김 (save_analysis가 항상 교체하므로 최신이 유효)
+    removed_analyses = conn.execute(text(
+        "DELETE FROM emotion_analyses WHERE diary_id IS NOT NULL AND id NOT IN "
+        "(SELECT MAX(id) FROM emotion_analyses WHERE diary_id IS NOT NULL GROUP BY diary_id)"
+    )).rowcount
+    if merged_chats or removed_analyses:
+        print(f"  merged {merged_chats} duplicate ai_chats, removed {removed_analyses} duplicate emotion_analyses")
+    if removed_analyses:
+        print("  emotion stats may be off for affected users; run `python rebuild_stats.py` afterwards")
+
+    for sql in [
+        "CREATE INDEX IF NOT EXISTS ix_diaries_user_pinned_created ON diaries (user_id, is_pinned, created_at, id)",
+        "CREATE INDEX IF NOT EXISTS ix_diaries_user_created ON diaries (user_id, created_at)",
+        "CREATE INDEX IF NOT EXISTS ix_categories_user_id ON categories (user_id)",
+        "CREATE UNIQUE INDEX IF NOT EXISTS uq_ai_chats_user_date ON ai_chats (user_id, date)",
+        # m004의 일반 인덱스를 유니크 인덱스로 교체
+        "DROP INDEX IF EXISTS ix_emotion_analyses_diary_id",
+        "CREATE UNIQUE INDEX ix_emotion_analyses_diary_id ON emotion_analyses (diary_id)",
+    ]:
+        conn.execute(text(sql))
+
+def _add_column(conn: Connection, table: str, column: str, ddl: str):
+    """컬럼이 없을 때만 추가 (PostgreSQL/SQLite 공통)"""
+    if column not in {c["name"] for c in inspect(conn).get_columns(table)}:
+        conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}"))
+
+def _explode_chat_messages(conn: Connection) -> int:
+    """ai_chats.messages JSON 배열을 ai_chat_messages 행으로 옮김 (이미 옮긴 대화는 message_count > 0)"""
+    if conn.dialect.name == "postgresql":
+        moved = conn.execute(text("""
+            INSERT INTO ai_chat_messages (chat_id, seq, role, content, created_at)
+            SELECT c.id, m.ord, COALESCE(m.elem->>'role', 'user'), COALESCE(m.elem->>'content', ''),
+                   COALESCE(c.updated_at, c.created_at, now())
+            FROM ai_chats c
+            CROSS JOIN LATERAL json_array_elements(c.messages) WITH ORDINALITY AS m(elem, ord)
+            WHERE c.message_count = 0 AND json_typeof(c.messages) = 'array'
+        """)).rowcount
+        conn.execute(text(
+            "UPDATE ai_chats SET message_count = json_array_length(messages) "
+            "WHERE message_count = 0 AND json_typeof(messages) = 'array'"
+        ))
+        return moved
+
+    chats = app.models.AIChat.__table__
+    chat_messages = app.models.AIChatMessage.__table__
+    rows = conn.execute(
+        select(chats.c.id, chats.c.messages, chats.c.created_at)
+        .where(chats.c.message_count == 0, chats.c.messages.isnot(None))
+    ).all()
+    moved = 0
+    for chat_id, messages, created_at in rows:
+        if not isinstance(messages, list) or not messages:
+            continue
+        conn.execute(chat_messages.insert(), [
+            {"chat_id": chat_id, "seq": seq, "role": m.get("role", "user"), "content": m.get("content", ""),
+             "created_at": created_at}
+            for seq, m in enumerate(messages, start=1)
+        ])
+        conn.execute(chats.update().where(chats.c.id == chat_id).values(message_count=len(messages)))
+        moved += len(messages)
+    return moved
+
+def m006_chat_messages_table(conn: Connection):
+    # 대화 메시지를 JSON 통째 저장 -> 메시지 단위 추가 전용 테이블 (ai_chats.messages는 롤백 대비로 남겨 둠)
+    _ai_chat_messages.create(conn, checkfirst=True)
+    _add_column(conn, "ai_chats", "message_count", "INTEGER NOT NULL DEFAULT 0")
+    moved = _explode_chat_messages(conn)
+    if moved:
+        print(f"  moved {moved} chat messages to ai_chat_messages")
+
+def m007_streaks(conn: Connection):
+    # 사용자 시간대 + 스트릭 구간/요약 (기존 사용자는 /streak 첫 조회나 rebuild_streaks.py로 채움)
+    _add_column(conn, "users", "timezone", "VARCHAR")
+    _user_streaks.create(conn, checkfirst=True)
+    _user_streak_runs.create(conn, checkfirst=True)
+
+def _backfill_emotion_scores(conn: Connection, batch_size: int = 1000) -> int:
+    """emotions JSON -> 기본 감정 5개 컬럼 (id 순서로 batch_size씩, 배치마다 executemany UPDATE 한 번)"""
+    analyses = app.models.EmotionAnalysis.__table__
+    # 바인드 이름이 컬럼 이름과 겹치면 안 되므로 b_ 접두어
+    update = analyses.update().where(analyses.c.id == bindparam("b_id")).values(
+        {col: bindparam(f"b_{col}") for col in EMOTION_COLUMNS.values()}
+    )
+    last_id, updated = 0, 0
+    while True:
+        rows = conn.execute(
+            select(analyses.c.id, analyses.c.emotions)
+            .where(analyses.c.id > last_id).order_by(analyses.c.id).limit(batch_size)
+        ).all()
+        if not rows:
+            return updated
+        params = []
+        for analysis_id, raw in rows:
+            values = column_values(raw)
+            if any(values.values()):  # 전부 0이면 컬럼 기본값 그대로
+                params.append({"b_id": analysis_id, **{f"b_{col}": v for col, v in values.items()}})
+        if params:
+            conn.execute(update, params)
+        last_id = rows[-1][0]
+        updated += len(params)
+
+def m008_emotion_score_columns(conn: Connection):
+    # 감정 JSON의 한글/영문 키를 기본 감정 5개 실수 컬럼으로 정규화
+    for column in EMOTION_COLUMNS.values():
+        _add_column(conn, "emotion_analyses", column, "FLOAT NOT NULL DEFAULT 0")
+    updated = _backfill_emotion_scores(conn)
+    # 기존 집계는 키가 섞여 있으므로 비워 두고 /statistics 첫 조회나 rebuild_stats.py에서 다시 계산
+    cleared = conn.execute(text("DELETE FROM user_emotion_stats")).rowcount
+    if updated or cleared:
+        print(f"  normalized {updated} analyses, cleared {cleared} emotion stats rows")
+
+def _rebuild_emotion_stats(conn: Connection, batch_size: int = 1000) -> int:
+    """user_emotion_stats를 emotion_analyses 감정 컬럼의 SQL 합계로 모든 사용자에 대해 다시 채움"""
+    score_columns = list(EMOTION_COLUMNS.values())
+    sum_columns = [f"{col}_sum" for col in score_columns]
+    totals = conn.execute(text(
+        "SELECT d.user_id, COUNT(ea.id), "
+        + ", ".join(f"COALESCE(SUM(ea.{col}), 0)" for col in score_columns)
+        + " FROM emotion_analyses ea JOIN diaries d ON d.id = ea.diary_id"
+        " WHERE d.user_id IS NOT NULL GROUP BY d.user_id"
+    )).all()
+    # 사용자별 최근 분석 3개 (stats.RECENT_POINTS)
+    recent = {}
+    for user_id, analysis_id, points in conn.execute(text("""
+        SELECT user_id, id, positive_points FROM (
+            SELECT d.user_id, ea.id, ea.positive_points,
+                   ROW_NUMBER() OVER (PARTITION BY d.user_id ORDER BY ea.created_at DESC, ea.id DESC) AS rn
+            FROM emotion_analyses ea JOIN diaries d ON d.id = ea.diary_id
+            WHERE d.user_id IS NOT NULL
+        ) ranked WHERE rn <= 3 ORDER BY user_id, rn
+    """)):
+        if isinstance(points, str):
+            points = json.loads(points)  # SQLite 등 드라이버가 문자열로 돌려주는 경우
+        recent.setdefault(user_id, []).append({"analysis_id": analysis_id, "points": points})
+
+    stats = table(
+        "user_emotion_stats", column("user_id"), column("total_count"), column("recent_positive_points", JSON),
+        *[column(col) for col in sum_columns],
+    )
+    conn.execute(stats.delete())
+    rows = [
+        {"user_id": user_id, "total_count": count, "recent_positive_points": recent.get(user_id, []),
+         **dict(zip(sum_columns, [float(v) for v in sums]))}
+        for user_id, count, *sums in totals
+    ]
+    for i in range(0, len(rows), batch_size):
+        conn.execute(stats.insert(), rows[i:i + batch_size])
+    return len(rows)
+
+def m009_emotion_stats_columns(conn: Connection):
+    # 감정 합계 JSON(emotion_sums) -> 실수 컬럼 (emotion_sums 컬럼은 롤백 대비로 남겨 두고 더 이상 쓰지 않음)
+    for col in EMOTION_COLUMNS.values():
+        _add_column(conn, "user_emotion_stats", f"{col}_sum", "FLOAT NOT NULL DEFAULT 0")
+    # 감정 필터 EXISTS / 통계·추이 합산이 diary_id로 찾아 인덱스만 읽도록
+    conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_emotion_analyses_diary_scores "
+        "ON emotion_analyses (diary_id, " + ", ".join(EMOTION_COLUMNS.values()) + ")"
+    ))
+    # m008에서 비운 집계를 첫 조회까지 미루지 않고 여기서 다시 계산
+    rebuilt = _rebuild_emotion_stats(conn)
+    if rebuilt:
+        print(f"  rebuilt emotion stats for {rebuilt} users")
+
+def m010_backfill_streaks(conn: Connection):
+    # 모든 사용자의 스트릭 구간/요약을 다시 채움 (없는 행을 GET /streak에서 만들지 않도록)
+    # 요약 행 없이 일기를 쓰면 add_day가 예전 기록 없이 행을 만들었으므로 있는 행도 다시 계산
+    zones = {user_id: get_zone(name) for user_id, name in conn.execute(text("SELECT id, timezone FROM users"))}
+    conn.execute(_user_streak_runs.delete())
+    conn.execute(_user_streaks.delete())
+    rows = conn.execute(
+        select(_diaries.c.user_id, _diaries.c.created_at)
+        .where(_diaries.c.user_id.isnot(None), _diaries.c.created_at.isnot(None))
+        .order_by(_diaries.c.user_id)
+    )
+    users = 0
+
+    def flush(user_id, days):
+        runs = runs_from_days(sorted(days))
+        lengths = [(end - start).days + 1 for start, end in runs]
+        conn.execute(_user_streak_runs.insert(), [
+            {"user_id": user_id, "start_day": start, "end_day": end, "length": length}
+            for (start, end), length in zip(runs, lengths)
+        ])
+        conn.execute(_user_streaks.insert().values(
+            user_id=user_id, current_streak=lengths[-1], longest_streak=max(lengths), last_entry_date=runs[-1][1]
+        ))
+
+    current_user, days = None, set()
+    for user_id, created_at in rows:
+        if user_id != current_user:
+            if days:
+                flush(current_user, days)
+                users += 1
+            current_user, days = user_id, set()
+        days.add(local_day(created_at, zones.get(user_id) or get_zone()))
+    if days:
+        flush(current_user, days)
+        users += 1
+    if users:
+        print(f"  rebuilt streaks for {users} users")
+
+# (버전, 설명, 함수) - 순서대로 한 번씩 실행
+MIGRATIONS = [
+    (1, "baseline tables", m001_baseline),
+    (2, "legacy column additions", m002_legacy_columns),
+    (3, "analysis queue columns", m003_analysis_queue_columns),
+    (4, "cascade deletes", m004_cascade_deletes),
+    (5, "hot query indexes", m005_hot_query_indexes),
+    (6, "append-only chat messages", m006_chat_messages_table),
+    (7, "streak tables and user timezone", m007_streaks),
+    (8, "typed emotion score columns", m008_emotion_score_columns),
+    (9, "typed emotion stats sums", m009_emotion_stats_columns),
+    (10, "backfill streaks", m010_backfill_streaks),
+]
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+def _ensure_version_table(conn: Connection):
+    conn.execute(text(
+        "CREATE TABLE IF NOT EXISTS schema_migrations ("
+        " version INTEGER PRIMARY KEY,"
+        " description VARCHAR NOT NULL,"
+        " applied_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP)"
+    ))
+
+def current_version(conn: Connection) -> int:
+    """적용된 최신 버전 (schema_migrations가 없으면 0)"""
+    if not inspect(conn).has_table("schema_migrations"):
+        return 0
+    return conn.execute(text("SELECT COALESCE(MAX(version), 0) FROM schema_migrations")).scalar()
+
+def migrate(target: int = None) -> list:
+    """아직 적용되지 않은 마이그레이션을 버전마다 한 트랜잭션으로 실행합니다. 적용한 버전 목록 반환"""
+    target = target or LATEST_VERSION
+    applied = []
+    with engine.connect() as conn:
+        if conn.dialect.name == "postgresql":
+            conn.execute(text("SELECT pg_advisory_lock(:id)"), {"id": MIGRATION_LOCK_ID})
+            conn.commit()  # 세션 단위 잠금이라 commit 후에도 유지됨
+        try:
+            with conn.begin():
+                _ensure_version_table(conn)
+            for version, description, fn in MIGRATIONS:
+                if version > target:
+                    break
+                with conn.begin():
+                    done = conn.execute(
+                        text("SELECT 1 FROM schema_migrations WHERE version = :v"), {"v": version}
+                    ).first()
+                    if done:
+                        continue
+                    print(f"Applying migration {version}: {description}")
+                    fn(conn)
+                    conn.execute(
+                        text("INSERT INTO schema_migrations (version, description) VALUES (:v, :d)"),
+                        {"v": version, "d": description}
+                    )
+                applied.append(version)
+        finally:
+            if conn.dialect.name == "postgresql":
+                conn.execute(text("SELECT pg_advisory_unlock(:id)"), {"id": MIGRATION_LOCK_ID})
+                conn.commit()
+    return applied
+
+def check_schema_version():
+    """앱 시작 시 확인: DB가 코드보다 오래된 버전이면 시작하지 않음"""
+    with engine.connect() as conn:
+        version = current_version(conn)
+    if version < LATEST_VERSION:
+        raise RuntimeError(
+            f"Database schema is at version {version}, but this build needs {LATEST_VERSION}. "
+            f"Run `python migrate.py` before starting the API."
+        )
+    if version > LATEST_VERSION:
+        # 롤링 배포 중 새 버전이 먼저 마이그레이션한 경우
+        print(f"Warning: database schema version {version} is newer than this build ({LATEST_VERSION})")
+    return version
@@ -1,5 +1,5 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, JSON, Boolean
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, Text, Date, DateTime, ForeignKey, JSON, Boolean, Float, Index, UniqueConstraint
+from sqlalchemy.orm import deferred, relationship
 from sqlalchemy.sql import func
 from app.database import Base
 
@@ -12,6 +12,7 @@ class User(Base):
     profile_image = Column(String, nullable=True)
     provider = Column(String, nullable=True) # google, naver etc.
     hashed_password = Column(String, nullable=True)
+    timezone = Column(String, nullable=True)  # IANA 시간대 (ex: "Asia/Seoul"), 없으면 DEFAULT_TIMEZONE
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
     diaries = relationship("Diary", back_populates="owner")
@@ -22,18 +23,25 @@ class Category(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"))
+    user_id = Column(Integer, ForeignKey("users.id"), index=True)
 
     owner = relationship("User", back_populates="categories")
-    diaries = relationship("Diary", back_populates="category")
+    # 카테고리 삭제 시 일기도 삭제 (DB의 ON DELETE CASCADE에 맡김)
+    diaries = relationship("Diary", back_populates="category", cascade="all, delete-orphan", passive_deletes=True)
 
 class Diary(Base):
     __tablename__ = "diaries"
+    __table_args__ = (
+        # 목록: user_id 필터 + (is_pinned, created_at, id) DESC 정렬을 인덱스 역방향 스캔으로 처리
+        Index("ix_diaries_user_pinned_created", "user_id", "is_pinned", "created_at", "id"),
+        # 월간 리포트 / 오늘의 일기: user_id + created_at 범위
+        Index("ix_diaries_user_created", "user_id", "created_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String, index=True)
     content = Column(Text)
-    category_id = Column(Integer, ForeignKey("categories.id"), nullable=True)
+    category_id = Column(Integer, ForeignKey("categories.id", ondelete="CASCADE"), nullable=True, index=True)
     raw_audio_url = Column(String, nullable=True)
     mood = Column(String, nullable=True)      # 사용자 선택 기분 이모지 (ex: "😊")
     mood_counts = Column(JSON, nullable=True) # 감정 스푼 수 (ex: {"joy": 3, "sadness": 1})
@@ -43,35 +51,143 @@ class Diary(Base):
     image_url = Column(String, nullable=True)    # 첨부 이미지
     is_locked = Column(Boolean, default=False)   # 잠금 여부
     pin_hash = Column(String, nullable=True)     # 잠금 PIN 해시
+    analysis_status = Column(String, default="pending")  # AI 분석 상태: pending, running, done, failed
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     user_id = Column(Integer, ForeignKey("users.id"))
 
     owner = relationship("User", back_populates="diaries")
     category = relationship("Category", back_populates="diaries")
-    analysis = relationship("EmotionAnalysis", back_populates="diary", uselist=False)
+    # 분석/작업/검색 색인은 일기 삭제 시 DB에서 함께 삭제 (ON DELETE CASCADE)
+    analysis = relationship("EmotionAnalysis", back_populates="diary", uselist=False, cascade="all, delete-orphan", passive_deletes=True)
 
 class EmotionAnalysis(Base):
     __tablename__ = "emotion_analyses"
+    __table_args__ = (
+        # 감정 필터(Diary.analysis.has(score > x))와 통계/추이 합산을 diary_id로 찾아 인덱스만 읽고 처리
+        Index("ix_emotion_analyses_diary_scores", "diary_id", "joy", "sadness", "anxiety", "anger", "calm"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
-    diary_id = Column(Integer, ForeignKey("diaries.id"))
+    diary_id = Column(Integer, ForeignKey("diaries.id", ondelete="CASCADE"), unique=True, index=True)  # 일기당 분석 하나
     summary = Column(Text)
-    emotions = Column(JSON)  # e.g., {"happiness": 0.8, "sadness": 0.1}
+    emotions = Column(JSON)  # 분석 원본 (키가 한글/영문 섞여 있음), e.g., {"happiness": 0.8, "sadness": 0.1}
+    # 기본 감정 5개 점수 (emotions.normalize, 통계/추이/필터는 이 컬럼으로 집계)
+    joy = Column(Float, nullable=False, default=0.0, server_default="0")      # 기쁨
+    sadness = Column(Float, nullable=False, default=0.0, server_default="0")  # 슬픔
+    anxiety = Column(Float, nullable=False, default=0.0, server_default="0")  # 불안
+    anger = Column(Float, nullable=False, default=0.0, server_default="0")    # 분노
+    calm = Column(Float, nullable=False, default=0.0, server_default="0")     # 평온
     keywords = Column(JSON, nullable=True)  # 자동 추출된 키워드 리스트
     card_message = Column(Text, nullable=True)  # AI 생성 응원 메시지
     positive_points = Column(JSON)  # List of 3 good things
     improvement_points = Column(Text)
+    prompt_version = Column(String, nullable=True)  # 분석에 사용한 프롬프트 버전 (재분석 대상 판별)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
     diary = relationship("Diary", back_populates="analysis")
 
+class AnalysisJob(Base):
+    __tablename__ = "analysis_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    diary_id = Column(Integer, ForeignKey("diaries.id", ondelete="CASCADE"), index=True)
+    status = Column(String, default="pending", index=True)  # pending, running, done, failed
+    attempts = Column(Integer, default=0)
+    last_error = Column(Text, nullable=True)
+    run_after = Column(DateTime(timezone=True), server_default=func.now())  # 재시도 대기 (지수 백오프)
+    locked_at = Column(DateTime(timezone=True), nullable=True)  # 워커가 가져간 시각 (크래시 복구용)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+    diary = relationship("Diary")
+
+class DiarySearchTerm(Base):
+    __tablename__ = "diary_search_terms"
+    __table_args__ = (
+        Index("ix_diary_search_terms_user_term", "user_id", "term"),
+    )
+
+    diary_id = Column(Integer, ForeignKey("diaries.id", ondelete="CASCADE"), primary_key=True)
+    term = Column(String, primary_key=True)   # 2-gram (한 글자 단어는 1-gram)
+    user_id = Column(Integer, nullable=False)  # 검색 범위 제한용 (diaries.user_id 복제)
+    weight = Column(Float, nullable=False)     # 필드 가중치 * 로그 빈도 합
+
+class UserEmotionStats(Base):
+    __tablename__ = "user_emotion_stats"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    total_count = Column(Integer, default=0)                # 감정 분석 개수
+    # 기본 감정별 점수 누적합 (emotion_analyses의 joy ~ calm 컬럼 합)
+    joy_sum = Column(Float, nullable=False, default=0.0, server_default="0")
+    sadness_sum = Column(Float, nullable=False, default=0.0, server_default="0")
+    anxiety_sum = Column(Float, nullable=False, default=0.0, server_default="0")
+    anger_sum = Column(Float, nullable=False, default=0.0, server_default="0")
+    calm_sum = Column(Float, nullable=False, default=0.0, server_default="0")
+    recent_positive_points = Column(JSON, default=list)     # 최근 분석 N개: [{"analysis_id": 1, "points": [...]}]
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+class UserStreak(Base):
+    """연속 기록 요약 (user_streak_runs에서 계산, 일기 추가/삭제 시 갱신)"""
+    __tablename__ = "user_streaks"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    current_streak = Column(Integer, default=0)   # 가장 최근 구간의 길이 (끊겼는지는 조회 시 판단)
+    longest_streak = Column(Integer, default=0)
+    last_entry_date = Column(Date, nullable=True)  # 사용자 시간대 기준 마지막으로 일기를 쓴 날
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+class UserStreakRun(Base):
+    """일기를 하루도 빠짐없이 쓴 구간 [start_day, end_day] (사용자 시간대 기준 날짜)"""
+    __tablename__ = "user_streak_runs"
+    __table_args__ = (
+        # 새 날짜 앞뒤 구간 찾기 / 가장 최근 구간 / 최장 구간을 모두 인덱스로 조회
+        Index("uq_user_streak_runs_user_end", "user_id", "end_day", unique=True),
+        Index("ix_user_streak_runs_user_length", "user_id", "length"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    start_day = Column(Date, nullable=False)
+    end_day = Column(Date, nullable=False)
+    length = Column(Integer, nullable=False)  # end_day - start_day + 1
+
+class LLMCacheEntry(Base):
+    __tablename__ = "llm_cache_entries"
+
+    key = Column(String(64), primary_key=True)  # sha256(endpoint, model, prompt_version, input)
+    endpoint = Column(String, index=True)
+    value = Column(JSON)
+    size = Column(Integer, default=0)            # 바이트 (용량 기반 삭제용)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    last_hit_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+    expires_at = Column(DateTime(timezone=True), index=True)
+
+class MonthlyReport(Base):
+    """월간 AI 리포트 (user, year, month)당 한 행. 해당 월 일기가 바뀌면 is_stale"""
+    __tablename__ = "monthly_reports"
+    __table_args__ = (UniqueConstraint("user_id", "year", "month", name="uq_monthly_reports_user_month"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"))
+    year = Column(Integer)
+    month = Column(Integer)
+    version = Column(String(64))    # 해당 월 일기 내용의 해시
+    report = Column(Text)
+    diary_count = Column(Integer, default=0)
+    is_stale = Column(Boolean, default=False)
+    generated_at = Column(DateTime(timezone=True), server_default=func.now())
+
 class AIChat(Base):
     __tablename__ = "ai_chats"
+    # 사용자별 하루 한 페이지 (오늘 대화 조회, 보관함 날짜 역순 정렬)
+    __table_args__ = (Index("uq_ai_chats_user_date", "user_id", "date", unique=True),)
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"))
     date = Column(String, index=True)  # YYYY-MM-DD
-    messages = Column(JSON)  # [{"role": "user", "content": "..."}, {"role": "assistant", "content": "..."}]
+    # 예전 방식의 대화 전체 JSON (마이그레이션 6에서 ai_chat_messages로 옮김, 더 이상 쓰지 않음)
+    messages = deferred(Column(JSON))
+    message_count = Column(Integer, nullable=False, default=0, server_default="0")  # 마지막 메시지의 seq
     fortune = Column(Text, nullable=True)
     tarot = Column(Text, nullable=True)
     selected_card = Column(Integer, nullable=True)
@@ -79,3 +195,16 @@ class AIChat(Base):
     mood = Column(String, nullable=True)  # 추가: 에이전트의 감정 상태 (NORMAL, HAPPY 등)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+class AIChatMessage(Base):
+    """AI 대화 메시지 (추가만 함). 한 턴 = 사용자/답변 두 행을 한 번의 INSERT로 저장"""
+    __tablename__ = "ai_chat_messages"
+    # 대화별 seq 순서 조회 (최근 N개는 역방향 스캔)
+    __table_args__ = (Index("uq_ai_chat_messages_chat_seq", "chat_id", "seq", unique=True),)
+
+    id = Column(Integer, primary_key=True)
+    chat_id = Column(Integer, ForeignKey("ai_chats.id", ondelete="CASCADE"), nullable=False)
+    seq = Column(Integer, nullable=False)  # 대화 안에서 1부터 증가
+    role = Column(String, nullable=False)  # user, assistant
+    content = Column(Text, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -0,0 +1,57 @@
+"""기분/색상 달력용 월별 요약
+
+한 달치 일기를 (user_id, created_at) 인덱스 범위 조회 한 번으로 날짜별로 묶어
+날짜마다 대표 일기(가장 최근)의 color_code/mood, 일기 수, 사진 첨부 여부만 반환합니다.
+날짜는 스트릭/추이와 같이 사용자 시간대 기준입니다. (streaks.user_zone)
+"""
+import hashlib
+import json
+from datetime import date
+
+from sqlalchemy import case, func, select
+from sqlalchemy.orm import Session
+
+from app import models, streaks
+
+# 월 경계(다음 달 1일)를 시간대 변환해도 date/datetime 범위를 넘지 않는 연도
+MIN_YEAR, MAX_YEAR = 1900, 9998
+
+def month_days_query(db: Session, user_id: int, year: int, month: int, tz):
+    """날짜별 대표 일기 한 행씩: (day, count, color_code, mood, has_image) - day는 사용자 시간대 날짜"""
+    Diary = models.Diary
+    first = date(year, month, 1)
+    start, _ = streaks.day_bounds(first, tz)
+    end, _ = streaks.day_bounds(date(year + 1, 1, 1) if month == 12 else date(year, month + 1, 1), tz)
+    day = streaks.local_date_expr(db, tz).label("day")
+    ranked = select(
+        day,
+        Diary.color_code,
+        Diary.mood,
+        func.row_number().over(partition_by=day, order_by=(Diary.created_at.desc(), Diary.id.desc())).label("rn"),
+        func.count().over(partition_by=day).label("count"),
+        func.max(case((Diary.image_url.isnot(None), 1), else_=0)).over(partition_by=day).label("has_image"),
+    ).where(
+        Diary.user_id == user_id, Diary.created_at >= start, Diary.created_at < end
+    ).subquery()
+    return select(
+        ranked.c.day, ranked.c.count, ranked.c.color_code, ranked.c.mood, ranked.c.has_image
+    ).where(ranked.c.rn == 1).order_by(ranked.c.day)
+
+def month_days(db: Session, user_id: int, year: int, month: int, tz) -> list:
+    """[{"day": 3, "count": 2, "color_code": "#FCD34D", "mood": "😊", "has_image": true}, ...] (일기가 있는 날만)"""
+    rows = db.execute(month_days_query(db, user_id, year, month, tz)).all()
+    return [
+        # PostgreSQL은 date, SQLite는 'YYYY-MM-DD' 문자열
+        {"day": int(str(r.day)[8:10]), "count": r.count, "color_code": r.color_code, "mood": r.mood,
+         "has_image": bool(r.has_image)}
+        for r in rows
+    ]
+
+def month_payload(db: Session, user_id: int, year: int, month: int) -> dict:
+    tz = streaks.user_zone(db, user_id)
+    return {"year": year, "month": month, "timezone": tz.key, "days": month_days(db, user_id, year, month, tz)}
+
+def etag(payload: dict) -> str:
+    # payload에 timezone이 들어 있어 시간대를 바꾸면 ETag도 바뀜
+    body = json.dumps(payload, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return '"' + hashlib.sha256(body.encode()).hexdigest()[:32] + '"'
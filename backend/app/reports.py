@@ -0,0 +1,121 @@
+"""월간 AI 리포트 저장/무효화
+
+리포트는 (user_id, year, month)마다 한 행으로 저장됩니다. 그 달의 일기가 생성/수정/삭제되면
+행을 stale로 표시하고, 다음 조회(또는 매월 1일 배치) 때 일기 내용으로 계산한 version이
+실제로 바뀐 경우에만 GPT로 다시 생성합니다. 바뀌지 않은 리포트 조회는 인덱스 한 번 읽기입니다.
+"""
+import hashlib
+import json
+from datetime import date, datetime
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app import llm_cache, metrics, models
+
+REPORT_MODEL = "gpt-4o"
+MONTHLY_REPORT_PROMPT_VERSION = "1"
+MONTHLY_REPORT_CACHE_TTL = 7 * 24 * 3600
+REPORT_SYSTEM_PROMPT = "너는 사용자의 한 달 일기를 분석하는 AI 카운슬러야. 반드시 한국어로만 답해. 이번 달의 감정 흐름, 주요 사건, 칭찬할 점, 내달의 제안을 따뜻하게 요약해줘. 400자 이내로."
+
+def month_range(year: int, month: int):
+    start = f"{year}-{str(month).zfill(2)}-01"
+    end_day = (date(year, month % 12 + 1, 1) if month < 12 else date(year + 1, 1, 1)).isoformat()
+    return start, end_day
+
+def month_diaries(db: Session, user_id: int, year: int, month: int) -> list:
+    start, end_day = month_range(year, month)
+    return db.query(models.Diary).filter(
+        models.Diary.user_id == user_id,
+        models.Diary.created_at >= start,
+        models.Diary.created_at < end_day
+    ).order_by(models.Diary.created_at, models.Diary.id).all()
+
+def compute_version(diaries: list) -> str:
+    """리포트 입력(일기 id/날짜/제목/내용)이 같으면 같은 값"""
+    digest = hashlib.sha256()
+    for d in diaries:
+        digest.update(json.dumps([d.id, d.created_at.isoformat(), d.title, d.content], ensure_ascii=False).encode())
+    return digest.hexdigest()
+
+def invalidate(db: Session, user_id: int, months):
+    """[(year, month) 또는 datetime, ...]에 해당하는 저장된 리포트를 stale로 표시합니다. (commit은 호출자 몫)"""
+    keys = set()
+    for m in months:
+        if isinstance(m, (date, datetime)):
+            keys.add((m.year, m.month))
+        else:
+            keys.add(tuple(m))
+    for year, month in keys:
+        db.query(models.MonthlyReport).filter(
+            models.MonthlyReport.user_id == user_id,
+            models.MonthlyReport.year == year,
+            models.MonthlyReport.month == month
+        ).update({"is_stale": True}, synchronize_session=False)
+
+def _diary_summary(diaries: list) -> str:
+    return "\n\n".join([f"[{d.created_at.strftime('%m/%d')}] {d.title}: {d.content[:100]}" for d in diaries])
+
+def _request_report(client, year: int, month: int, diary_summary: str) -> str:
+    cache_key = llm_cache.make_key("report-monthly", REPORT_MODEL, MONTHLY_REPORT_PROMPT_VERSION, [year, month, diary_summary])
+    cached = llm_cache.get("report-monthly", cache_key)
+    if cached is not None:
+        return cached
+    with metrics.llm_call("report-monthly", REPORT_MODEL) as call:
+        response = client.chat.completions.create(
+            model=REPORT_MODEL,
+            messages=[
+                {"role": "system", "content": REPORT_SYSTEM_PROMPT},
+                {"role": "user", "content": f"{year}년 {month}월 일기:\n{diary_summary}"}
+            ],
+            max_tokens=500
+        )
+        call.record(response)
+    report = response.choices[0].message.content
+    llm_cache.put("report-monthly", cache_key, report, ttl=MONTHLY_REPORT_CACHE_TTL)
+    return report
+
+def refresh_report(db: Session, client, user_id: int, year: int, month: int, row: models.MonthlyReport = None):
+    """리포트를 최신 상태로 맞춥니다. 일기가 없으면 None. (commit 포함)
+
+    version이 그대로면 GPT를 호출하지 않고 stale 표시만 지웁니다.
+    """
+    diaries = month_diaries(db, user_id, year, month)
+    if not diaries:
+        if row:
+            db.delete(row)
+            db.commit()
+        return None
+    version = compute_version(diaries)
+    if row and row.version == version:
+        row.is_stale = False
+        db.commit()
+        return row
+
+    diary_summary, diary_count = _diary_summary(diaries), len(diaries)
+    row_id = row.id if row else None
+    db.rollback()  # GPT 응답을 기다리는 동안 DB 커넥션을 반환
+    report = _request_report(client, year, month, diary_summary)
+    row = db.get(models.MonthlyReport, row_id) if row_id else None
+    if not row:
+        row = models.MonthlyReport(user_id=user_id, year=year, month=month)
+        db.add(row)
+    row.version = version
+    row.report = report
+    row.diary_count = diary_count
+    row.is_stale = False
+    row.generated_at = datetime.utcnow()
+    try:
+        db.commit()
+    except IntegrityError:
+        # 동시에 다른 요청이 먼저 생성한 경우 그 결과를 사용
+        db.rollback()
+        row = get_stored_report(db, user_id, year, month)
+    return row
+
+def get_stored_report(db: Session, user_id: int, year: int, month: int):
+    return db.query(models.MonthlyReport).filter(
+        models.MonthlyReport.user_id == user_id,
+        models.MonthlyReport.year == year,
+        models.MonthlyReport.month == month
+    ).first()
@@ -1,7 +1,9 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, computed_field
 from datetime import datetime
 from typing import List, Optional, Dict
 
+from app.images import derivative_url
+
 # Category Schemas
 class CategoryBase(BaseModel):
     name: str
@@ -46,20 +48,58 @@ class DiaryBase(BaseModel):
 class DiaryCreate(DiaryBase):
     date: Optional[str] = None
 
-class Diary(DiaryBase):
+class DiaryImageURLs(BaseModel):
+    """첨부 이미지 원본 + 목록/갤러리용 축소본 URL"""
+    image_url: Optional[str] = None
+
+    @computed_field
+    @property
+    def thumb_url(self) -> Optional[str]:
+        return derivative_url(self.image_url, "thumb")
+
+    @computed_field
+    @property
+    def medium_url(self) -> Optional[str]:
+        return derivative_url(self.image_url, "medium")
+
+class Diary(DiaryBase, DiaryImageURLs):
     id: int
     user_id: int
     created_at: datetime
     raw_audio_url: Optional[str] = None
-    image_url: Optional[str] = None
     is_pinned: bool = False
     is_locked: bool = False
+    analysis_status: Optional[str] = None
     analysis: Optional[EmotionAnalysis] = None
     category: Optional[Category] = None
 
     class Config:
         from_attributes = True
 
+class DiarySummary(DiaryImageURLs):
+    """목록 화면용 경량 스키마 (본문 전체와 분석 결과 제외)"""
+    id: int
+    title: str
+    snippet: str = ""
+    category_id: Optional[int] = None
+    mood: Optional[str] = None
+    color_code: Optional[str] = None
+    color_name: Optional[str] = None
+    is_pinned: bool = False
+    is_locked: bool = False
+    analysis_status: Optional[str] = None
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+class DiaryAnalysisStatus(BaseModel):
+    diary_id: int
+    analysis_status: Optional[str] = None
+    attempts: int = 0
+    last_error: Optional[str] = None
+    analysis: Optional[EmotionAnalysis] = None
+
 # STT Schemas
 class STTResponse(BaseModel):
     text: str
@@ -82,6 +122,9 @@ class User(UserBase):
     class Config:
         from_attributes = True
 
+class TimezoneUpdate(BaseModel):
+    timezone: str  # IANA 시간대 (ex: "Asia/Seoul")
+
 # AI Chat Schemas
 class AIChatMessage(BaseModel):
     role: str
@@ -98,12 +141,14 @@ class AIChatResponse(BaseModel):
     selected_card: Optional[int] = None
     selected_cards: Optional[List[int]] = None   # 3장 스프레드 카드 번호 배열
     mood: Optional[str] = "NORMAL"  # 추가: 에이전트의 현재 감정 상태
+    message_count: int = 0  # 전체 메시지 수 (messages는 최근 일부일 수 있음)
 
     class Config:
         from_attributes = True
 
 class TTSRequest(BaseModel):
     text: str
+    voice: Optional[str] = None  # 기본 alloy
 
 class AIChatArchiveResponse(BaseModel):
     date: str
@@ -0,0 +1,154 @@
+"""일기 검색 색인 (한국어 n-gram 역색인)
+
+형태소 분석 없이도 조사/어미가 붙은 한국어를 찾을 수 있도록 단어를 글자 2-gram으로 쪼개
+diary_search_terms에 (사용자, 용어) 단위로 저장합니다. 검색은 질의의 2-gram과 일치하는
+행만 인덱스로 읽어 일기별로 점수를 합산하므로, 사용자의 일기 수와 무관하게 질의 용어의
+등장 횟수에만 비례합니다. 제목/키워드/요약/본문에 가중치를 다르게 줍니다.
+"""
+import html
+import math
+import re
+import unicodedata
+
+from sqlalchemy import func, insert, literal
+from sqlalchemy.orm import Session
+
+from app import models
+
+# 필드별 가중치
+FIELD_WEIGHTS = {"title": 3.0, "keywords": 2.0, "summary": 1.0, "content": 1.0}
+MIN_MATCH_RATIO = 0.7  # 질의 2-gram 중 이 비율 이상 일치해야 결과에 포함
+SNIPPET_RADIUS = 40
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+def normalize(text: str) -> str:
+    return unicodedata.normalize("NFKC", text or "").lower()
+
+def tokenize(text: str) -> list:
+    """단어별 2-gram 목록 (한 글자 단어는 그대로)"""
+    terms = []
+    for word in _WORD_RE.findall(normalize(text)):
+        if len(word) == 1:
+            terms.append(word)
+        else:
+            terms.extend(word[i:i + 2] for i in range(len(word) - 1))
+    return terms
+
+def _diary_terms(title, content, summary, keywords) -> dict:
+    fields = {
+        "title": title,
+        "content": content,
+        "summary": summary,
+        "keywords": " ".join(k for k in (keywords or []) if isinstance(k, str)),
+    }
+    weights = {}
+    for field, text in fields.items():
+        counts = {}
+        for term in tokenize(text):
+            counts[term] = counts.get(term, 0) + 1
+        for term, count in counts.items():
+            # 같은 용어가 여러 번 나와도 로그 스케일로만 가산
+            weights[term] = weights.get(term, 0) + FIELD_WEIGHTS[field] * (1 + math.log(count))
+    return weights
+
+def index_diaries(db: Session, diary_ids: list):
+    """일기들의 색인을 다시 만듭니다. (commit은 호출자 몫)"""
+    if not diary_ids:
+        return
+    rows = db.query(
+        models.Diary.id, models.Diary.user_id, models.Diary.title, models.Diary.content,
+        models.EmotionAnalysis.summary, models.EmotionAnalysis.keywords
+    ).outerjoin(models.EmotionAnalysis, models.EmotionAnalysis.diary_id == models.Diary.id).filter(
+        models.Diary.id.in_(diary_ids)
+    ).all()
+
+    delete_terms(db, diary_ids)
+    values = []
+    for row in rows:
+        for term, weight in _diary_terms(row.title, row.content, row.summary, row.keywords).items():
+            values.append({"diary_id": row.id, "user_id": row.user_id, "term": term, "weight": weight})
+    if values:
+        db.execute(insert(models.DiarySearchTerm), values)
+
+def index_diary(db: Session, diary_id: int):
+    index_diaries(db, [diary_id])
+
+def delete_terms(db: Session, diary_ids: list):
+    db.query(models.DiarySearchTerm).filter(
+        models.DiarySearchTerm.diary_id.in_(diary_ids)
+    ).delete(synchronize_session=False)
+
+def _query_terms(q: str) -> list:
+    return list(dict.fromkeys(tokenize(q)))
+
+def ranked_matches(db: Session, user_id: int, q: str):
+    """(diary_id, matched, score) 서브쿼리.
+
+    한 글자 질의처럼 2-gram이 없으면 색인으로 찾을 수 없으므로 ILIKE로 대체합니다.
+    """
+    terms = _query_terms(q)
+    if not any(len(t) > 1 for t in terms):
+        pattern = f"%{q.strip()}%"
+        return db.query(
+            models.Diary.id.label("diary_id"), literal(1).label("matched"), literal(0.0).label("score")
+        ).filter(
+            models.Diary.user_id == user_id,
+            models.Diary.title.ilike(pattern) | models.Diary.content.ilike(pattern)
+        ).subquery()
+    min_match = max(1, math.ceil(len(terms) * MIN_MATCH_RATIO))
+    matched = func.count(models.DiarySearchTerm.term).label("matched")
+    return db.query(
+        models.DiarySearchTerm.diary_id, matched, func.sum(models.DiarySearchTerm.weight).label("score")
+    ).filter(
+        models.DiarySearchTerm.user_id == user_id,
+        models.DiarySearchTerm.term.in_(terms)
+    ).group_by(models.DiarySearchTerm.diary_id).having(matched >= min_match).subquery()
+
+def _highlight(text: str, q: str, snippet: bool = False) -> str:
+    """질의 단어를 <mark>로 감싼 HTML-escaped 텍스트 (snippet이면 첫 일치 주변만)"""
+    text = text or ""
+    words = [re.escape(w) for w in _WORD_RE.findall(normalize(q))]
+    if not words:
+        return html.escape(text[:SNIPPET_RADIUS * 2] if snippet else text)
+    pattern = re.compile("|".join(sorted(words, key=len, reverse=True)), re.IGNORECASE)
+    if snippet:
+        first = pattern.search(text)
+        start = max(0, first.start() - SNIPPET_RADIUS) if first else 0
+        end = min(len(text), (first.end() if first else 0) + SNIPPET_RADIUS * 2)
+        prefix, suffix = ("…" if start > 0 else ""), ("…" if end < len(text) else "")
+        text = text[start:end]
+    else:
+        prefix = suffix = ""
+    parts, last = [], 0
+    for m in pattern.finditer(text):
+        parts.append(html.escape(text[last:m.start()]))
+        parts.append(f"<mark>{html.escape(m.group())}</mark>")
+        last = m.end()
+    parts.append(html.escape(text[last:]))
+    return prefix + "".join(parts) + suffix
+
+def search_diaries(db: Session, user_id: int, q: str, limit: int = 20, offset: int = 0) -> dict:
+    if not q.strip():
+        return {"items": [], "total": 0, "next_offset": None}
+    ranked = ranked_matches(db, user_id, q)
+    total = db.query(func.count()).select_from(ranked).scalar()
+    rows = db.query(
+        models.Diary.id, models.Diary.title, models.Diary.content, models.Diary.mood,
+        models.Diary.color_code, models.Diary.is_locked, models.Diary.created_at, ranked.c.score
+    ).join(ranked, ranked.c.diary_id == models.Diary.id).order_by(
+        ranked.c.matched.desc(), ranked.c.score.desc(), models.Diary.created_at.desc()
+    ).limit(limit).offset(offset).all()
+
+    items = [{
+        "id": row.id,
+        "title": _highlight(row.title, q),
+        "snippet": "" if row.is_locked else _highlight(row.content, q, snippet=True),
+        "mood": row.mood,
+        "color_code": row.color_code,
+        "is_locked": row.is_locked,
+        "created_at": row.created_at,
+        "score": round(row.score, 3),
+    } for row in rows]
+    next_offset = offset + limit if offset + limit < total else None
+    return {"items": items, "total": total, "next_offset": next_offset}
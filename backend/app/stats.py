@@ -0,0 +1,109 @@
+"""사용자별 감정 통계 집계 (user_emotion_stats)
+
+감정 분석이 추가/교체/삭제될 때 같은 트랜잭션 안에서 누적 합계와 개수를 갱신하므로
+/statistics는 행 하나만 읽으면 됩니다. 합계는 기본 감정 5개의 실수 컬럼(joy_sum ~ calm_sum)으로
+emotion_analyses의 감정 컬럼(joy ~ calm)과 1:1로 대응하고, 집계가 어긋나면 rebuild()가 SQL로 다시 합산합니다.
+"""
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app import emotions, models
+
+RECENT_POINTS = 3  # /statistics의 recent_positive_points 개수
+# 기본 감정 -> user_emotion_stats 합계 컬럼 이름 (ex: "기쁨" -> "joy_sum")
+SUM_COLUMNS = {name: f"{column}_sum" for name, column in emotions.EMOTION_COLUMNS.items()}
+
+def _lock_stats(db: Session, user_id: int) -> models.UserEmotionStats:
+    stats = db.query(models.UserEmotionStats).filter(
+        models.UserEmotionStats.user_id == user_id
+    ).with_for_update().first()
+    if stats:
+        return stats
+    try:
+        with db.begin_nested():
+            stats = models.UserEmotionStats(user_id=user_id, total_count=0, recent_positive_points=[])
+            db.add(stats)
+    except IntegrityError:
+        # 다른 트랜잭션이 먼저 만든 경우
+        stats = db.query(models.UserEmotionStats).filter(
+            models.UserEmotionStats.user_id == user_id
+        ).with_for_update().first()
+    return stats
+
+def _recent_entries(db: Session, user_id: int) -> list:
+    rows = db.query(models.EmotionAnalysis.id, models.EmotionAnalysis.positive_points).join(models.Diary).filter(
+        models.Diary.user_id == user_id
+    ).order_by(models.EmotionAnalysis.created_at.desc(), models.EmotionAnalysis.id.desc()).limit(RECENT_POINTS).all()
+    return [{"analysis_id": r.id, "points": r.positive_points} for r in rows]
+
+def apply_delta(db: Session, user_id: int, removed=(), added=()):
+    """분석 변경분을 집계에 반영합니다. (commit은 호출자 몫)
+
+    removed: [(analysis_id, emotions), ...] 삭제/교체되는 기존 분석
+    added:   [(analysis_id, emotions, positive_points), ...] 새로 저장된 분석 (최신순 아님, 저장 순서)
+    """
+    if not removed and not added:
+        return
+    stats = _lock_stats(db, user_id)
+    sums = {name: getattr(stats, col) or 0.0 for name, col in SUM_COLUMNS.items()}
+    total = stats.total_count or 0
+
+    # normalize() 결과는 저장된 분석의 감정 컬럼 값과 같음 (emotions.column_values)
+    for _, raw in removed:
+        total -= 1
+        for emotion, score in emotions.normalize(raw).items():
+            sums[emotion] -= score
+    for _, raw, _ in added:
+        total += 1
+        for emotion, score in emotions.normalize(raw).items():
+            sums[emotion] += score
+
+    removed_ids = {analysis_id for analysis_id, _ in removed}
+    recent = [e for e in (stats.recent_positive_points or []) if e["analysis_id"] not in removed_ids]
+    recent = [{"analysis_id": a_id, "points": points} for a_id, _, points in reversed(list(added))] + recent
+    if len(recent) < RECENT_POINTS and total > len(recent):
+        # 최근 항목이 삭제되어 목록이 모자라면 인덱스로 다시 채움
+        db.flush()
+        recent = _recent_entries(db, user_id)
+
+    stats.total_count = max(total, 0)
+    for name, col in SUM_COLUMNS.items():
+        setattr(stats, col, sums[name] if stats.total_count else 0.0)
+    stats.recent_positive_points = recent[:RECENT_POINTS]
+
+def _totals(db: Session, user_id: int):
+    """(분석 수, {"joy_sum": ..., ...}) - emotion_analyses 감정 컬럼의 SQL 합계"""
+    row = db.query(
+        func.count(models.EmotionAnalysis.id),
+        *[func.coalesce(func.sum(col), 0.0) for col in emotions.score_columns()]
+    ).join(models.Diary).filter(models.Diary.user_id == user_id).one()
+    return row[0], {col: float(value) for col, value in zip(SUM_COLUMNS.values(), row[1:])}
+
+def rebuild(db: Session, user_id: int) -> models.UserEmotionStats:
+    """사용자의 모든 분석을 다시 읽어 집계를 재계산합니다. (commit은 호출자 몫)"""
+    stats = _lock_stats(db, user_id)
+    stats.total_count, sums = _totals(db, user_id)
+    for col, value in sums.items():
+        setattr(stats, col, value)
+    stats.recent_positive_points = _recent_entries(db, user_id)
+    return stats
+
+def get_statistics(db: Session, user_id: int) -> dict:
+    """집계 행을 읽기만 합니다. (행은 분석 저장 시 apply_delta, 마이그레이션 9, rebuild_stats.py가 만듦)"""
+    stats = db.query(models.UserEmotionStats).filter(models.UserEmotionStats.user_id == user_id).first()
+    if stats:
+        total = stats.total_count or 0
+        sums = {col: getattr(stats, col) for col in SUM_COLUMNS.values()}
+        recent = stats.recent_positive_points or []
+    else:
+        # 행이 없으면 (아직 분석이 없는 사용자 등) 저장하지 않고 계산만 해서 반환 - GET에서 쓰기/경합 없음
+        total, sums = _totals(db, user_id)
+        recent = _recent_entries(db, user_id) if total else []
+    if not total:
+        return {"emotion_distribution": {}, "total_count": 0, "recent_positive_points": []}
+    return {
+        "emotion_distribution": {name: sums[col] / total for name, col in SUM_COLUMNS.items()},
+        "total_count": total,
+        "recent_positive_points": [e["points"] for e in recent if e["points"]]
+    }
@@ -0,0 +1,193 @@
+"""연속 기록(스트릭) 집계 (user_streaks, user_streak_runs)
+
+일기를 쓴 날(사용자 시간대 기준)이 이어지는 구간을 user_streak_runs에 [start_day, end_day]로 저장합니다.
+일기가 생기거나 지워져 "그날 일기가 있는지"가 바뀔 때만 앞뒤 구간을 인덱스로 찾아 붙이거나 나누므로
+작업량은 전체 일기 수와 상관없습니다. user_streaks에는 홈 화면용 요약(현재/최장 스트릭, 마지막 작성일)을 둡니다.
+시간대를 바꾸거나 집계가 어긋나면 rebuild()로 다시 계산합니다.
+"""
+import os
+from datetime import date, datetime, time, timedelta, timezone
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app import models
+
+DEFAULT_TIMEZONE = os.getenv("DEFAULT_TIMEZONE", "Asia/Seoul")
+ONE_DAY = timedelta(days=1)
+
+def get_zone(name: str = None) -> ZoneInfo:
+    try:
+        return ZoneInfo(name or DEFAULT_TIMEZONE)
+    except (ZoneInfoNotFoundError, ValueError):
+        return ZoneInfo(DEFAULT_TIMEZONE)
+
+def is_valid_timezone(name: str) -> bool:
+    try:
+        ZoneInfo(name)
+        return True
+    except (ZoneInfoNotFoundError, ValueError):
+        return False
+
+def user_zone(db: Session, user_id: int) -> ZoneInfo:
+    return get_zone(db.query(models.User.timezone).filter(models.User.id == user_id).scalar())
+
+def local_day(created_at: datetime, tz: ZoneInfo) -> date:
+    if created_at.tzinfo is None:
+        # SQLite는 시간대 없이 저장됨 (UTC)
+        created_at = created_at.replace(tzinfo=timezone.utc)
+    return created_at.astimezone(tz).date()
+
+def local_noon(day: date, tz: ZoneInfo) -> datetime:
+    """지난 날짜로 쓰는 일기의 created_at: 사용자 시간대의 그날 정오 (UTC로 바꿔도 날짜가 거의 바뀌지 않음)"""
+    return datetime.combine(day, time(12), tzinfo=tz).astimezone(timezone.utc)
+
+def day_bounds(day: date, tz: ZoneInfo):
+    """사용자 시간대의 하루를 UTC [시작, 끝) 로"""
+    start = datetime.combine(day, time(0), tzinfo=tz)
+    return start.astimezone(timezone.utc), (start + ONE_DAY).astimezone(timezone.utc)
+
+def local_date_expr(db: Session, tz: ZoneInfo):
+    """SQL에서 diaries.created_at -> 사용자 시간대 날짜 (PostgreSQL: date, SQLite: 'YYYY-MM-DD' 문자열)"""
+    created_at = models.Diary.created_at
+    if db.get_bind().dialect.name == "postgresql":
+        return func.date(func.timezone(tz.key, created_at))
+    # SQLite는 시간대 변환이 없어 현재 UTC 오프셋으로 이동 (서머타임 경계는 근사)
+    offset = int(datetime.now(tz).utcoffset().total_seconds() // 60)
+    return func.date(created_at, f"{offset:+d} minutes")
+
+def has_diary_on(db: Session, user_id: int, day: date, tz: ZoneInfo, exclude_id: int = None) -> bool:
+    start, end = day_bounds(day, tz)
+    query = db.query(models.Diary.id).filter(
+        models.Diary.user_id == user_id, models.Diary.created_at >= start, models.Diary.created_at < end
+    )
+    if exclude_id is not None:
+        query = query.filter(models.Diary.id != exclude_id)
+    return query.first() is not None
+
+def _lock_streak(db: Session, user_id: int) -> models.UserStreak:
+    # 같은 사용자의 구간 수정은 이 행 잠금으로 직렬화
+    streak = db.query(models.UserStreak).filter(models.UserStreak.user_id == user_id).with_for_update().first()
+    if streak:
+        return streak
+    try:
+        with db.begin_nested():
+            streak = models.UserStreak(user_id=user_id, current_streak=0, longest_streak=0)
+            db.add(streak)
+    except IntegrityError:
+        # 다른 트랜잭션이 먼저 만든 경우
+        streak = db.query(models.UserStreak).filter(models.UserStreak.user_id == user_id).with_for_update().first()
+    return streak
+
+def _run(start_day: date, end_day: date, user_id: int) -> models.UserStreakRun:
+    return models.UserStreakRun(
+        user_id=user_id, start_day=start_day, end_day=end_day, length=(end_day - start_day).days + 1
+    )
+
+def _refresh_summary(db: Session, streak: models.UserStreak):
+    Run = models.UserStreakRun
+    db.flush()
+    latest = db.query(Run).filter(Run.user_id == streak.user_id).order_by(Run.end_day.desc()).first()
+    longest = db.query(Run.length).filter(Run.user_id == streak.user_id).order_by(Run.length.desc()).limit(1).scalar()
+    streak.current_streak = latest.length if latest else 0
+    streak.last_entry_date = latest.end_day if latest else None
+    streak.longest_streak = longest or 0
+
+def add_day(db: Session, user_id: int, day: date):
+    """그날 첫 일기가 생겼을 때: 앞(day-1로 끝나는) / 뒤(day+1로 시작하는) 구간과 합칩니다. (commit은 호출자 몫)"""
+    Run = models.UserStreakRun
+    streak = _lock_streak(db, user_id)
+    covering = db.query(Run).filter(Run.user_id == user_id, Run.end_day >= day).order_by(Run.end_day).first()
+    if covering and covering.start_day <= day:
+        return  # 이미 구간 안에 있음 (집계가 어긋난 경우 등)
+    before = db.query(Run).filter(Run.user_id == user_id, Run.end_day == day - ONE_DAY).first()
+    after = covering if covering and covering.start_day == day + ONE_DAY else None
+    start_day = before.start_day if before else day
+    end_day = after.end_day if after else day
+    for run in (before, after):
+        if run:
+            db.delete(run)
+    db.flush()
+    db.add(_run(start_day, end_day, user_id))
+    _refresh_summary(db, streak)
+
+def remove_day(db: Session, user_id: int, day: date):
+    """그날 마지막 일기가 지워졌을 때: day를 포함한 구간을 앞뒤로 나눕니다. (commit은 호출자 몫)"""
+    Run = models.UserStreakRun
+    streak = _lock_streak(db, user_id)
+    run = db.query(Run).filter(Run.user_id == user_id, Run.end_day >= day).order_by(Run.end_day).first()
+    if not run or run.start_day > day:
+        return
+    start_day, end_day = run.start_day, run.end_day
+    db.delete(run)
+    db.flush()
+    if start_day < day:
+        db.add(_run(start_day, day - ONE_DAY, user_id))
+    if day < end_day:
+        db.add(_run(day + ONE_DAY, end_day, user_id))
+    _refresh_summary(db, streak)
+
+def diary_added(db: Session, diary: models.Diary):
+    """일기 저장 직후 (flush 이후) 호출: 그날의 첫 일기일 때만 구간을 늘립니다. (지난 날짜로 쓴 일기 포함)"""
+    tz = user_zone(db, diary.user_id)
+    day = local_day(diary.created_at, tz)
+    if not has_diary_on(db, diary.user_id, day, tz, exclude_id=diary.id):
+        add_day(db, diary.user_id, day)
+
+def diaries_removed(db: Session, user_id: int, created_ats):
+    """일기 삭제 직후 호출: 일기가 하나도 남지 않은 날만 구간에서 뺍니다."""
+    tz = user_zone(db, user_id)
+    for day in sorted({local_day(c, tz) for c in created_ats if c}):
+        if not has_diary_on(db, user_id, day, tz):
+            remove_day(db, user_id, day)
+
+def runs_from_days(days) -> list:
+    """정렬된 날짜 목록 -> 이어지는 구간 [[start_day, end_day], ...]"""
+    runs = []
+    for day in days:
+        if runs and runs[-1][1] == day - ONE_DAY:
+            runs[-1][1] = day
+        else:
+            runs.append([day, day])
+    return runs
+
+def _diary_days(db: Session, user_id: int, tz: ZoneInfo) -> list:
+    rows = db.query(models.Diary.created_at).filter(
+        models.Diary.user_id == user_id, models.Diary.created_at.isnot(None)
+    ).yield_per(1000)
+    return sorted({local_day(created_at, tz) for (created_at,) in rows})
+
+def rebuild(db: Session, user_id: int) -> models.UserStreak:
+    """사용자의 모든 일기 날짜로 구간을 다시 만듭니다. (commit은 호출자 몫)"""
+    Run = models.UserStreakRun
+    streak = _lock_streak(db, user_id)
+    runs = runs_from_days(_diary_days(db, user_id, user_zone(db, user_id)))
+    db.query(Run).filter(Run.user_id == user_id).delete(synchronize_session=False)
+    db.add_all([_run(start_day, end_day, user_id) for start_day, end_day in runs])
+    _refresh_summary(db, streak)
+    return streak
+
+def get_streak(db: Session, user_id: int) -> dict:
+    """요약 행을 읽기만 합니다. (행은 일기 저장 시 add_day, 마이그레이션 10, rebuild_streaks.py가 만듦)"""
+    tz = user_zone(db, user_id)
+    streak = db.query(models.UserStreak).filter(models.UserStreak.user_id == user_id).first()
+    if streak:
+        current, longest, last_entry = streak.current_streak, streak.longest_streak, streak.last_entry_date
+    else:
+        # 행이 없으면 (아직 일기가 없는 사용자 등) 저장하지 않고 계산만 해서 반환 - GET에서 쓰기/경합 없음
+        runs = runs_from_days(_diary_days(db, user_id, tz))
+        current = (runs[-1][1] - runs[-1][0]).days + 1 if runs else 0
+        longest = max(((end - start).days + 1 for start, end in runs), default=0)
+        last_entry = runs[-1][1] if runs else None
+    today = datetime.now(tz).date()
+    # 오늘이나 어제까지 이어져 있어야 현재 스트릭 (오늘 아직 안 썼어도 끊기지 않음)
+    alive = last_entry is not None and last_entry >= today - ONE_DAY
+    return {
+        "current_streak": current if alive else 0,
+        "longest_streak": longest,
+        "last_entry_date": last_entry.isoformat() if last_entry else None,
+        "wrote_today": last_entry == today,
+        "timezone": tz.key,
+    }
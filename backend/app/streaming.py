@@ -0,0 +1,84 @@
+import json
+
+def sse(event: str, data) -> str:
+    """Server-Sent Events 메시지 한 개 (data는 JSON 인코딩해서 줄바꿈이 깨지지 않게 함)"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "X-Accel-Buffering": "no",  # nginx 등 프록시 버퍼링 방지
+}
+
+_ESCAPES = {'"': '"', "\\": "\\", "/": "/", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+
+class JSONStringFieldStreamer:
+    """스트리밍 중인 JSON 객체에서 문자열 필드 하나의 값을 도착하는 대로 꺼냅니다.
+
+    GPT의 json_object 응답({"reply": "...", "mood": "..."})을 토큰 단위로 받으면서
+    reply 값만 사용자에게 먼저 흘려보내기 위해 사용합니다. 전체 JSON은 끝난 뒤 따로 파싱합니다.
+    """
+
+    def __init__(self, field: str):
+        self._key = f'"{field}"'
+        self._raw = ""
+        self._pos = None      # 값 문자열이 시작된 위치 (따옴표 다음)
+        self._done = False
+
+    def feed(self, chunk: str) -> str:
+        self._raw += chunk
+        if self._done:
+            return ""
+        if self._pos is None:
+            key_at = self._raw.find(self._key)
+            if key_at < 0:
+                return ""
+            rest = self._raw[key_at + len(self._key):]
+            stripped = rest.lstrip()
+            if not stripped.startswith(":"):
+                return ""
+            value = stripped[1:].lstrip()
+            if not value:
+                return ""
+            if value[0] != '"':
+                self._done = True  # 문자열이 아닌 값
+                return ""
+            self._pos = len(self._raw) - len(value) + 1
+        return self._decode()
+
+    def _decode(self) -> str:
+        out, i, raw = [], self._pos, self._raw
+        while i < len(raw):
+            ch = raw[i]
+            if ch == '"':
+                self._done = True
+                i += 1
+                break
+            if ch == "\\":
+                if i + 1 >= len(raw):
+                    break  # 이스케이프가 잘린 경우 다음 조각을 기다림
+                nxt = raw[i + 1]
+                if nxt == "u":
+                    if i + 6 > len(raw):
+                        break
+                    code = int(raw[i + 2:i + 6], 16)
+                    if 0xD800 <= code < 0xDC00:
+                        # 이모지 등 서로게이트 쌍은 두 번째 \uXXXX까지 모아서 변환
+                        if i + 12 > len(raw):
+                            break
+                        low = int(raw[i + 8:i + 12], 16)
+                        code = 0x10000 + ((code - 0xD800) << 10) + (low - 0xDC00)
+                        i += 6
+                    out.append(chr(code))
+                    i += 6
+                    continue
+                out.append(_ESCAPES.get(nxt, nxt))
+                i += 2
+                continue
+            out.append(ch)
+            i += 1
+        self._pos = i
+        return "".join(out)
+
+    @property
+    def raw(self) -> str:
+        return self._raw
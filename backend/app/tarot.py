@@ -0,0 +1,109 @@
+"""타로 카드 이미지 라이브러리
+
+카드 이미지는 (카드 번호, 위치, 테마) 조합만큼만 존재하므로 DALL-E로 한 번 그린 뒤
+static/tarot/ 아래에 저장해 두고 계속 재사용합니다. warm_tarot_library.py로 미리 채워 두고,
+없는 조합은 요청 시 생성해 저장합니다. 같은 조합을 동시에 요청하면 생성은 한 번만 합니다.
+"""
+import asyncio
+import base64
+import os
+import tempfile
+
+from starlette.concurrency import run_in_threadpool
+
+from app import metrics
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "static")
+TAROT_DIR = os.path.join(STATIC_DIR, "tarot")
+CARD_COUNT = 7  # 프론트 덱(TarotReader CARD_COUNT)과 동일
+MAX_CARD_NUMBER = 78
+IMAGE_MODEL = "dall-e-3"
+
+# 테마 이름 -> (디렉토리 이름, 프롬프트)
+THEMES = {
+    "신비로운 달빛": ("moonlight", "mystical moonlight, dark blue and silver, ethereal glowing moon"),
+    "불꽃": ("fire", "fire and flame, vivid red and orange, dramatic energy"),
+    "자연": ("nature", "lush nature, green forest, peaceful earth elements"),
+    "우주": ("cosmos", "cosmic space, nebula colors, stars and galaxies"),
+}
+DEFAULT_THEME = "신비로운 달빛"
+POSITIONS = {"과거": "past", "현재": "present", "미래": "future"}
+DEFAULT_POSITION = "현재"
+
+_inflight = {}  # 상대 경로 -> 생성 중인 Task
+
+def normalize(card_number, position: str, theme: str):
+    """라이브러리 키로 쓸 수 있게 값 정리 (알 수 없는 위치/테마는 기본값)"""
+    card_number = int(card_number)
+    if not 1 <= card_number <= MAX_CARD_NUMBER:
+        raise ValueError(f"card_number must be between 1 and {MAX_CARD_NUMBER}")
+    if position not in POSITIONS:
+        position = DEFAULT_POSITION
+    if theme not in THEMES:
+        theme = DEFAULT_THEME
+    return card_number, position, theme
+
+def relative_path(card_number: int, position: str, theme: str) -> str:
+    """/static 기준 경로 (예: tarot/moonlight/03-past.png)"""
+    return f"tarot/{THEMES[theme][0]}/{card_number:02d}-{POSITIONS[position]}.png"
+
+def build_prompt(card_number: int, position: str, theme: str) -> str:
+    return (
+        f"A beautiful tarot card illustration, card number {card_number}, representing '{position}' position, "
+        f"themed with {THEMES[theme][1]}. "
+        f"Ornate decorative border, mystical symbols, high quality digital art, vertical card format, "
+        f"no text, no words, artistic and symbolic."
+    )
+
+def _save(path: str, data: bytes):
+    # 임시 파일 이름을 고유하게 (워커 여러 개나 warm 스크립트가 같은 카드를 동시에 저장해도 서로 덮어쓰지 않음)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except FileNotFoundError:
+            pass
+        raise
+
+async def _generate(client, card_number: int, position: str, theme: str, rel: str) -> str:
+    with metrics.llm_call("tarot-image", IMAGE_MODEL):
+        response = await client.images.generate(
+            model=IMAGE_MODEL,
+            prompt=build_prompt(card_number, position, theme),
+            size="1024x1024",
+            quality="standard",
+            response_format="b64_json",
+            n=1
+        )
+    data = base64.b64decode(response.data[0].b64_json)
+    await run_in_threadpool(_save, os.path.join(STATIC_DIR, rel), data)
+    return rel
+
+def exists(rel: str) -> bool:
+    return os.path.exists(os.path.join(STATIC_DIR, rel))
+
+async def get_or_generate(client, card_number: int, position: str, theme: str) -> str:
+    """라이브러리 이미지의 /static 기준 경로. 없으면 생성해 저장 (client가 None이면 LookupError)"""
+    rel = relative_path(card_number, position, theme)
+    if exists(rel):
+        return rel
+    task = _inflight.get(rel)
+    if task is None:
+        if client is None:
+            raise LookupError(rel)
+        task = asyncio.ensure_future(_generate(client, card_number, position, theme, rel))
+        _inflight[rel] = task
+        task.add_done_callback(lambda _: _inflight.pop(rel, None))
+    # 기다리던 요청 하나가 끊겨도 생성은 계속되도록 shield
+    return await asyncio.shield(task)
+
+def all_keys(card_count: int = CARD_COUNT):
+    for theme in THEMES:
+        for position in POSITIONS:
+            for card_number in range(1, card_count + 1):
+                yield card_number, position, theme
@@ -0,0 +1,171 @@
+"""음성 일기 받아쓰기 (Whisper)
+
+1. 업로드를 메모리에 한 번에 올리지 않고 조각 단위로 요청별 임시 디렉토리(0700)에 저장
+2. ffprobe로 길이를 재고, 길면 ffmpeg로 겹치는 구간(segment)으로 분할
+3. 구간들을 동시에 Whisper로 보내고, 끝나는 대로 부분 결과를 내보냄
+4. 구간 순서대로 이어 붙이면서 겹친 부분의 중복 문장을 제거
+
+ffmpeg/ffprobe가 없으면 파일 하나를 그대로 보냅니다 (Whisper 25MB 제한 안에서만 가능).
+"""
+import asyncio
+import os
+import shutil
+import tempfile
+
+from fastapi import HTTPException, UploadFile
+from starlette.concurrency import run_in_threadpool
+
+from app import metrics
+
+WHISPER_MODEL = "whisper-1"
+WHISPER_MAX_BYTES = 25 * 1024 * 1024
+STT_SPOOL_DIR = os.getenv("STT_SPOOL_DIR") or os.path.join(tempfile.gettempdir(), "mindtrace-stt")
+STT_MAX_UPLOAD_MB = int(os.getenv("STT_MAX_UPLOAD_MB", "200"))
+STT_SEGMENT_SECONDS = int(os.getenv("STT_SEGMENT_SECONDS", "120"))
+STT_OVERLAP_SECONDS = int(os.getenv("STT_OVERLAP_SECONDS", "2"))
+STT_CONCURRENCY = int(os.getenv("STT_CONCURRENCY", "6"))
+SPOOL_CHUNK_BYTES = 1024 * 1024
+MAX_OVERLAP_WORDS = 12  # 겹친 구간에서 비교할 최대 단어 수
+
+def _has_ffmpeg() -> bool:
+    return bool(shutil.which("ffmpeg") and shutil.which("ffprobe"))
+
+async def spool_upload(file: UploadFile):
+    """업로드를 요청별 임시 디렉토리에 스트리밍 저장합니다. (디렉토리, 파일 경로) 반환
+
+    사용이 끝나면 cleanup(디렉토리)를 호출해야 합니다.
+    """
+    os.makedirs(STT_SPOOL_DIR, mode=0o700, exist_ok=True)
+    workdir = tempfile.mkdtemp(prefix="stt-", dir=STT_SPOOL_DIR)  # mkdtemp는 0700으로 생성
+    ext = os.path.splitext(file.filename or "")[1].lower()
+    path = os.path.join(workdir, "upload" + (ext if ext.isascii() and len(ext) <= 6 else ".webm"))
+    max_bytes = STT_MAX_UPLOAD_MB * 1024 * 1024
+    size = 0
+    try:
+        with open(path, "wb") as f:
+            while True:
+                chunk = await file.read(SPOOL_CHUNK_BYTES)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_bytes:
+                    raise HTTPException(status_code=413, detail=f"음성 파일은 {STT_MAX_UPLOAD_MB}MB까지 업로드할 수 있어요.")
+                await run_in_threadpool(f.write, chunk)
+    except BaseException:
+        cleanup(workdir)
+        raise
+    return workdir, path
+
+def cleanup(workdir: str):
+    shutil.rmtree(workdir, ignore_errors=True)
+
+async def _run(*args) -> bytes:
+    proc = await asyncio.create_subprocess_exec(
+        *args, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+    )
+    out, err = await proc.communicate()
+    if proc.returncode != 0:
+        raise RuntimeError(f"{args[0]} failed: {err.decode(errors='ignore')[-300:]}")
+    return out
+
+async def probe_duration(path: str):
+    """오디오 길이(초). 알 수 없으면 None"""
+    try:
+        out = await _run("ffprobe", "-v", "error", "-show_entries", "format=duration",
+                         "-of", "default=noprint_wrappers=1:nokey=1", path)
+        return float(out.decode().strip())
+    except (RuntimeError, ValueError):
+        return None
+
+def plan_segments(duration: float) -> list:
+    """[(start, length), ...] 각 구간은 앞 구간과 STT_OVERLAP_SECONDS만큼 겹침"""
+    if duration <= STT_SEGMENT_SECONDS + STT_OVERLAP_SECONDS:
+        return [(0.0, duration)]
+    segments, start = [], 0.0
+    while start < duration:
+        length = min(STT_SEGMENT_SECONDS + STT_OVERLAP_SECONDS, duration - start)
+        segments.append((start, length))
+        start += STT_SEGMENT_SECONDS
+    return segments
+
+async def _cut_segment(path: str, workdir: str, index: int, start: float, length: float) -> str:
+    # 16kHz 모노 mp3로 다시 인코딩 (2분 기준 약 0.7MB라 Whisper 크기 제한에 여유가 있음)
+    out = os.path.join(workdir, f"seg{index:04d}.mp3")
+    await _run("ffmpeg", "-nostdin", "-v", "error", "-y", "-ss", f"{start:.2f}", "-t", f"{length:.2f}",
+               "-i", path, "-vn", "-ac", "1", "-ar", "16000", "-b:a", "48k", out)
+    return out
+
+async def _transcribe_path(client, path: str) -> str:
+    audio = await run_in_threadpool(_read_file, path)
+    # 구간을 병렬로 보내므로 요청별 llm 시간은 구간 시간의 합 (벽시계 시간보다 클 수 있음)
+    with metrics.llm_call("stt", WHISPER_MODEL):
+        transcript = await client.audio.transcriptions.create(
+            model=WHISPER_MODEL,
+            file=(os.path.basename(path), audio),
+            language="ko"
+        )
+    return transcript.text.strip()
+
+def _read_file(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+def _merge_overlap(left: str, right: str) -> str:
+    """앞 구간 끝과 뒤 구간 시작에서 반복된 단어들을 한 번만 남기고 이어 붙임"""
+    if not left:
+        return right
+    if not right:
+        return left
+    lw, rw = left.split(), right.split()
+    for n in range(min(MAX_OVERLAP_WORDS, len(lw), len(rw)), 0, -1):
+        if [w.strip(".,!?") for w in lw[-n:]] == [w.strip(".,!?") for w in rw[:n]]:
+            return " ".join(lw + rw[n:])
+    return left + " " + right
+
+def stitch(texts: list) -> str:
+    result = ""
+    for text in texts:
+        result = _merge_overlap(result, text)
+    return result
+
+async def iter_transcription(client, path: str, workdir: str):
+    """("partial", {index, total, text}) 를 끝나는 순서대로, 마지막에 ("done", {text}) 를 내보냅니다."""
+    segments = None
+    if _has_ffmpeg():
+        duration = await probe_duration(path)
+        if duration:
+            segments = plan_segments(duration)
+    if segments is None:
+        if os.path.getsize(path) > WHISPER_MAX_BYTES:
+            raise HTTPException(status_code=413, detail="음성 파일이 너무 커요. (서버에 ffmpeg가 없어 25MB까지만 처리할 수 있어요)")
+        text = await _transcribe_path(client, path)
+        yield "partial", {"index": 0, "total": 1, "text": text}
+        yield "done", {"text": text}
+        return
+
+    semaphore = asyncio.Semaphore(STT_CONCURRENCY)
+
+    async def run_segment(index, start, length):
+        async with semaphore:
+            if len(segments) == 1:
+                seg_path = path if os.path.getsize(path) <= WHISPER_MAX_BYTES else await _cut_segment(path, workdir, index, start, length)
+            else:
+                seg_path = await _cut_segment(path, workdir, index, start, length)
+            return index, await _transcribe_path(client, seg_path)
+
+    tasks = [asyncio.create_task(run_segment(i, start, length)) for i, (start, length) in enumerate(segments)]
+    texts = [None] * len(segments)
+    try:
+        for finished in asyncio.as_completed(tasks):
+            index, text = await finished
+            texts[index] = text
+            yield "partial", {"index": index, "total": len(segments), "text": text}
+    finally:
+        for task in tasks:
+            task.cancel()
+    yield "done", {"text": stitch(texts)}
+
+async def transcribe(client, path: str, workdir: str) -> str:
+    async for event, data in iter_transcription(client, path, workdir):
+        if event == "done":
+            return data["text"]
@@ -0,0 +1,121 @@
+"""감정 추이 시계열 (/statistics/trend)
+
+기간 안의 감정 분석을 쿼리 한 번으로 읽어 (날짜 x 감정) 밀집 행렬을 만들고,
+일/주/월 구간 평균, 이동 평균, 변동성(이동 표준편차)을 NumPy 누적합으로 계산합니다.
+날짜는 사용자 시간대 기준이고, 일기가 없는 구간도 count 0으로 채워 차트가 끊기지 않게 합니다.
+"""
+from datetime import date, datetime, timedelta
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app import emotions, models, streaks
+from app.emotions import EMOTIONS
+
+DEFAULT_SPAN = {"day": 30, "week": 7 * 26, "month": 365}  # start를 안 주면 end에서 이만큼(일) 전부터
+DEFAULT_WINDOW = {"day": 7, "week": 4, "month": 3}       # 이동 평균/변동성 창 크기 (구간 수)
+MAX_DAYS = 366 * 10  # 한 번에 조회할 수 있는 최대 기간
+MIN_DATE, MAX_DATE = date(1900, 1, 1), date(9998, 12, 31)  # 시간대 변환/다음 날 계산이 범위를 넘지 않게
+MONDAY = np.datetime64("1970-01-05")
+
+def trend_query(db: Session, user_id: int, start: date, end: date, tz):
+    """(사용자 시간대 날짜, 기쁨, 슬픔, 불안, 분노, 평온) - (user_id, created_at) 인덱스 범위 조회 한 번"""
+    range_start, _ = streaks.day_bounds(start, tz)
+    _, range_end = streaks.day_bounds(end, tz)
+    day = streaks.local_date_expr(db, tz).label("day")
+    return db.query(day, *emotions.score_columns()).join(
+        models.EmotionAnalysis, models.EmotionAnalysis.diary_id == models.Diary.id
+    ).filter(
+        models.Diary.user_id == user_id,
+        models.Diary.created_at >= range_start, models.Diary.created_at < range_end,
+    )
+
+def load_matrix(db: Session, user_id: int, start: date, end: date, tz):
+    """(날짜 배열 datetime64[D], 날짜별 감정 합 (일수 x 5), 날짜별 분석 수) - start~end 모든 날짜 포함"""
+    rows = trend_query(db, user_id, start, end, tz).all()
+
+    days = np.arange(np.datetime64(start, "D"), np.datetime64(end, "D") + 1)
+    sums = np.zeros((len(days), len(EMOTIONS)))
+    counts = np.zeros(len(days))
+    if rows:
+        day_values, *score_values = zip(*rows)
+        index = (np.array([str(d) for d in day_values], dtype="datetime64[D]") - days[0]).astype(int)
+        scores = np.column_stack([np.asarray(v, dtype=float) for v in score_values])
+        keep = (index >= 0) & (index < len(days))
+        np.add.at(sums, index[keep], scores[keep])
+        counts = np.bincount(index[keep], minlength=len(days)).astype(float)
+    return days, sums, counts
+
+def _bucket_keys(days, bucket: str):
+    if bucket == "month":
+        return days.astype("datetime64[M]").astype("datetime64[D]")
+    if bucket == "week":
+        # 월요일 시작 주
+        return MONDAY + ((days - MONDAY) // 7) * 7
+    return days
+
+def _rolling_sum(values, window: int):
+    """앞쪽 window개 구간의 합 (누적합 차이, 처음 구간들은 있는 만큼만)"""
+    cumsum = np.cumsum(values, axis=0)
+    shifted = np.zeros_like(cumsum)
+    shifted[window:] = cumsum[:-window]
+    return cumsum - shifted
+
+def _to_dicts(matrix, valid) -> list:
+    rounded = np.round(matrix, 4)
+    return [dict(zip(EMOTIONS, row)) if ok else None for row, ok in zip(rounded.tolist(), valid.tolist())]
+
+def resolve_range(bucket: str, start: date, end: date, tz):
+    """기본값 적용: end는 사용자 시간대의 오늘, start는 end에서 DEFAULT_SPAN 전 (검증은 호출자 몫)"""
+    end = end or datetime.now(tz).date()
+    start = start or end - timedelta(days=DEFAULT_SPAN[bucket] - 1)
+    return start, end
+
+def emotion_trend(db: Session, user_id: int, bucket: str = "day", start: date = None, end: date = None,
+                  window: int = None, tz=None) -> dict:
+    tz = tz or streaks.user_zone(db, user_id)
+    start, end = resolve_range(bucket, start, end, tz)
+    window = window or DEFAULT_WINDOW[bucket]
+
+    days, sums, counts = load_matrix(db, user_id, start, end, tz)
+    keys, inverse = np.unique(_bucket_keys(days, bucket), return_inverse=True)
+    bucket_sums = np.zeros((len(keys), len(EMOTIONS)))
+    np.add.at(bucket_sums, inverse, sums)
+    bucket_counts = np.bincount(inverse, weights=counts, minlength=len(keys))
+
+    has_data = bucket_counts > 0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        means = np.where(has_data[:, None], bucket_sums / bucket_counts[:, None], 0.0)
+        # 이동 평균: 창 안의 모든 분석 평균 (분석이 많은 구간에 더 큰 가중치)
+        rolling_counts = _rolling_sum(bucket_counts, window)
+        rolling = _rolling_sum(bucket_sums, window) / rolling_counts[:, None]
+        # 변동성: 창 안에서 데이터가 있는 구간 평균들의 표준편차
+        present = has_data.astype(float)[:, None]
+        n = _rolling_sum(present, window)
+        s1 = _rolling_sum(means * present, window)
+        s2 = _rolling_sum(means ** 2 * present, window)
+        volatility = np.sqrt(np.maximum(s2 / n - (s1 / n) ** 2, 0.0))
+
+    labels = [str(k) for k in keys]
+    means_out = _to_dicts(means, has_data)
+    rolling_out = _to_dicts(rolling, rolling_counts > 0)
+    volatility_out = _to_dicts(volatility, n[:, 0] >= 2)
+    return {
+        "bucket": bucket,
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "window": window,
+        "timezone": tz.key,
+        "emotions": EMOTIONS,
+        "total_count": int(counts.sum()),
+        "points": [
+            {
+                "date": labels[i],
+                "count": int(bucket_counts[i]),
+                "emotions": means_out[i],
+                "rolling_average": rolling_out[i],
+                "volatility": volatility_out[i],
+            }
+            for i in range(len(keys))
+        ],
+    }
@@ -0,0 +1,124 @@
+"""TTS 음성 디스크 캐시
+
+같은 인사말/운세 문장을 반복해서 읽는 경우가 많아 sha256(model|voice|text)를 파일명으로
+mp3를 저장해 둡니다. 적중하면 FileResponse로 돌려주고(Range/ETag 지원),
+미적중이면 OpenAI 응답을 받는 대로 클라이언트에 흘려보내면서 임시 파일에 함께 기록한 뒤
+다 받으면 캐시 파일로 이름을 바꿉니다. 전체 크기가 TTS_CACHE_MAX_BYTES를 넘으면
+가장 오래 사용되지 않은 파일부터 지웁니다. (사용할 때마다 mtime 갱신)
+
+캐시 크기는 저장할 때마다 더해 가며 추정하고, 디렉토리 전체를 훑는 evict()는 추정치가 한도를
+넘었을 때나 EVICT_EVERY번 저장마다(다른 워커가 저장한 양 반영)만 실행합니다.
+이때 비정상 종료로 남은 오래된 .part 임시 파일도 함께 지웁니다.
+"""
+import hashlib
+import os
+import tempfile
+import threading
+import time
+
+TTS_CACHE_DIR = os.getenv("TTS_CACHE_DIR") or os.path.join(os.path.dirname(os.path.dirname(__file__)), "cache", "tts")
+TTS_CACHE_MAX_BYTES = int(os.getenv("TTS_CACHE_MAX_BYTES", str(500 * 1024 * 1024)))
+STREAM_CHUNK_BYTES = 16 * 1024
+EVICT_EVERY = 50              # 저장 N번마다 디렉토리를 다시 훑어 실제 크기로 맞춤
+STALE_PART_SECONDS = 3600     # 이보다 오래된 .part는 끊긴 스트림이 남긴 것으로 보고 삭제
+
+_evict_lock = threading.Lock()
+_lock = threading.Lock()
+_approx_bytes = None          # 캐시 크기 추정치 (None이면 아직 훑지 않음)
+_commits_since_evict = 0
+
+def make_key(model: str, voice: str, text: str) -> str:
+    return hashlib.sha256(f"{model}|{voice}|{text}".encode()).hexdigest()
+
+def path_for(key: str) -> str:
+    # 디렉토리 하나에 파일이 너무 많아지지 않게 앞 두 글자로 나눔
+    return os.path.join(TTS_CACHE_DIR, key[:2], f"{key}.mp3")
+
+def lookup(key: str):
+    """캐시 파일 경로 또는 None (적중 시 LRU 순서 갱신)"""
+    path = path_for(key)
+    try:
+        os.utime(path)
+    except FileNotFoundError:
+        return None
+    return path
+
+class CacheWriter:
+    """스트리밍 중인 음성을 임시 파일에 쓰고, 끝까지 받은 경우에만 캐시에 반영"""
+
+    def __init__(self, key: str):
+        self.path = path_for(key)
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        fd, self.tmp_path = tempfile.mkstemp(dir=os.path.dirname(self.path), suffix=".part")
+        self._file = os.fdopen(fd, "wb")
+
+    def write(self, chunk: bytes):
+        self._file.write(chunk)
+
+    def commit(self):
+        self._file.close()
+        size = os.path.getsize(self.tmp_path)
+        os.replace(self.tmp_path, self.path)
+        _added(size)
+
+    def abort(self):
+        self._file.close()
+        try:
+            os.remove(self.tmp_path)
+        except FileNotFoundError:
+            pass
+
+def _added(size: int):
+    """저장한 크기를 추정치에 더하고, 한도를 넘었거나 EVICT_EVERY번째 저장이면 evict()"""
+    global _approx_bytes, _commits_since_evict
+    with _lock:
+        _commits_since_evict += 1
+        if _approx_bytes is not None:
+            _approx_bytes += size
+        should_evict = (
+            _approx_bytes is None or _approx_bytes > TTS_CACHE_MAX_BYTES or _commits_since_evict >= EVICT_EVERY
+        )
+    if should_evict:
+        evict()
+
+def evict() -> int:
+    """오래된 .part를 지우고, 용량 초과분을 오래 사용되지 않은 파일부터 삭제. 삭제한 파일 수 반환"""
+    global _approx_bytes, _commits_since_evict
+    with _evict_lock:
+        entries, total, removed = [], 0, 0
+        stale_before = time.time() - STALE_PART_SECONDS
+        for root, _, files in os.walk(TTS_CACHE_DIR):
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                if name.endswith(".part"):
+                    if st.st_mtime < stale_before:
+                        try:
+                            os.remove(path)
+                            removed += 1
+                        except FileNotFoundError:
+                            pass
+                    else:
+                        total += st.st_size  # 쓰는 중인 임시 파일도 디스크를 차지하므로 포함
+                    continue
+                if not name.endswith(".mp3"):
+                    continue
+                entries.append((st.st_mtime, st.st_size, path))
+                total += st.st_size
+        if total > TTS_CACHE_MAX_BYTES:
+            for _, size, path in sorted(entries):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                total -= size
+                removed += 1
+                if total <= TTS_CACHE_MAX_BYTES:
+                    break
+        with _lock:
+            _approx_bytes = total
+            _commits_since_evict = 0
+        return removed
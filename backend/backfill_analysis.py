@@ -0,0 +1,173 @@
+"""일기 감정 분석 일괄 재분석 (reanalyze.py / fix_analysis.py 대체)
+
+사용 예:
+    python backfill_analysis.py                       # 분석이 없는 일기만
+    python backfill_analysis.py --mode stale          # 프롬프트 버전이 바뀐 일기까지
+    python backfill_analysis.py --mode all --concurrency 16 --rpm 500
+    python backfill_analysis.py --reset               # 체크포인트 무시하고 처음부터
+
+일기는 id 순으로 배치 단위 스트리밍(yield_per)되고, 배치마다 GPT 호출을 동시에 수행한 뒤
+결과를 한 번에 교체 저장합니다. 배치가 commit될 때마다 체크포인트(마지막 일기 id + 실패한 일기 id)를
+기록하므로 중단되어도 같은 명령으로 이어서 실행할 수 있고, 실패했던 일기는 다음 실행에서 먼저 재시도됩니다.
+기존 분석은 새 결과가 나온 경우에만 교체됩니다.
+"""
+import argparse
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv
+
+# .env 파일 로드 (루트 디렉토리)
+load_dotenv(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".env"))
+
+from sqlalchemy import or_
+from app.database import SessionLocal
+from app import models
+from app.analysis import ANALYSIS_PROMPT_VERSION, request_analysis, save_analyses_bulk
+from app.llm import get_openai_client
+
+DEFAULT_CHECKPOINT = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".backfill_checkpoint.json")
+
+class RateLimiter:
+    """분당 요청 수 제한 (스레드 안전한 간단한 토큰 버킷)"""
+
+    def __init__(self, per_minute: int):
+        self.interval = 60.0 / per_minute if per_minute > 0 else 0
+        self._next = time.monotonic()
+        self._lock = threading.Lock()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(self._next, now)
+            self._next = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+def load_checkpoint(path: str, mode: str):
+    """(마지막으로 처리한 일기 id, 재시도할 실패 일기 id 목록)"""
+    if not os.path.exists(path):
+        return 0, []
+    with open(path) as f:
+        data = json.load(f)
+    # 모드나 프롬프트 버전이 바뀌면 처음부터 다시
+    if data.get("mode") != mode or data.get("prompt_version") != ANALYSIS_PROMPT_VERSION:
+        return 0, []
+    return data.get("last_diary_id", 0), data.get("failed_diary_ids", [])
+
+def save_checkpoint(path: str, mode: str, last_diary_id: int, failed_diary_ids=()):
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump({"mode": mode, "prompt_version": ANALYSIS_PROMPT_VERSION, "last_diary_id": last_diary_id,
+                   "failed_diary_ids": sorted(failed_diary_ids)}, f)
+    os.replace(tmp, path)
+
+def target_query(db, mode: str, after_id: int, retry_ids=()):
+    """after_id 이후 일기 + 이전 실행에서 실패한 일기 (id 순이라 재시도 대상이 먼저 처리됨)"""
+    query = db.query(models.Diary.id, models.Diary.title, models.Diary.content).outerjoin(
+        models.EmotionAnalysis, models.EmotionAnalysis.diary_id == models.Diary.id
+    )
+    if retry_ids:
+        query = query.filter(or_(models.Diary.id > after_id, models.Diary.id.in_(retry_ids)))
+    else:
+        query = query.filter(models.Diary.id > after_id)
+    if mode == "missing":
+        query = query.filter(models.EmotionAnalysis.id == None)
+    elif mode == "stale":
+        query = query.filter(or_(
+            models.EmotionAnalysis.id == None,
+            models.EmotionAnalysis.prompt_version == None,
+            models.EmotionAnalysis.prompt_version != ANALYSIS_PROMPT_VERSION,
+        ))
+    return query.order_by(models.Diary.id)
+
+def run_backfill(mode: str, concurrency: int, rpm: int, batch_size: int, checkpoint: str, reset: bool):
+    client = get_openai_client()
+    if not client:
+        print("Error: OpenAI Client not initialized. Check API Key.")
+        return
+
+    after_id, retry_ids = (0, []) if reset else load_checkpoint(checkpoint, mode)
+    if after_id:
+        print(f"Resuming after diary {after_id} (checkpoint: {checkpoint})")
+    if retry_ids:
+        print(f"Retrying {len(retry_ids)} previously failed diaries")
+    # 체크포인트 상태: 재시도 대상은 id가 after_id 이하일 수 있으므로 last_id는 최댓값만 유지
+    progress = {"last_id": after_id, "retry": set(retry_ids)}
+
+    limiter = RateLimiter(rpm)
+
+    def analyze(row):
+        limiter.wait()
+        try:
+            # 재분석이 목적이므로 캐시된 결과는 사용하지 않음 (새 결과는 캐시에 저장)
+            return row.id, request_analysis(client, row.title, row.content, use_cache=False), None
+        except Exception as e:
+            return row.id, None, str(e)
+
+    read_db = SessionLocal()
+    write_db = SessionLocal()
+    processed, failures = 0, {}
+    started = time.monotonic()
+    try:
+        rows = target_query(read_db, mode, after_id, retry_ids).execution_options(stream_results=True).yield_per(batch_size)
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            batch = []
+            for row in rows:
+                batch.append(row)
+                if len(batch) < batch_size:
+                    continue
+                processed += _run_batch(pool, analyze, batch, write_db, failures, progress, checkpoint, mode)
+                _print_progress(processed, failures, started)
+                batch = []
+            if batch:
+                processed += _run_batch(pool, analyze, batch, write_db, failures, progress, checkpoint, mode)
+        # 끝까지 돌았으면 조회되지 않은 재시도 대상(삭제됐거나 이미 분석된 일기)은 버리고 이번 실패만 남김
+        save_checkpoint(checkpoint, mode, progress["last_id"], failures)
+    finally:
+        read_db.close()
+        write_db.close()
+
+    elapsed = time.monotonic() - started
+    rate = processed / elapsed * 60 if elapsed > 0 else 0
+    print(f"Done: {processed} diaries in {elapsed:.1f}s ({rate:.1f} diaries/min), {len(failures)} failed")
+    for diary_id, error in failures.items():
+        print(f"  Failed Diary {diary_id}: {error}")
+    if failures:
+        print("Failed diaries keep their previous analysis. Re-run the same command to retry them.")
+
+def _run_batch(pool, analyze, batch, write_db, failures, progress, checkpoint, mode) -> int:
+    results = {}
+    for diary_id, data, error in pool.map(analyze, batch):
+        if error:
+            failures[diary_id] = error
+        else:
+            results[diary_id] = data
+            failures.pop(diary_id, None)
+    save_analyses_bulk(write_db, results)
+    write_db.commit()
+    progress["last_id"] = max(progress["last_id"], batch[-1].id)
+    progress["retry"].difference_update(row.id for row in batch)
+    save_checkpoint(checkpoint, mode, progress["last_id"], progress["retry"] | set(failures))
+    return len(batch)
+
+def _print_progress(processed, failures, started):
+    elapsed = time.monotonic() - started
+    rate = processed / elapsed * 60 if elapsed > 0 else 0
+    print(f"... {processed} processed, {len(failures)} failed ({rate:.1f} diaries/min)")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk (re)analysis of diaries")
+    parser.add_argument("--mode", choices=["missing", "stale", "all"], default="missing",
+                        help="missing: 분석 없는 일기만, stale: 프롬프트 버전이 다른 일기 포함, all: 전체")
+    parser.add_argument("--concurrency", type=int, default=8, help="동시 GPT 호출 수")
+    parser.add_argument("--rpm", type=int, default=300, help="분당 최대 요청 수 (0 = 제한 없음)")
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--checkpoint", default=DEFAULT_CHECKPOINT)
+    parser.add_argument("--reset", action="store_true", help="체크포인트를 무시하고 처음부터 실행")
+    args = parser.parse_args()
+    run_backfill(args.mode, args.concurrency, args.rpm, args.batch_size, args.checkpoint, args.reset)
@@ -0,0 +1,42 @@
+"""부하 테스트 / 벤치마크
+
+backend 디렉토리에서 모듈로 실행합니다.
+
+    # 1. 가짜 OpenAI 서버 (지연/실패율 조절)
+    python -m bench.fake_openai --port 8900 --latency-ms 800 --failure-rate 0.02
+
+    # 2. 벤치마크용 DB에 가상 사용자/일기/분석/대화 생성
+    DATABASE_URL=postgresql://.../mindtrace_bench python migrate.py
+    DATABASE_URL=postgresql://.../mindtrace_bench python -m bench.seed --users 50 --diaries-per-user 300
+
+    # 3. 같은 DB와 가짜 OpenAI를 보도록 API 실행
+    DATABASE_URL=... OPENAI_BASE_URL=http://localhost:8900/v1 uvicorn app.main:app --workers 2 --port 8000
+
+    # 4. 부하 실행 -> bench/results/<시각>-<커밋>.json
+    python -m bench.run --duration 60 --concurrency 32
+
+    # 5. 커밋 간 비교 (p95가 기준보다 10% 넘게 느려지면 exit 1)
+    python -m bench.compare bench/results/A.json bench/results/B.json
+
+    # 주요 쿼리가 순차 스캔으로 떨어지지 않았는지 검사 (시드된 DB 대상, 실패 시 exit 1)
+    python -m bench.explain
+"""
+import os
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+RESULTS_DIR = os.path.join(BENCH_DIR, "results")
+USERS_FILE = os.path.join(RESULTS_DIR, "users.json")
+BENCH_EMAIL_DOMAIN = "bench.mindtrace.local"
+
+# 일기/검색어 생성에 쓰는 문장 조각 (seed와 run이 같은 단어로 검색하도록 공유)
+SEARCH_WORDS = ["회사", "친구", "산책", "커피", "가족", "운동", "비", "영화", "시험", "여행", "고양이", "저녁"]
+SENTENCES = [
+    "오늘은 {w}와 관련된 일이 많았다.",
+    "아침부터 {w} 생각이 머리를 떠나지 않았다.",
+    "{w} 덕분에 조금 웃을 수 있었다.",
+    "{w} 때문에 마음이 복잡했지만 잘 넘겼다.",
+    "저녁에는 {w} 이야기를 하며 시간을 보냈다.",
+    "내일은 {w}을 조금 더 신경 써야겠다.",
+    "{w}을 떠올리니 마음이 편안해졌다.",
+]
+EMOTIONS = ["기쁨", "슬픔", "불안", "분노", "평온"]
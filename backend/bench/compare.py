@@ -0,0 +1,85 @@
+"""벤치마크 결과 두 개 비교
+
+엔드포인트별 p50/p95/p99, RPS, 오류율 변화를 출력합니다. p95가 --threshold(%)보다 크게 늘거나
+오류율이 늘어난 엔드포인트가 있으면 exit 1 (CI에서 회귀 검사용).
+
+사용 예:
+    python -m bench.compare bench/results/20250101T000000-abc1234.json bench/results/20250102T000000-def5678.json
+    python -m bench.compare --latest           # results 폴더의 가장 최근 두 결과
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+
+from bench import RESULTS_DIR
+
+METRICS = ["p50_ms", "p95_ms", "p99_ms", "rps", "error_rate"]
+
+def load(path: str) -> dict:
+    with open(path) as f:
+        return json.load(f)
+
+def _change(base: float, head: float) -> str:
+    if not base:
+        return "   n/a"
+    return f"{(head - base) / base * 100:+6.1f}%"
+
+def compare(base: dict, head: dict, threshold: float) -> list:
+    """표를 출력하고 회귀한 엔드포인트 목록을 반환"""
+    regressions = []
+    print(f"base: {base['meta'].get('commit')} ({base['meta'].get('label') or '-'})  "
+          f"head: {head['meta'].get('commit')} ({head['meta'].get('label') or '-'})")
+    if base["meta"].get("mix") != head["meta"].get("mix") or base["meta"].get("concurrency") != head["meta"].get("concurrency"):
+        print("Warning: runs used different workload mix or concurrency")
+    rows = [(name, base["endpoints"].get(name), head["endpoints"].get(name))
+            for name in sorted(set(base["endpoints"]) | set(head["endpoints"]))]
+    rows.append(("overall", base["overall"], head["overall"]))
+
+    print(f"{'endpoint':<12}" + "".join(f"{m:>24}" for m in METRICS))
+    for name, b, h in rows:
+        if not b or not h:
+            print(f"{name:<12} (only in {'head' if h else 'base'})")
+            continue
+        cells = []
+        for m in METRICS:
+            if m == "error_rate":
+                cells.append(f"{b[m] * 100:.2f}% -> {h[m] * 100:.2f}%")
+            else:
+                cells.append(f"{b[m]:>8.1f} -> {h[m]:>8.1f} {_change(b[m], h[m])}")
+        print(f"{name:<12}" + "".join(f"{c:>24}" for c in cells))
+        if name == "overall":
+            continue
+        if b["p95_ms"] and (h["p95_ms"] - b["p95_ms"]) / b["p95_ms"] * 100 > threshold:
+            regressions.append(f"{name}: p95 {b['p95_ms']}ms -> {h['p95_ms']}ms")
+        if h["error_rate"] > b["error_rate"]:
+            regressions.append(f"{name}: error rate {b['error_rate']:.2%} -> {h['error_rate']:.2%}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare two load test results")
+    parser.add_argument("base", nargs="?", help="기준 결과 JSON")
+    parser.add_argument("head", nargs="?", help="비교할 결과 JSON")
+    parser.add_argument("--latest", action="store_true", help="results 폴더의 가장 최근 두 결과 비교")
+    parser.add_argument("--threshold", type=float, default=10.0, help="허용하는 p95 증가율 (%%)")
+    args = parser.parse_args()
+
+    if args.latest:
+        paths = sorted(p for p in glob.glob(os.path.join(RESULTS_DIR, "*.json")) if not p.endswith("users.json"))
+        if len(paths) < 2:
+            parser.error("need at least two results in bench/results")
+        args.base, args.head = paths[-2], paths[-1]
+    elif not (args.base and args.head):
+        parser.error("give two result files or --latest")
+
+    regressions = compare(load(args.base), load(args.head), args.threshold)
+    if regressions:
+        print("\nRegressions:")
+        for line in regressions:
+            print(f"  - {line}")
+        sys.exit(1)
+    print("\nNo regressions")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""자주 실행되는 쿼리의 실행 계획 검사
+
+bench.seed로 채운 DB에서 API의 주요 쿼리를 EXPLAIN 하고, 대상 테이블을 순차 스캔(Seq Scan)하는
+쿼리가 있으면 exit 1로 끝납니다. 인덱스를 지우거나 쿼리 모양이 바뀌어 인덱스를 못 타게 되는 회귀를 잡기 위한 것입니다.
+
+PostgreSQL에서는 기본으로 enable_seqscan=off로 검사합니다. 이렇게 하면 시드 데이터가 작아서
+플래너가 순차 스캔을 고르는 경우는 걸러지고, 쓸 수 있는 인덱스가 없을 때만 Seq Scan이 남습니다.
+(--planner-default로 실제 비용 기준 계획도 볼 수 있음) SQLite에서는 EXPLAIN QUERY PLAN의 SCAN을 검사합니다.
+
+사용 예:
+    python -m bench.explain
+    python -m bench.explain --verbose --user 3
+"""
+import argparse
+import json
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+
+from dotenv import load_dotenv
+
+# .env 파일 로드 (루트 디렉토리)
+load_dotenv(os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), ".env"))
+
+from sqlalchemy import or_, select, text
+from sqlalchemy.orm import joinedload
+
+from app import models, search, streaks, trends
+from app.database import SessionLocal, engine
+from app.mood_calendar import month_days_query
+from app.reports import month_range
+from bench import BENCH_EMAIL_DOMAIN, SEARCH_WORDS
+
+def hot_queries(db, user_id: int) -> dict:
+    """이름 -> SQLAlchemy 쿼리/select (api.py / reports.py 의 쿼리와 같은 모양)"""
+    Diary, AIChat = models.Diary, models.AIChat
+    diary_ids = [i for (i,) in db.query(Diary.id).filter(Diary.user_id == user_id).limit(20).all()] or [0]
+    chat_id = db.query(AIChat.id).filter(AIChat.user_id == user_id).limit(1).scalar() or 0
+    now = datetime.now(timezone.utc)
+    today = now.date().isoformat()
+    month_start, month_end = month_range(now.year, now.month)
+    list_order = (Diary.is_pinned.desc(), Diary.created_at.desc(), Diary.id.desc())
+    return {
+        # GET /diaries?limit=20 (view=full은 분석을 joinedload)
+        "diary_list": db.query(Diary).options(joinedload(Diary.analysis))
+            .filter(Diary.user_id == user_id).order_by(*list_order).limit(21),
+        "diary_list_summary": db.query(Diary.id, Diary.title, Diary.is_pinned, Diary.created_at)
+            .filter(Diary.user_id == user_id).order_by(*list_order).limit(21),
+        # GET /diaries?emotion=불안&threshold=0.6
+        "diary_list_emotion": db.query(Diary.id).filter(
+            Diary.user_id == user_id, Diary.analysis.has(models.EmotionAnalysis.anxiety > 0.6)
+        ).order_by(*list_order).limit(21),
+        # 다음 페이지 (_after_cursor)
+        "diary_list_cursor": db.query(Diary.id).filter(
+            Diary.user_id == user_id, Diary.is_pinned == False,
+            or_(Diary.created_at < now - timedelta(days=30), Diary.created_at == now - timedelta(days=30))
+        ).order_by(*list_order).limit(21),
+        # 월간 리포트 (reports.month_diaries)
+        "month_diaries": db.query(Diary).filter(
+            Diary.user_id == user_id, Diary.created_at >= month_start, Diary.created_at < month_end
+        ).order_by(Diary.created_at, Diary.id),
+        # GET /calendar (mood_calendar.month_days)
+        "calendar": month_days_query(db, user_id, now.year, now.month, streaks.user_zone(db, user_id)),
+        # GET /statistics/trend (최근 1년)
+        "emotion_trend": trends.trend_query(
+            db, user_id, now.date() - timedelta(days=365), now.date(), streaks.user_zone(db, user_id)
+        ),
+        # post_ai_chat의 오늘 일기
+        "today_diary": db.query(Diary).filter(
+            Diary.user_id == user_id,
+            Diary.created_at >= today + " 00:00:00", Diary.created_at <= today + " 23:59:59"
+        ).limit(1),
+        "analysis_by_diary": db.query(models.EmotionAnalysis).filter(models.EmotionAnalysis.diary_id.in_(diary_ids)),
+        "ai_chat_today": db.query(AIChat).filter(AIChat.user_id == user_id, AIChat.date == today).limit(1),
+        # 프롬프트용 최근 메시지 / 대화 페이지 조회
+        "ai_chat_recent_messages": db.query(models.AIChatMessage.role, models.AIChatMessage.content)
+            .filter(models.AIChatMessage.chat_id == chat_id).order_by(models.AIChatMessage.seq.desc()).limit(9),
+        "ai_chat_archive": db.query(AIChat).filter(
+            AIChat.user_id == user_id, (AIChat.fortune != None) | (AIChat.tarot != None)
+        ).order_by(AIChat.date.desc()),
+        # 일기 추가/삭제 시 스트릭 구간 찾기 (streaks.add_day / remove_day / _refresh_summary)
+        "streak_run_covering": db.query(models.UserStreakRun).filter(
+            models.UserStreakRun.user_id == user_id, models.UserStreakRun.end_day >= now.date()
+        ).order_by(models.UserStreakRun.end_day).limit(1),
+        "streak_longest": db.query(models.UserStreakRun.length).filter(models.UserStreakRun.user_id == user_id)
+            .order_by(models.UserStreakRun.length.desc()).limit(1),
+        "categories": db.query(models.Category).filter(models.Category.user_id == user_id),
+        "search": db.query(Diary.id).filter(
+            Diary.id.in_(select(search.ranked_matches(db, user_id, SEARCH_WORDS[0]).c.diary_id))
+        ),
+    }
+
+CHECKED_TABLES = {
+    "diaries", "emotion_analyses", "ai_chats", "ai_chat_messages", "categories", "diary_search_terms", "user_streak_runs",
+}
+
+def _pg_seq_scans(plan: dict) -> list:
+    found = []
+    if plan.get("Node Type") == "Seq Scan" and plan.get("Relation Name") in CHECKED_TABLES:
+        found.append(plan["Relation Name"])
+    for child in plan.get("Plans", []):
+        found.extend(_pg_seq_scans(child))
+    return found
+
+def explain(conn, sql: str):
+    """(순차 스캔한 테이블 목록, 계획 텍스트)"""
+    if conn.dialect.name == "postgresql":
+        plan = conn.exec_driver_sql("EXPLAIN (FORMAT JSON) " + sql).scalar()
+        plan = plan if isinstance(plan, list) else json.loads(plan)
+        text_plan = "\n".join(r[0] for r in conn.exec_driver_sql("EXPLAIN " + sql))
+        return _pg_seq_scans(plan[0]["Plan"]), text_plan
+    rows = conn.exec_driver_sql("EXPLAIN QUERY PLAN " + sql).all()
+    details = [row[-1] for row in rows]
+    # SQLite: "SCAN diaries" (전체 스캔) vs "SEARCH diaries USING INDEX ..."
+    scans = [d.split()[1] for d in details if d.startswith("SCAN ") and d.split()[1] in CHECKED_TABLES]
+    return scans, "\n".join(details)
+
+def main():
+    parser = argparse.ArgumentParser(description="Fail if a hot query falls back to a sequential scan")
+    parser.add_argument("--user", type=int, help="검사에 쓸 사용자 id (기본: 일기가 가장 많은 벤치마크 사용자)")
+    parser.add_argument("--planner-default", action="store_true", help="enable_seqscan을 끄지 않고 실제 비용 기준 계획 검사")
+    parser.add_argument("--verbose", action="store_true", help="모든 쿼리의 실행 계획 출력")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        user_id = args.user or db.query(models.Diary.user_id).join(models.User).filter(
+            models.User.email.like(f"%@{BENCH_EMAIL_DOMAIN}")
+        ).group_by(models.Diary.user_id).order_by(text("COUNT(*) DESC")).limit(1).scalar()
+        if not user_id:
+            sys.exit("No bench users found; run `python -m bench.seed` first or pass --user")
+        queries = hot_queries(db, user_id)
+    finally:
+        db.close()
+
+    failures = []
+    with engine.connect() as conn:
+        if conn.dialect.name == "postgresql":
+            conn.execute(text("ANALYZE"))
+            if not args.planner_default:
+                conn.execute(text("SET enable_seqscan = off"))
+        for name, query in queries.items():
+            sql = str(getattr(query, "statement", query).compile(dialect=conn.dialect, compile_kwargs={"literal_binds": True}))
+            scans, plan = explain(conn, sql)
+            status = "FAIL" if scans else "ok"
+            print(f"[{status:>4}] {name}" + (f"  (sequential scan on {', '.join(sorted(set(scans)))})" if scans else ""))
+            if scans or args.verbose:
+                print("       " + plan.replace("\n", "\n       "))
+            if scans:
+                failures.append(name)
+        conn.rollback()
+
+    if failures:
+        print(f"\n{len(failures)} hot queries use a sequential scan: {', '.join(failures)}")
+        sys.exit(1)
+    print(f"\nAll {len(queries)} hot queries use indexes (user {user_id})")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+"""벤치마크용 가짜 OpenAI 서버
+
+chat.completions(일반/스트리밍), audio.speech, audio.transcriptions, images.generate를
+앱이 파싱할 수 있는 형태로 흉내 냅니다. 지연 시간과 실패율은 옵션으로 조절합니다.
+API는 OPENAI_BASE_URL=http://localhost:<port>/v1 로 실행하면 이 서버를 사용합니다.
+
+사용 예:
+    python -m bench.fake_openai --port 8900 --latency-ms 800 --jitter-ms 400 --failure-rate 0.02
+"""
+import argparse
+import asyncio
+import base64
+import json
+import random
+import time
+import uuid
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from bench import EMOTIONS, SEARCH_WORDS
+
+app = FastAPI(title="Fake OpenAI")
+
+# main()에서 옵션으로 덮어씀
+settings = {
+    "latency_ms": 500.0,      # 응답(스트리밍은 첫 토큰)까지 기본 지연
+    "jitter_ms": 250.0,       # 0 ~ jitter_ms 사이 추가 지연
+    "chunk_ms": 20.0,         # 스트리밍 청크 간격
+    "failure_rate": 0.0,      # 이 비율만큼 failure_status로 응답
+    "failure_status": 500,
+}
+counters = {"requests": 0, "failures": 0}
+
+# 1x1 PNG (타로 이미지 생성 응답용)
+TINY_PNG = base64.b64encode(bytes.fromhex(
+    "89504e470d0a1a0a0000000d49484452000000010000000108060000001f15c489"
+    "0000000d49444154789c6360f8cfc0f01f0005000201e2e2a2a30000000049454e44ae426082"
+)).decode()
+
+async def _delay():
+    await asyncio.sleep((settings["latency_ms"] + random.random() * settings["jitter_ms"]) / 1000)
+
+def _should_fail() -> bool:
+    counters["requests"] += 1
+    if random.random() < settings["failure_rate"]:
+        counters["failures"] += 1
+        return True
+    return False
+
+def _failure() -> JSONResponse:
+    return JSONResponse(
+        {"error": {"message": "fake upstream failure", "type": "server_error", "code": None}},
+        status_code=settings["failure_status"],
+    )
+
+def _tokens(text: str) -> int:
+    return max(len(text) // 2, 1)
+
+def _reply_text(body: dict) -> str:
+    """요청 종류(분석/제목 추천/대화)에 맞는 응답 본문"""
+    messages = body.get("messages", [])
+    system = " ".join(m.get("content", "") for m in messages if m.get("role") == "system")
+    last = messages[-1].get("content", "") if messages else ""
+    word = random.choice(SEARCH_WORDS)
+    if (body.get("response_format") or {}).get("type") == "json_object":
+        if "positive_points" in system:
+            weights = [random.random() for _ in EMOTIONS]
+            total = sum(weights)
+            return json.dumps({
+                "summary": f"{word}에 대한 하루를 담담하게 기록한 일기입니다.",
+                "emotions": {e: round(w / total, 2) for e, w in zip(EMOTIONS, weights)},
+                "keywords": random.sample(SEARCH_WORDS, 3),
+                "card_message": "오늘도 충분히 잘 해냈어요.",
+                "positive_points": ["하루를 기록했다", f"{word}을 돌아봤다", "스스로를 돌봤다"],
+                "improvement_points": "조금 더 일찍 쉬어도 괜찮아요.",
+            }, ensure_ascii=False)
+        if "titles" in last:
+            return json.dumps({"titles": [f"{word}의 하루", "조용한 저녁", "작은 기쁨"]}, ensure_ascii=False)
+        return json.dumps({
+            "reply": f"{word} 이야기 잘 들었어요. 오늘 하루도 정말 수고 많았어요!",
+            "mood": random.choice(["NORMAL", "HAPPY", "EXCITED"]),
+        }, ensure_ascii=False)
+    return f"이번 기록에서는 {word}에 대한 생각이 자주 보였어요. " * 4
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    await _delay()
+    if _should_fail():
+        return _failure()
+    text = _reply_text(body)
+    prompt_tokens = sum(_tokens(m.get("content", "")) for m in body.get("messages", []))
+    base = {"id": f"chatcmpl-{uuid.uuid4().hex[:12]}", "created": int(time.time()), "model": body.get("model", "gpt-4o")}
+
+    if not body.get("stream"):
+        return {
+            **base, "object": "chat.completion",
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": _tokens(text),
+                      "total_tokens": prompt_tokens + _tokens(text)},
+        }
+
+    include_usage = (body.get("stream_options") or {}).get("include_usage")
+
+    async def events():
+        for i in range(0, len(text), 8):
+            chunk = {**base, "object": "chat.completion.chunk",
+                     "choices": [{"index": 0, "delta": {"content": text[i:i + 8]}, "finish_reason": None}]}
+            yield f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n"
+            await asyncio.sleep(settings["chunk_ms"] / 1000)
+        done = {**base, "object": "chat.completion.chunk",
+                "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]}
+        yield f"data: {json.dumps(done)}\n\n"
+        if include_usage:
+            usage = {**base, "object": "chat.completion.chunk", "choices": [],
+                     "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": _tokens(text),
+                               "total_tokens": prompt_tokens + _tokens(text)}}
+            yield f"data: {json.dumps(usage)}\n\n"
+        yield "data: [DONE]\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+@app.post("/v1/audio/speech")
+async def speech(request: Request):
+    body = await request.json()
+    await _delay()
+    if _should_fail():
+        return _failure()
+    size = max(len(body.get("input", "")) * 400, 4096)  # 대략 글자당 400바이트 mp3
+
+    async def audio():
+        sent = 0
+        while sent < size:
+            n = min(16384, size - sent)
+            sent += n
+            yield b"\xff\xf3" + bytes(n - 2)
+            await asyncio.sleep(settings["chunk_ms"] / 1000)
+
+    return StreamingResponse(audio(), media_type="audio/mpeg")
+
+@app.post("/v1/audio/transcriptions")
+async def transcriptions(request: Request):
+    await request.body()
+    await _delay()
+    if _should_fail():
+        return _failure()
+    return {"text": f"오늘은 {random.choice(SEARCH_WORDS)} 때문에 바쁜 하루였다."}
+
+@app.post("/v1/images/generations")
+async def images(request: Request):
+    await request.json()
+    await _delay()
+    if _should_fail():
+        return _failure()
+    return {"created": int(time.time()), "data": [{"b64_json": TINY_PNG}]}
+
+@app.get("/stats")
+async def stats():
+    return {**counters, "settings": settings}
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake OpenAI server for load tests")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--latency-ms", type=float, default=settings["latency_ms"])
+    parser.add_argument("--jitter-ms", type=float, default=settings["jitter_ms"])
+    parser.add_argument("--chunk-ms", type=float, default=settings["chunk_ms"], help="스트리밍 청크 간격")
+    parser.add_argument("--failure-rate", type=float, default=settings["failure_rate"], help="0~1")
+    parser.add_argument("--failure-status", type=int, default=settings["failure_status"], help="실패 시 상태 코드 (500, 429 등)")
+    parser.add_argument("--seed", type=int, help="지연/실패 난수 시드")
+    args = parser.parse_args()
+    if args.seed is not None:
+        random.seed(args.seed)
+    settings.update(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, chunk_ms=args.chunk_ms,
+                    failure_rate=args.failure_rate, failure_status=args.failure_status)
+
+    import uvicorn
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+if __name__ == "__main__":
+    main()
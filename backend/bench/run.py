@@ -0,0 +1,222 @@
+"""부하 실행기
+
+bench.seed로 만든 사용자들로 실행 중인 API에 시나리오를 섞어 요청을 보내고,
+엔드포인트별 p50/p95/p99 지연 시간과 RPS를 출력한 뒤 bench/results/<시각>-<커밋>.json에 저장합니다.
+
+사용 예:
+    python -m bench.run --duration 60 --concurrency 32
+    python -m bench.run --mix list=1 --label list-only
+    python -m bench.run --mix list=40,search=20,statistics=15,create=10,chat=10,report=5
+    python -m bench.run --mix calendar=1 --label calendar-only
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import random
+import subprocess
+import time
+from datetime import datetime, timezone
+
+import httpx
+
+from bench import BENCH_DIR, RESULTS_DIR, SEARCH_WORDS, SENTENCES, USERS_FILE
+
+DEFAULT_MIX = "list=35,search=20,statistics=15,create=10,chat=10,report=10"
+
+async def list_diaries(client, user, rng, ctx):
+    return await client.get("/api/diaries", params={"limit": 20, "view": "summary"}, headers=user["headers"])
+
+async def search_diaries(client, user, rng, ctx):
+    return await client.get("/api/diaries/search", params={"q": rng.choice(SEARCH_WORDS)}, headers=user["headers"])
+
+async def statistics(client, user, rng, ctx):
+    return await client.get("/api/statistics", headers=user["headers"])
+
+async def create_diary(client, user, rng, ctx):
+    content = " ".join(rng.choice(SENTENCES).format(w=rng.choice(SEARCH_WORDS)) for _ in range(5))
+    return await client.post("/api/diaries", json={"title": "벤치마크 일기", "content": content}, headers=user["headers"])
+
+async def ai_chat(client, user, rng, ctx):
+    return await client.post("/api/ai-chat", json={"message": f"오늘 {rng.choice(SEARCH_WORDS)} 때문에 힘들었어"},
+                             headers=user["headers"])
+
+async def monthly_report(client, user, rng, ctx):
+    year, month = rng.choice(ctx["months"])
+    return await client.get("/api/report/monthly", params={"year": year, "month": month}, headers=user["headers"])
+
+async def mood_calendar(client, user, rng, ctx):
+    year, month = rng.choice(ctx["months"])
+    return await client.get("/api/calendar", params={"year": year, "month": month}, headers=user["headers"])
+
+SCENARIOS = {
+    "list": list_diaries,
+    "search": search_diaries,
+    "statistics": statistics,
+    "create": create_diary,
+    "chat": ai_chat,
+    "report": monthly_report,
+    "calendar": mood_calendar,
+}
+
+def parse_mix(spec: str) -> dict:
+    mix = {}
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in SCENARIOS:
+            raise SystemExit(f"Unknown scenario '{name}' (choose from {', '.join(SCENARIOS)})")
+        mix[name] = float(weight or 1)
+    return mix
+
+def recent_months(count: int) -> list:
+    now = datetime.now(timezone.utc)
+    year, month = now.year, now.month
+    months = []
+    for _ in range(count):
+        months.append((year, month))
+        year, month = (year - 1, 12) if month == 1 else (year, month - 1)
+    return months
+
+def percentile(sorted_values: list, pct: float) -> float:
+    """nearest-rank 백분위수"""
+    if not sorted_values:
+        return 0.0
+    rank = max(math.ceil(pct / 100 * len(sorted_values)) - 1, 0)
+    return sorted_values[rank]
+
+def summarize(samples: list, elapsed: float) -> dict:
+    """samples: [(latency초, 성공 여부)]"""
+    latencies = sorted(s[0] * 1000 for s in samples)
+    errors = sum(1 for s in samples if not s[1])
+    return {
+        "requests": len(samples),
+        "errors": errors,
+        "error_rate": round(errors / len(samples), 4) if samples else 0.0,
+        "rps": round(len(samples) / elapsed, 2) if elapsed else 0.0,
+        "mean_ms": round(sum(latencies) / len(latencies), 2) if latencies else 0.0,
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p95_ms": round(percentile(latencies, 95), 2),
+        "p99_ms": round(percentile(latencies, 99), 2),
+        "max_ms": round(latencies[-1], 2) if latencies else 0.0,
+    }
+
+async def worker(client, users, mix, ctx, rng, deadline, warmup_until, samples, status_counts):
+    names, weights = list(mix), list(mix.values())
+    while time.perf_counter() < deadline:
+        name = rng.choices(names, weights)[0]
+        user = rng.choice(users)
+        started = time.perf_counter()
+        try:
+            response = await SCENARIOS[name](client, user, rng, ctx)
+            ok = response.status_code < 400
+            status = str(response.status_code)
+        except httpx.HTTPError as e:
+            ok, status = False, type(e).__name__
+        finished = time.perf_counter()
+        if started >= warmup_until:
+            samples.setdefault(name, []).append((finished - started, ok))
+            key = f"{name}:{status}"
+            status_counts[key] = status_counts.get(key, 0) + 1
+
+def git_info() -> dict:
+    def git(*args):
+        try:
+            return subprocess.check_output(["git", *args], cwd=BENCH_DIR, stderr=subprocess.DEVNULL, text=True).strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+    return {
+        "commit": git("rev-parse", "--short", "HEAD"),
+        "branch": git("rev-parse", "--abbrev-ref", "HEAD"),
+        "dirty": bool(git("status", "--porcelain", "--", "..")),  # backend 코드 변경 여부
+    }
+
+async def run(args) -> dict:
+    with open(args.users_file) as f:
+        seeded = json.load(f)
+    users = [{"email": u["email"], "headers": {"Authorization": f"Bearer {u['token']}"}} for u in seeded["users"]]
+    if not users:
+        raise SystemExit("No users in users file; run `python -m bench.seed` first")
+    mix = parse_mix(args.mix)
+    ctx = {"months": recent_months(seeded.get("seed", {}).get("months", 12))}
+
+    samples, status_counts = {}, {}
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout, limits=limits) as client:
+        (await client.get("/health")).raise_for_status()
+        start = time.perf_counter()
+        warmup_until = start + args.warmup
+        deadline = warmup_until + args.duration
+        await asyncio.gather(*[
+            worker(client, users, mix, ctx, random.Random(args.seed + i), deadline, warmup_until, samples, status_counts)
+            for i in range(args.concurrency)
+        ])
+        elapsed = time.perf_counter() - warmup_until
+        try:
+            pool = (await client.get("/health/db")).json()
+        except (httpx.HTTPError, ValueError):
+            pool = None
+
+    all_samples = [s for values in samples.values() for s in values]
+    return {
+        "meta": {
+            **git_info(),
+            "label": args.label,
+            "started_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "base_url": args.base_url,
+            "duration_s": args.duration,
+            "warmup_s": args.warmup,
+            "concurrency": args.concurrency,
+            "mix": mix,
+            "users": len(users),
+            "seed_options": seeded.get("seed"),
+            "python": platform.python_version(),
+        },
+        "overall": summarize(all_samples, elapsed),
+        "endpoints": {name: summarize(values, elapsed) for name, values in sorted(samples.items())},
+        "status_counts": dict(sorted(status_counts.items())),
+        "db_pool": pool,
+    }
+
+def print_report(result: dict):
+    header = f"{'endpoint':<12}{'reqs':>8}{'err%':>7}{'rps':>9}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}"
+    print(header)
+    print("-" * len(header))
+    rows = list(result["endpoints"].items()) + [("overall", result["overall"])]
+    for name, s in rows:
+        print(f"{name:<12}{s['requests']:>8}{s['error_rate'] * 100:>6.1f}%{s['rps']:>9.1f}"
+              f"{s['p50_ms']:>9.1f}{s['p95_ms']:>9.1f}{s['p99_ms']:>9.1f}{s['max_ms']:>9.1f}")
+    print("(latency in ms)")
+
+def save(result: dict, out_dir: str) -> str:
+    os.makedirs(out_dir, exist_ok=True)
+    meta = result["meta"]
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S")
+    name = "-".join(p for p in [stamp, meta["commit"] or "nogit", "dirty" if meta["dirty"] else None, meta["label"]] if p)
+    path = os.path.join(out_dir, f"{name}.json")
+    with open(path, "w") as f:
+        json.dump(result, f, indent=2, ensure_ascii=False)
+    return path
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a scripted load test against the API")
+    parser.add_argument("--base-url", default=os.getenv("BENCH_BASE_URL", "http://localhost:8000"))
+    parser.add_argument("--users-file", default=USERS_FILE)
+    parser.add_argument("--duration", type=float, default=30, help="측정 시간 (초)")
+    parser.add_argument("--warmup", type=float, default=5, help="측정 전 워밍업 (초)")
+    parser.add_argument("--concurrency", type=int, default=16, help="동시 가상 클라이언트 수")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"시나리오=가중치 목록 (기본: {DEFAULT_MIX})")
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--label", help="결과 파일 이름에 붙일 표시 (예: pool-20)")
+    parser.add_argument("--out-dir", default=RESULTS_DIR)
+    args = parser.parse_args()
+
+    result = asyncio.run(run(args))
+    print_report(result)
+    print(f"Saved {save(result, args.out_dir)}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""벤치마크용 가상 데이터 생성
+
+가상 사용자마다 카테고리, 일기(지난 N개월에 분산), 감정 분석, AI 대화를 만들고
+검색 색인과 감정 통계 집계까지 채웁니다. 부하 실행기가 쓸 토큰은 bench/results/users.json에 저장합니다.
+같은 --seed면 같은 데이터가 만들어집니다.
+
+사용 예:
+    python -m bench.seed --users 50 --diaries-per-user 300 --chats-per-user 30
+    python -m bench.seed --reset-only    # 이전에 만든 벤치마크 사용자 삭제
+"""
+import argparse
+import json
+import os
+import random
+from datetime import datetime, timedelta, timezone
+
+from dotenv import load_dotenv
+
+# .env 파일 로드 (루트 디렉토리)
+load_dotenv(os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), ".env"))
+
+from app import emotions, models, search, stats, streaks
+from app.analysis import ANALYSIS_PROMPT_VERSION
+from app.api import create_backend_token
+from app.database import SessionLocal
+from bench import BENCH_EMAIL_DOMAIN, EMOTIONS, RESULTS_DIR, SEARCH_WORDS, SENTENCES, USERS_FILE
+
+CATEGORY_NAMES = ["일상", "회사", "여행", "감사"]
+MOODS = ["😊", "😢", "😡", "😌", "😰"]
+
+def _email(i: int) -> str:
+    return f"bench-user-{i:05d}@{BENCH_EMAIL_DOMAIN}"
+
+def _content(rng: random.Random, sentences: int) -> str:
+    return " ".join(rng.choice(SENTENCES).format(w=rng.choice(SEARCH_WORDS)) for _ in range(sentences))
+
+def _analysis(rng: random.Random, diary_id: int) -> models.EmotionAnalysis:
+    weights = [rng.random() for _ in EMOTIONS]
+    total = sum(weights)
+    scores = {e: round(w / total, 2) for e, w in zip(EMOTIONS, weights)}
+    return models.EmotionAnalysis(
+        diary_id=diary_id,
+        summary=f"{rng.choice(SEARCH_WORDS)}에 대한 하루를 기록한 일기입니다.",
+        emotions=scores,
+        **emotions.column_values(scores),
+        keywords=rng.sample(SEARCH_WORDS, 3),
+        card_message="오늘도 충분히 잘 해냈어요.",
+        positive_points=["하루를 기록했다", f"{rng.choice(SEARCH_WORDS)}을 돌아봤다", "스스로를 돌봤다"],
+        improvement_points="조금 더 일찍 쉬어도 괜찮아요.",
+        prompt_version=ANALYSIS_PROMPT_VERSION,
+    )
+
+def reset(db):
+    """이전 실행에서 만든 벤치마크 사용자와 데이터 삭제"""
+    user_ids = [uid for (uid,) in db.query(models.User.id).filter(
+        models.User.email.like(f"%@{BENCH_EMAIL_DOMAIN}")
+    ).all()]
+    if not user_ids:
+        return 0
+    # 일기/대화 삭제 시 분석, 색인, 작업 큐, 대화 메시지는 FK CASCADE로 함께 삭제됨
+    for model in (models.Diary, models.Category, models.AIChat, models.UserEmotionStats, models.MonthlyReport,
+                  models.UserStreak, models.UserStreakRun):
+        db.query(model).filter(model.user_id.in_(user_ids)).delete(synchronize_session=False)
+    db.query(models.User).filter(models.User.id.in_(user_ids)).delete(synchronize_session=False)
+    db.commit()
+    return len(user_ids)
+
+def seed_user(db, rng: random.Random, index: int, diaries: int, chats: int, months: int, analyzed_ratio: float) -> int:
+    user = models.User(email=_email(index), name=f"Bench {index}", provider="bench")
+    db.add(user)
+    db.flush()
+    categories = [models.Category(name=name, user_id=user.id) for name in CATEGORY_NAMES]
+    db.add_all(categories)
+    db.flush()
+
+    now = datetime.now(timezone.utc)
+    span = timedelta(days=30 * months)
+    diary_rows = []
+    for _ in range(diaries):
+        diary_rows.append(models.Diary(
+            title=f"{rng.choice(SEARCH_WORDS)}의 하루",
+            content=_content(rng, rng.randint(3, 12)),
+            category_id=rng.choice(categories).id if rng.random() < 0.6 else None,
+            mood=rng.choice(MOODS),
+            is_pinned=rng.random() < 0.05,
+            analysis_status="done",
+            created_at=now - span * rng.random(),
+            user_id=user.id,
+        ))
+    db.add_all(diary_rows)
+    db.flush()
+    diary_ids = [d.id for d in diary_rows]
+
+    db.add_all([_analysis(rng, diary_id) for diary_id in diary_ids if rng.random() < analyzed_ratio])
+    db.flush()
+    search.index_diaries(db, diary_ids)
+    stats.rebuild(db, user.id)
+    streaks.rebuild(db, user.id)
+
+    # 지난 날짜별 AI 대화 (하루 한 건)
+    for day in rng.sample(range(1, 30 * months), min(chats, 30 * months - 1)):
+        messages = []
+        for _ in range(rng.randint(1, 6)):
+            messages.append({"role": "user", "content": _content(rng, 1)})
+            messages.append({"role": "assistant", "content": _content(rng, 2)})
+        chat = models.AIChat(
+            user_id=user.id, date=(now - timedelta(days=day)).date().isoformat(),
+            message_count=len(messages), mood="NORMAL",
+        )
+        db.add(chat)
+        db.flush()
+        db.add_all([models.AIChatMessage(chat_id=chat.id, seq=seq, **m) for seq, m in enumerate(messages, start=1)])
+    db.commit()
+    return user.id
+
+def main():
+    parser = argparse.ArgumentParser(description="Seed synthetic users for load tests")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--diaries-per-user", type=int, default=200)
+    parser.add_argument("--chats-per-user", type=int, default=20)
+    parser.add_argument("--months", type=int, default=12, help="일기를 분산할 기간 (개월)")
+    parser.add_argument("--analyzed-ratio", type=float, default=0.9, help="감정 분석이 있는 일기 비율")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--reset-only", action="store_true", help="벤치마크 사용자만 삭제하고 종료")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    db = SessionLocal()
+    try:
+        removed = reset(db)
+        if removed:
+            print(f"Removed {removed} previous bench users")
+        if args.reset_only:
+            return
+        users = []
+        for i in range(args.users):
+            seed_user(db, rng, i, args.diaries_per_user, args.chats_per_user, args.months, args.analyzed_ratio)
+            users.append({"email": _email(i), "token": create_backend_token(_email(i), f"Bench {i}", provider="bench")})
+            print(f"... user {i + 1}/{args.users}")
+    finally:
+        db.close()
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    with open(USERS_FILE, "w") as f:
+        json.dump({"seed": vars(args), "users": users}, f, indent=2)
+    print(f"Seeded {args.users} users x {args.diaries_per_user} diaries -> {USERS_FILE}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""기존 업로드 이미지의 메타데이터(EXIF/위치 정보 등) 제거 + 썸네일/중간 크기 이미지 일괄 생성
+
+사용 예:
+    python generate_image_derivatives.py            # 원본 다시 저장 + 파생 이미지 생성
+    python generate_image_derivatives.py --dry-run  # 바뀔 파일만 출력
+
+메타데이터 제거 이전에 올라온 원본은 다시 저장하면 내용이 바뀌므로 새 해시 파일명으로 옮기고
+diaries.image_url을 새 URL로 바꾼 뒤 예전 파일과 파생 이미지를 지웁니다.
+움직이는 이미지처럼 다시 저장할 수 없는 파일은 그대로 두고 목록을 출력합니다. (메타데이터가 남아 있음)
+이미 파생 이미지가 있는 파일은 생성을 건너뜁니다. (Pillow 필요)
+"""
+import argparse
+import os
+from dotenv import load_dotenv
+
+# .env 파일 로드 (루트 디렉토리)
+load_dotenv(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".env"))
+
+from app import images
+from app.database import SessionLocal
+
+def run(dry_run: bool = False):
+    if images.Image is None:
+        print("Error: Pillow is not installed (pip install pillow)")
+        return
+    names = sorted(
+        name for name in os.listdir(images.UPLOAD_DIR)
+        if not name.endswith(".part") and not images._derivative_re.match(name)
+    )
+    renamed, skipped = 0, []
+    db = SessionLocal()
+    try:
+        for name in names:
+            if dry_run:
+                try:
+                    clean_path, ext = images._strip_metadata(os.path.join(images.UPLOAD_DIR, name))
+                except ValueError as e:
+                    skipped.append((name, e))
+                    continue
+                new_name = images._hashed_name(clean_path, ext)
+                os.remove(clean_path)
+                if new_name != name:
+                    print(f"{name} -> {new_name}")
+                    renamed += 1
+                continue
+            try:
+                new_name = images.restrip_upload(db, name)
+            except ValueError as e:
+                skipped.append((name, e))
+                new_name = None
+            if new_name:
+                print(f"{name} -> {new_name}")
+                renamed += 1
+            images.process_image(new_name or name)
+    finally:
+        db.close()
+    for name, reason in skipped:
+        print(f"Skipped, metadata not removed: {name} ({reason})")
+    print(f"Done: {len(names)} images checked, {renamed} rewritten, {len(skipped)} could not be stripped")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Strip metadata from existing uploads and build thumbnails")
+    parser.add_argument("--dry-run", action="store_true", help="파일을 바꾸지 않고 새 이름만 출력")
+    args = parser.parse_args()
+    run(args.dry_run)
@@ -0,0 +1,82 @@
+"""월간 AI 리포트 미리 생성 (매월 1일 배치)
+
+사용 예:
+    python generate_monthly_reports.py                      # 지난달, 일기가 있는 전체 사용자
+    python generate_monthly_reports.py --year 2024 --month 5
+    python generate_monthly_reports.py --stale              # stale 표시된 리포트 전체 갱신
+
+cron 예시 (매월 1일 04:00):
+    0 4 1 * * cd /app && python generate_monthly_reports.py
+
+이미 최신인 리포트(version이 같은 경우)는 GPT를 호출하지 않습니다.
+"""
+import argparse
+import os
+from datetime import date
+from dotenv import load_dotenv
+
+# .env 파일 로드 (루트 디렉토리)
+load_dotenv(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".env"))
+
+from app.database import SessionLocal
+from app import models, reports
+from app.llm import get_openai_client
+
+def previous_month(today: date):
+    return (today.year - 1, 12) if today.month == 1 else (today.year, today.month - 1)
+
+def targets_for_month(db, year: int, month: int):
+    start, end_day = reports.month_range(year, month)
+    user_ids = db.query(models.Diary.user_id).filter(
+        models.Diary.created_at >= start,
+        models.Diary.created_at < end_day
+    ).distinct().order_by(models.Diary.user_id).all()
+    return [(uid, year, month) for (uid,) in user_ids]
+
+def stale_targets(db):
+    rows = db.query(models.MonthlyReport.user_id, models.MonthlyReport.year, models.MonthlyReport.month).filter(
+        models.MonthlyReport.is_stale == True
+    ).order_by(models.MonthlyReport.year, models.MonthlyReport.month, models.MonthlyReport.user_id).all()
+    return [tuple(r) for r in rows]
+
+def generate(targets):
+    client = get_openai_client()
+    if not client:
+        print("Error: OpenAI Client not initialized. Check API Key.")
+        return
+    db = SessionLocal()
+    generated, failed = 0, 0
+    try:
+        for user_id, year, month in targets:
+            row = reports.get_stored_report(db, user_id, year, month)
+            if row and not row.is_stale:
+                continue
+            try:
+                reports.refresh_report(db, client, user_id, year, month, row)
+                generated += 1
+                print(f"User {user_id} {year}-{month:02d}: ok")
+            except Exception as e:
+                db.rollback()
+                failed += 1
+                print(f"User {user_id} {year}-{month:02d}: failed ({e})")
+    finally:
+        db.close()
+    print(f"Done: {generated} refreshed, {failed} failed")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pre-generate monthly AI reports")
+    parser.add_argument("--year", type=int)
+    parser.add_argument("--month", type=int)
+    parser.add_argument("--stale", action="store_true", help="stale 표시된 리포트만 갱신")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        if args.stale:
+            targets = stale_targets(db)
+        else:
+            year, month = (args.year, args.month) if args.year and args.month else previous_month(date.today())
+            targets = targets_for_month(db, year, month)
+    finally:
+        db.close()
+    generate(targets)
@@ -1,8 +1,7 @@
-from app.database import engine, Base
-from app.models import User, Diary, EmotionAnalysis
+from app.migrations import migrate
 
 def init_db():
-    Base.metadata.create_all(bind=engine)
+    migrate()
 
 if __name__ == "__main__":
     print("Initializing database...")
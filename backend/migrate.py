@@ -0,0 +1,28 @@
+"""DB 스키마 마이그레이션 (배포 시 API 시작 전에 한 번 실행)
+
+사용 예:
+    python migrate.py            # 최신 버전까지 적용
+    python migrate.py --status   # 현재 버전만 확인
+"""
+import argparse
+import os
+from dotenv import load_dotenv
+
+# .env 파일 로드 (루트 디렉토리)
+load_dotenv(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".env"))
+
+from app import migrations
+from app.database import engine
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Apply versioned schema migrations")
+    parser.add_argument("--status", action="store_true", help="적용 없이 현재 버전만 출력")
+    parser.add_argument("--target", type=int, help="이 버전까지만 적용")
+    args = parser.parse_args()
+
+    if args.status:
+        with engine.connect() as conn:
+            print(f"Schema version: {migrations.current_version(conn)} (latest: {migrations.LATEST_VERSION})")
+    else:
+        applied = migrations.migrate(args.target)
+        print(f"Applied {len(applied)} migration(s). Schema is up to date." if applied else "Schema is already up to date.")
@@ -0,0 +1,35 @@
+"""사용자별 감정 통계 집계(user_emotion_stats) 재계산
+
+사용 예:
+    python rebuild_stats.py             # 전체 사용자
+    python rebuild_stats.py --user 42   # 특정 사용자
+"""
+import argparse
+import os
+from dotenv import load_dotenv
+
+# .env 파일 로드 (루트 디렉토리)
+load_dotenv(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".env"))
+
+from app.database import SessionLocal
+from app import models, stats
+
+def rebuild_all(user_id: int = None):
+    db = SessionLocal()
+    try:
+        if user_id:
+            user_ids = [user_id]
+        else:
+            user_ids = [uid for (uid,) in db.query(models.User.id).order_by(models.User.id).all()]
+        for uid in user_ids:
+            result = stats.rebuild(db, uid)
+            db.commit()
+            print(f"User {uid}: {result.total_count} analyses")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild per-user emotion statistics")
+    parser.add_argument("--user", type=int, help="특정 사용자 id만 재계산")
+    args = parser.parse_args()
+    rebuild_all(args.user)
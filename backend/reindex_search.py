@@ -0,0 +1,48 @@
+"""일기 검색 색인(diary_search_terms) 전체 재구축 / 기존 일기 백필
+
+사용 예:
+    python reindex_search.py
+    python reindex_search.py --user 42 --batch-size 500
+"""
+import argparse
+import os
+from dotenv import load_dotenv
+
+# .env 파일 로드 (루트 디렉토리)
+load_dotenv(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".env"))
+
+from app.database import SessionLocal
+from app import models, search
+
+def reindex(user_id: int = None, batch_size: int = 200):
+    read_db = SessionLocal()
+    write_db = SessionLocal()
+    total = 0
+    try:
+        query = read_db.query(models.Diary.id).order_by(models.Diary.id)
+        if user_id:
+            query = query.filter(models.Diary.user_id == user_id)
+        batch = []
+        for (diary_id,) in query.execution_options(stream_results=True).yield_per(batch_size):
+            batch.append(diary_id)
+            if len(batch) >= batch_size:
+                search.index_diaries(write_db, batch)
+                write_db.commit()
+                total += len(batch)
+                print(f"... {total} diaries indexed")
+                batch = []
+        if batch:
+            search.index_diaries(write_db, batch)
+            write_db.commit()
+            total += len(batch)
+    finally:
+        read_db.close()
+        write_db.close()
+    print(f"Done: {total} diaries indexed")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild the diary search index")
+    parser.add_argument("--user", type=int, help="특정 사용자 id만 재색인")
+    parser.add_argument("--batch-size", type=int, default=200)
+    args = parser.parse_args()
+    reindex(args.user, args.batch_size)
@@ -0,0 +1,51 @@
+"""타로 카드 이미지 라이브러리 미리 생성 (static/tarot)
+
+사용 예:
+    python warm_tarot_library.py                  # 카드 7장 x 위치 3 x 테마 4 = 84장
+    python warm_tarot_library.py --cards 22 --concurrency 3
+
+이미 있는 이미지는 건너뛰므로 중단되어도 같은 명령으로 이어서 실행할 수 있습니다.
+"""
+import argparse
+import asyncio
+import os
+from dotenv import load_dotenv
+
+# .env 파일 로드 (루트 디렉토리)
+load_dotenv(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".env"))
+
+from app import tarot
+from app.llm import close_clients, get_async_openai_client
+
+async def warm(card_count: int, concurrency: int):
+    client = get_async_openai_client()
+    if not client:
+        print("Error: OpenAI Client not initialized. Check API Key.")
+        return
+    todo = [key for key in tarot.all_keys(card_count) if not tarot.exists(tarot.relative_path(*key))]
+    print(f"{len(todo)} images to generate")
+    semaphore = asyncio.Semaphore(concurrency)
+    failed = 0
+
+    async def run(card_number, position, theme):
+        nonlocal failed
+        async with semaphore:
+            try:
+                rel = await tarot.get_or_generate(client, card_number, position, theme)
+                print(f"  {rel}")
+            except Exception as e:
+                failed += 1
+                print(f"  Failed {card_number}/{position}/{theme}: {e}")
+
+    try:
+        await asyncio.gather(*(run(*key) for key in todo))
+    finally:
+        await close_clients()
+    print(f"Done: {len(todo) - failed} generated, {failed} failed")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pre-render tarot card images")
+    parser.add_argument("--cards", type=int, default=tarot.CARD_COUNT, help="카드 번호 1..N")
+    parser.add_argument("--concurrency", type=int, default=2, help="동시 DALL-E 호출 수")
+    args = parser.parse_args()
+    asyncio.run(warm(args.cards, args.concurrency))
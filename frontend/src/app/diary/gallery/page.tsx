@@ -13,6 +13,7 @@ interface Diary {
     id: number;
     title: string;
     image_url: string;
+    thumb_url?: string;
     created_at: string;
     mood?: string;
 }
@@ -116,7 +117,7 @@ export default function Gallery() {
                             className="group relative aspect-square rounded-[2rem] overflow-hidden shadow-soft bg-slate-200 animate-in fade-in zoom-in duration-500"
                         >
                             <img
-                                src={`${API}${diary.image_url}`}
+                                src={`${API}${diary.thumb_url || diary.image_url}`}
                                 alt={diary.title}
                                 className="w-full h-full object-cover transition-transform duration-700 group-hover:scale-110"
                             />
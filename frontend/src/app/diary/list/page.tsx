@@ -25,6 +25,7 @@ interface Diary {
     is_pinned?: boolean;
     is_locked?: boolean;
     image_url?: string;
+    medium_url?: string;
     category?: Category;
     analysis?: {
         summary: string;
@@ -36,18 +37,17 @@ interface Diary {
     };
 }
 
-const WEEKDAYS = ["일", "월", "화", "수", "목", "금", "토"];
-
-function getTopEmotionEmoji(emotions?: Record<string, number>): string {
-    if (!emotions) return "📔";
-    const map: Record<string, string> = {
-        "기쁨": "😊", "슬픔": "😢", "불안": "😰", "분노": "😤", "평온": "😌",
-        "joy": "😊", "sadness": "😢", "anxiety": "😰", "anger": "😤", "calm": "😌",
-    };
-    const top = Object.entries(emotions).sort((a, b) => b[1] - a[1])[0];
-    return top ? (map[top[0]] || "💙") : "📔";
+// GET /api/calendar 의 날짜별 요약 (일기가 있는 날만)
+interface CalendarDay {
+    day: number;
+    count: number;
+    color_code?: string;
+    mood?: string;
+    has_image: boolean;
 }
 
+const WEEKDAYS = ["일", "월", "화", "수", "목", "금", "토"];
+
 function getEmotionHeatColor(emotions?: Record<string, number>, mood?: string): string | null {
     if (mood) return null; // 이모지 기분이 있으면 색상 생략
     if (!emotions) return null;
@@ -80,6 +80,8 @@ export default function DiaryList() {
     const [searchQ, setSearchQ] = useState("");
     const [filterCategoryId, setFilterCategoryId] = useState<number | "">("");
     const [isSearchMode, setIsSearchMode] = useState(false);
+    // "YYYY-M" -> 날짜별 요약 (이미 본 달은 바로 그리고, 응답은 ETag로 재검증)
+    const [calendarCache, setCalendarCache] = useState<Record<string, CalendarDay[]>>({});
 
     const loadDiaries = useCallback(async (q?: string, catId?: number | "") => {
         if (!backendToken) return;
@@ -125,6 +127,21 @@ export default function DiaryList() {
     // 달력 계산
     const year = currentDate.getFullYear();
     const month = currentDate.getMonth();
+    const monthKey = `${year}-${month + 1}`;
+
+    useEffect(() => {
+        if (!backendToken) return;
+        let cancelled = false;
+        fetch(`${API}/api/calendar?year=${year}&month=${month + 1}`, {
+            headers: { "Authorization": `Bearer ${backendToken}` }
+        })
+            .then(r => r.ok ? r.json() : null)
+            .then(data => {
+                if (!cancelled && data?.days) setCalendarCache(prev => ({ ...prev, [monthKey]: data.days }));
+            })
+            .catch(() => { });
+        return () => { cancelled = true; };
+    }, [backendToken, year, month, monthKey, diaries]);
     const firstDay = new Date(year, month, 1).getDay();
     const daysInMonth = new Date(year, month + 1, 0).getDate();
 
@@ -136,11 +153,16 @@ export default function DiaryList() {
 
     const diaryMap: Record<string, Diary[]> = {};
     diaries.forEach(d => {
-        const key = d.created_at.slice(0, 10);
+        // 달력(/calendar)과 같이 UTC가 아닌 현지 날짜로 묶음
+        const c = new Date(d.created_at);
+        const key = `${c.getFullYear()}-${String(c.getMonth() + 1).padStart(2, '0')}-${String(c.getDate()).padStart(2, '0')}`;
         if (!diaryMap[key]) diaryMap[key] = [];
         diaryMap[key].push(d);
     });
 
+    const calendarDays: Record<number, CalendarDay> = {};
+    (calendarCache[monthKey] || []).forEach(d => { calendarDays[d.day] = d; });
+
     const selectedDiaries = selectedDate ? (diaryMap[selectedDate] || []) : [];
 
     return (
@@ -199,12 +221,12 @@ export default function DiaryList() {
                             {Array.from({ length: daysInMonth }).map((_, i) => {
                                 const day = i + 1;
                                 const dateKey = `${year}-${String(month + 1).padStart(2, "0")}-${String(day).padStart(2, "0")}`;
-                                const hasDiary = !!diaryMap[dateKey];
+                                const summary = calendarDays[day];
+                                const hasDiary = !!summary;
                                 const isToday = dateKey === todayKey;
                                 const isSelected = dateKey === selectedDate;
-                                const d0 = diaryMap[dateKey]?.[0];
-                                const emoji = d0?.mood || (d0?.analysis ? getTopEmotionEmoji(d0.analysis.emotions) : null);
-                                const customColor = d0?.color_code;
+                                const emoji = summary?.mood;
+                                const customColor = summary?.color_code;
 
                                 return (
                                     <button key={day} onClick={() => {
@@ -244,7 +266,7 @@ export default function DiaryList() {
                     </div>
 
                     <div className="text-[10px] text-slate-400 text-center font-black tracking-widest uppercase opacity-60">
-                        {month + 1}월에 <span className="text-haru-sky-deep font-black underline">{Object.keys(diaryMap).filter(k => k.startsWith(`${year}-${String(month + 1).padStart(2, "0")}`)).length}개</span>의 기록이 완성되었습니다
+                        {month + 1}월에 <span className="text-haru-sky-deep font-black underline">{calendarCache[monthKey]?.length ?? 0}개</span>의 기록이 완성되었습니다
                     </div>
                 </aside>
 
@@ -381,7 +403,9 @@ function DiaryCard({ diary, expandedId, setExpandedId, onPin, onRefresh }: {
             toast("이미지가 성공적으로 첨부되었어요 📷", "success");
             onRefresh();
         } else {
-            toast("이미지 업로드에 실패했어요.", "error");
+            // 415: 메타데이터를 지울 수 없는 형식 (움직이는 이미지, HEIC 등)
+            const detail = res.status === 415 ? (await res.json().catch(() => null))?.detail : null;
+            toast(detail || "이미지 업로드에 실패했어요.", "error");
         }
     };
 
@@ -456,7 +480,7 @@ function DiaryCard({ diary, expandedId, setExpandedId, onPin, onRefresh }: {
                 <div className="px-5 pb-5 flex flex-col gap-4 border-t border-slate-100 dark:border-slate-700">
                     {/* 첨부 이미지 */}
                     {diary.image_url && (
-                        <img src={`${API}${diary.image_url}`} alt="첨부 이미지" className="w-full rounded-2xl object-cover max-h-48 mt-4" />
+                        <img src={`${API}${diary.medium_url || diary.image_url}`} alt="첨부 이미지" className="w-full rounded-2xl object-cover max-h-48 mt-4" />
                     )}
                     {/* AI 응원 카드 */}
                     {diary.analysis?.card_message && (
@@ -503,7 +527,7 @@ function DiaryCard({ diary, expandedId, setExpandedId, onPin, onRefresh }: {
                         <button onClick={() => setShowShareCard(true)} className="flex items-center gap-1 text-xs px-3 py-2 bg-slate-100 dark:bg-slate-700 dark:text-slate-300 text-slate-500 font-bold rounded-xl hover:bg-sky-50 hover:text-sky-500 transition-colors">
                             📤 공유 카드
                         </button>
-                        <input ref={fileInputRef} type="file" accept="image/*" className="hidden" onChange={handleImageUpload} />
+                        <input ref={fileInputRef} type="file" accept="image/jpeg,image/png,image/webp" className="hidden" onChange={handleImageUpload} />
                     </div>
                     {showShareCard && (
                         <ShareCard diary={diary} onClose={() => setShowShareCard(false)} />
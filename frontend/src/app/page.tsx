@@ -12,27 +12,6 @@ import { useBackendToken } from "@/components/AuthProvider";
 
 const API = process.env.NEXT_PUBLIC_API_URL || "http://localhost:8000";
 
-// 연속 일기 스트릭 계산
-function calcStreak(diaries: { created_at: string }[]): number {
-  if (!diaries.length) return 0;
-  const dates = [...new Set(diaries.map(d => d.created_at.slice(0, 10)))].sort().reverse();
-  let streak = 0;
-  let cursor = new Date();
-  cursor.setHours(0, 0, 0, 0);
-
-  for (const dateStr of dates) {
-    const d = new Date(dateStr + "T00:00:00");
-    const diff = Math.round((cursor.getTime() - d.getTime()) / 86400000);
-    if (diff === 0 || diff === 1) {
-      streak++;
-      cursor = d;
-    } else {
-      break;
-    }
-  }
-  return streak;
-}
-
 export default function Home() {
   const { data: session } = useSession();
   const { backendToken } = useBackendToken();
@@ -45,17 +24,29 @@ export default function Home() {
     setDarkMode(saved);
     document.documentElement.classList.toggle("dark", saved);
 
-    // 로그인된 경우에만 일기 목록 가져오기
-    const fetchOptions = backendToken
-      ? { headers: { Authorization: `Bearer ${backendToken}` } }
-      : {};
-
-    fetch(`${API}/api/diaries`, fetchOptions)
-      .then(res => res.json())
-      .then(data => {
-        if (Array.isArray(data)) setStreak(calcStreak(data));
-      })
-      .catch(() => { });
+    // 로그인된 경우에만 연속 기록 가져오기 (서버가 일기 추가/삭제 시 갱신)
+    if (backendToken) {
+      const headers = { Authorization: `Bearer ${backendToken}` };
+      const timeZone = Intl.DateTimeFormat().resolvedOptions().timeZone;
+      fetch(`${API}/api/streak`, { headers })
+        .then(res => res.json())
+        .then(data => {
+          if (typeof data?.current_streak === "number") setStreak(data.current_streak);
+          // 기기 시간대와 다르면 서버에 알려서 날짜 경계를 맞춤 (응답은 새 시간대 기준 스트릭)
+          if (timeZone && data?.timezone && data.timezone !== timeZone) {
+            return fetch(`${API}/api/users/me/timezone`, {
+              method: "PUT",
+              headers: { ...headers, "Content-Type": "application/json" },
+              body: JSON.stringify({ timezone: timeZone }),
+            })
+              .then(res => res.ok ? res.json() : null)
+              .then(updated => {
+                if (typeof updated?.current_streak === "number") setStreak(updated.current_streak);
+              });
+          }
+        })
+        .catch(() => { });
+    }
 
     // 시간대별 인사말 설정 (Client-side)
     const hour = new Date().getHours();
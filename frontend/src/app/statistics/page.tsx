@@ -22,13 +22,21 @@ interface Stats {
     emotion_distribution: Record<string, number>;
     total_count: number;
     recent_positive_points: string[][];
-    emotion_trend?: { date: string; emotions: Record<string, number> }[];
+}
+
+// GET /api/statistics/trend 의 구간 하나
+interface TrendPoint {
+    date: string;
+    count: number;
+    emotions: Record<string, number> | null;
+    rolling_average: Record<string, number> | null;
+    volatility: Record<string, number> | null;
 }
 
 export default function Statistics() {
     const { backendToken, isLoading: tokenLoading } = useBackendToken();
     const [stats, setStats] = useState<Stats | null>(null);
-    const [diaries, setDiaries] = useState<{ created_at: string; analysis?: { emotions: Record<string, number> } }[]>([]);
+    const [trend, setTrend] = useState<TrendPoint[]>([]);
     const [isLoading, setIsLoading] = useState(true);
 
     useEffect(() => {
@@ -43,22 +51,22 @@ export default function Statistics() {
             try {
                 const headers = { "Authorization": `Bearer ${backendToken}` };
 
-                const [statsRes, diaryRes] = await Promise.all([
+                const [statsRes, trendRes] = await Promise.all([
                     fetch(`${API}/api/statistics`, { headers }),
-                    fetch(`${API}/api/diaries`, { headers }),
+                    fetch(`${API}/api/statistics/trend?bucket=day`, { headers }),
                 ]);
 
-                if (!statsRes.ok || !diaryRes.ok) {
+                if (!statsRes.ok || !trendRes.ok) {
                     const statsErr = await statsRes.text();
                     console.error("Stats fetch failed:", statsRes.status, statsErr);
                     throw new Error("Failed to fetch statistics");
                 }
 
                 const statsData = await statsRes.json();
-                const diaryData = await diaryRes.json();
+                const trendBody = await trendRes.json();
 
                 setStats(statsData);
-                if (Array.isArray(diaryData)) setDiaries(diaryData);
+                if (Array.isArray(trendBody?.points)) setTrend(trendBody.points);
             } catch (error) {
                 console.error("Fetch stats error:", error);
             } finally {
@@ -70,26 +78,17 @@ export default function Statistics() {
     }, [backendToken, tokenLoading]);
 
     const trendData = useMemo(() => {
-        const map: Record<string, { emotions: Record<string, number[]> }> = {};
-        diaries.forEach((d: any) => {
-            if (!d.analysis?.emotions) return;
-            const date = d.created_at.slice(5, 10); // MM-DD
-            if (!map[date]) map[date] = { emotions: {} };
-            Object.entries(d.analysis.emotions || {}).forEach(([em, v]: [string, any]) => {
-                if (!map[date].emotions[em]) map[date].emotions[em] = [];
-                map[date].emotions[em].push(v);
-            });
-        });
-        return Object.entries(map)
-            .sort(([a], [b]) => a.localeCompare(b))
-            .slice(-7) // 최근 7일
-            .map(([date, { emotions }]) => ({
-                name: date,
+        // 서버가 날짜별 평균을 계산 (일기가 있는 최근 7일)
+        return trend
+            .filter(p => p.count > 0 && p.emotions)
+            .slice(-7)
+            .map(p => ({
+                name: p.date.slice(5, 10), // MM-DD
                 ...Object.fromEntries(
-                    Object.entries(emotions).map(([em, vals]) => [em, (vals.reduce((a, b) => a + b, 0) / vals.length) * 100])
+                    Object.entries(p.emotions || {}).map(([em, v]) => [em, v * 100])
                 ),
             }));
-    }, [diaries]);
+    }, [trend]);
 
     const pieData = useMemo(() => {
         if (!stats?.emotion_distribution || Object.keys(stats.emotion_distribution).length === 0) return [];